@@ -0,0 +1,77 @@
+"""ASGI entry point: ``uvicorn asgi:app``.
+
+Live-session sockets and MJPEG viewers are served natively on the event loop;
+every other route goes through the Flask app on a bounded thread pool once its
+request body has been read, so idle and slow connections hold no thread.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+
+from flask import Flask
+
+from app import create_app
+from routes.media_async import MediaAsyncRoutes
+from utils.asgi_bridge import WSGIBridge
+
+
+class AsyncMediaApp:
+    def __init__(self, flask_app: Flask) -> None:
+        config = flask_app.config
+        self.flask_app = flask_app
+        self._executor = ThreadPoolExecutor(
+            max_workers=config.get("ASGI_WORKER_THREADS", 16), thread_name_prefix="asgi-worker"
+        )
+        self._routes = MediaAsyncRoutes(flask_app, self._executor)
+        self._bridge = WSGIBridge(
+            flask_app.wsgi_app,
+            self._executor,
+            max_body_bytes=config.get("ASGI_MAX_BODY_BYTES"),
+            spool_bytes=config.get("ASGI_BODY_SPOOL_BYTES", 1024 * 1024),
+            stream_paths=config.get("ASGI_STREAMING_PATHS", ()),
+        )
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        handler = self._routes.match(scope)
+        if handler is not None:
+            await handler(scope, receive, send)
+        elif scope["type"] == "http":
+            await self._bridge(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 1000})
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                # Let in-flight requests finish; pending live-session finalizations
+                # are drained by the manager's own exit hook.
+                await self._drain_executor()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+    async def _drain_executor(self) -> None:
+        # Waited for on a thread of its own: the loop's default executor may
+        # already be shutting down, and must not be the one blocked on ours.
+        loop = asyncio.get_running_loop()
+        drained = loop.create_future()
+
+        def drain() -> None:
+            self._executor.shutdown(wait=True)
+            loop.call_soon_threadsafe(drained.set_result, None)
+
+        threading.Thread(target=drain, name="asgi-drain", daemon=True).start()
+        await drained
+
+
+def create_asgi_app(env_name: str | None = None) -> AsyncMediaApp:
+    return AsyncMediaApp(create_app(env_name))
+
+
+app = create_asgi_app()
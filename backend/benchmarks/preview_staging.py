@@ -0,0 +1,92 @@
+"""Compare preview staging in anonymous memory against NamedTemporaryFile.
+
+Run from the backend directory::
+
+    python -m benchmarks.preview_staging --frames 90 --iterations 30
+
+Only staging and decoding are timed; the emotion model is not involved.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from services.memory_staging import MemoryStagingArea
+
+
+def _build_sample_video(frames: int, width: int, height: int) -> bytes:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "sample.mp4"
+        writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 12, (width, height))
+        rng = np.random.default_rng(7)
+        for _ in range(frames):
+            writer.write(rng.integers(0, 255, (height, width, 3), dtype=np.uint8))
+        writer.release()
+        return path.read_bytes()
+
+
+def _decode_all(path: Path) -> int:
+    capture = cv2.VideoCapture(str(path))
+    decoded = 0
+    while True:
+        grabbed, _ = capture.read()
+        if not grabbed:
+            break
+        decoded += 1
+    capture.release()
+    return decoded
+
+
+def _run_tempfile(payload: bytes) -> int:
+    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
+    tmp_file.write(payload)
+    tmp_file.close()
+    temp_path = Path(tmp_file.name)
+    try:
+        return _decode_all(temp_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+def _run_staging(staging: MemoryStagingArea, payload: bytes) -> int:
+    with staging.stage(io.BytesIO(payload), suffix=".mp4", size_hint=len(payload)) as path:
+        return _decode_all(path)
+
+
+def _measure(label: str, fn, iterations: int) -> None:
+    timings = []
+    decoded = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        decoded = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    print(
+        f"{label:<12} frames={decoded:<4} median={statistics.median(timings):8.2f} ms "
+        f"p95={sorted(timings)[int(len(timings) * 0.95) - 1]:8.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=90)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+
+    payload = _build_sample_video(args.frames, args.width, args.height)
+    staging = MemoryStagingArea(max_item_bytes=len(payload) * 2, max_total_bytes=len(payload) * 4)
+    print(f"video={len(payload) / 1024:.1f} KiB backend={staging.backend}")
+    _measure("tempfile", lambda: _run_tempfile(payload), args.iterations)
+    _measure("staging", lambda: _run_staging(staging, payload), args.iterations)
+
+
+if __name__ == "__main__":
+    main()
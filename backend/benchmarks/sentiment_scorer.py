@@ -0,0 +1,72 @@
+"""Compare single-text scoring through the sklearn Pipeline against the compiled scorer.
+
+Run from the backend directory::
+
+    python -m benchmarks.sentiment_scorer --iterations 2000
+
+The pipeline is fitted from ``TRAINING_DATA`` (or loaded from ``--model-dir``);
+both paths score the same texts and the largest probability difference is
+reported alongside the per-call timings.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+
+from services.ia_service import TRAINING_DATA
+from services.sentiment_model import SentimentModelStore, fit_pipeline
+from services.sentiment_scorer import compile_scorer
+
+SAMPLE_TEXTS = (
+    "ok",
+    "gracias",
+    "El servicio fue terrible y nadie respondió mis dudas",
+    "Great vibes from the team, everyone was helpful",
+    "Se comparte el acta del comité, favor de leerla",
+    "La entrega llegó tarde pero el soporte resolvió el problema rápido y con buena actitud",
+)
+
+
+def _measure(label: str, fn, texts, iterations: int) -> float:
+    timings = []
+    for index in range(iterations):
+        text = texts[index % len(texts)]
+        start = time.perf_counter()
+        fn([text])
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    median = statistics.median(timings)
+    print(f"{label:<10} median={median:8.1f} us p95={sorted(timings)[int(len(timings) * 0.95) - 1]:8.1f} us")
+    return median
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--model-dir", type=Path, default=None)
+    args = parser.parse_args()
+
+    if args.model_dir:
+        model = SentimentModelStore(args.model_dir).current()
+        if model is None:
+            parser.error(f"No hay modelo publicado en {args.model_dir}")
+        pipeline = model.pipeline
+    else:
+        pipeline = fit_pipeline(TRAINING_DATA)
+    scorer = compile_scorer(pipeline)
+    if scorer is None:
+        parser.error("El pipeline no es TF-IDF + LogisticRegression; no se puede compilar.")
+
+    texts = list(SAMPLE_TEXTS) + [sample for sample, _ in TRAINING_DATA]
+    difference = np.abs(pipeline.predict_proba(texts) - scorer.predict_proba(texts)).max()
+    print(f"texts={len(texts)} max_abs_diff={difference:.2e}")
+    baseline = _measure("pipeline", pipeline.predict_proba, texts, args.iterations)
+    compiled = _measure("compiled", scorer.predict_proba, texts, args.iterations)
+    print(f"speedup={baseline / compiled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,21 @@ class BaseConfig:
     PROPAGATE_EXCEPTIONS = True
     JSON_SORT_KEYS = False
     ANALYTICS_LIMIT = int(os.getenv("ANALYTICS_LIMIT", "10"))
+    SENTIMENT_MODEL_DIR = str(
+        Path(os.getenv("SENTIMENT_MODEL_DIR", BASE_DIR.parent / "instance" / "sentiment_model")).resolve()
+    )
+    SENTIMENT_MODEL_RELOAD_SECONDS = float(os.getenv("SENTIMENT_MODEL_RELOAD_SECONDS", "30"))
+    SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "10000"))
+    SENTIMENT_DOCUMENT_MIN_CHARS = int(os.getenv("SENTIMENT_DOCUMENT_MIN_CHARS", "2000"))
+    SENTIMENT_DOCUMENT_MAX_SEGMENTS = int(os.getenv("SENTIMENT_DOCUMENT_MAX_SEGMENTS", "2000"))
+    ANALYSIS_BATCH_MAX_TEXTS = int(os.getenv("ANALYSIS_BATCH_MAX_TEXTS", "5000"))
+    ANALYSIS_HISTORY_MAX_LIMIT = int(os.getenv("ANALYSIS_HISTORY_MAX_LIMIT", "100"))
+    BULK_TEXT_DIR = str(Path(os.getenv("BULK_TEXT_DIR", BASE_DIR.parent / "instance" / "bulk_text")).resolve())
+    BULK_TEXT_CHUNK_SIZE = int(os.getenv("BULK_TEXT_CHUNK_SIZE", "2000"))
+    BULK_TEXT_WORKERS = int(os.getenv("BULK_TEXT_WORKERS", "1"))
+    BULK_TEXT_JOBS = int(os.getenv("BULK_TEXT_JOBS", "1"))
+    BULK_TEXT_RETENTION_HOURS = float(os.getenv("BULK_TEXT_RETENTION_HOURS", "72"))
+    BULK_TEXT_STALE_MINUTES = float(os.getenv("BULK_TEXT_STALE_MINUTES", "30"))
     MEDIA_STORAGE_ROOT = str(
         Path(os.getenv("MEDIA_STORAGE_ROOT", BASE_DIR.parent / "tracked" / "session_media")).resolve()
     )
@@ -30,6 +45,45 @@ class BaseConfig:
     SESSION_EMOTION_SUBDIR = os.getenv("SESSION_EMOTION_SUBDIR", "emotion_class")
     SESSION_SNAPSHOT_INTERVAL = int(os.getenv("SESSION_SNAPSHOT_INTERVAL", "5"))
     SESSION_VIDEO_FPS = int(os.getenv("SESSION_VIDEO_FPS", "12"))
+    SESSION_SEGMENT_SECONDS = int(os.getenv("SESSION_SEGMENT_SECONDS", "10"))
+    SESSION_ENCODER_QUEUE_SIZE = int(os.getenv("SESSION_ENCODER_QUEUE_SIZE", "24"))
+    SESSION_SNAPSHOT_HASH_DISTANCE = int(os.getenv("SESSION_SNAPSHOT_HASH_DISTANCE", "6"))
+    SESSION_ENCODER_DROP_POLICY = os.getenv("SESSION_ENCODER_DROP_POLICY", "oldest").lower()
+    LIVE_SESSION_STORE = os.getenv("LIVE_SESSION_STORE", "memory").lower()
+    LIVE_SESSION_STORE_PATH = str(
+        Path(os.getenv("LIVE_SESSION_STORE_PATH", BASE_DIR.parent / "instance" / "live_sessions.db")).resolve()
+    )
+    LIVE_SESSION_POLL_SECONDS = float(os.getenv("LIVE_SESSION_POLL_SECONDS", "1.0"))
+    LIVE_SESSION_LATENCY_TARGET_MS = float(os.getenv("LIVE_SESSION_LATENCY_TARGET_MS", "250"))
+    LIVE_SESSION_MIN_INTERVAL_MS = int(os.getenv("LIVE_SESSION_MIN_INTERVAL_MS", "100"))
+    LIVE_SESSION_MAX_INTERVAL_MS = int(os.getenv("LIVE_SESSION_MAX_INTERVAL_MS", "2000"))
+    LIVE_SESSION_MAX_FRAME_WIDTH = int(os.getenv("LIVE_SESSION_MAX_FRAME_WIDTH", "1280"))
+    LIVE_SESSION_SKIP_THRESHOLD = float(os.getenv("LIVE_SESSION_SKIP_THRESHOLD", "4.0"))
+    LIVE_SESSION_REFRESH_FRAMES = int(os.getenv("LIVE_SESSION_REFRESH_FRAMES", "10"))
+    LIVE_SESSION_ROI_MARGIN = float(os.getenv("LIVE_SESSION_ROI_MARGIN", "0.5"))
+    LIVE_SESSION_FULL_SCAN_FRAMES = int(os.getenv("LIVE_SESSION_FULL_SCAN_FRAMES", "15"))
+    LIVE_SESSION_STAT_WINDOWS = tuple(
+        float(value) for value in os.getenv("LIVE_SESSION_STAT_WINDOWS", "10,60").split(",") if value.strip()
+    )
+    ASGI_WORKER_THREADS = int(os.getenv("ASGI_WORKER_THREADS", "16"))
+    ASGI_MAX_BODY_BYTES = int(os.getenv("ASGI_MAX_BODY_BYTES", str(512 * 1024 * 1024)))
+    ASGI_BODY_SPOOL_BYTES = int(os.getenv("ASGI_BODY_SPOOL_BYTES", str(1024 * 1024)))
+    ASGI_STREAMING_PATHS = tuple(
+        path.strip()
+        for path in os.getenv("ASGI_STREAMING_PATHS", "/media/uploads/,/media/preview-video").split(",")
+        if path.strip()
+    )
+    LIVE_SESSION_FINALIZER_WORKERS = int(os.getenv("LIVE_SESSION_FINALIZER_WORKERS", "2"))
+    LIVE_SESSION_IDLE_TIMEOUT = float(os.getenv("LIVE_SESSION_IDLE_TIMEOUT", "120"))
+    LIVE_SESSION_MEMORY_BUDGET_BYTES = int(os.getenv("LIVE_SESSION_MEMORY_BUDGET_BYTES", str(256 * 1024 * 1024)))
+    MEDIA_UPLOAD_CHUNK_MAX_BYTES = int(os.getenv("MEDIA_UPLOAD_CHUNK_MAX_BYTES", str(8 * 1024 * 1024)))
+    MEDIA_UPLOAD_ANALYZE_MIN_BYTES = int(os.getenv("MEDIA_UPLOAD_ANALYZE_MIN_BYTES", str(512 * 1024)))
+    MEDIA_UPLOAD_WORKERS = int(os.getenv("MEDIA_UPLOAD_WORKERS", "2"))
+    MEDIA_UPLOAD_IDLE_TIMEOUT = float(os.getenv("MEDIA_UPLOAD_IDLE_TIMEOUT", "3600"))
+    PREVIEW_STAGING_MAX_ITEM_BYTES = int(os.getenv("PREVIEW_STAGING_MAX_ITEM_BYTES", str(64 * 1024 * 1024)))
+    PREVIEW_STAGING_MAX_TOTAL_BYTES = int(os.getenv("PREVIEW_STAGING_MAX_TOTAL_BYTES", str(256 * 1024 * 1024)))
+    PREVIEW_STAGING_DIR = os.getenv("PREVIEW_STAGING_DIR", "/dev/shm")
+    PREVIEW_STAGING_ALLOW_DISK = os.getenv("PREVIEW_STAGING_ALLOW_DISK", "false").lower() in {"1", "true", "yes"}
 
 
 class DevelopmentConfig(BaseConfig):
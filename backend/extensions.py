@@ -1,14 +1,17 @@
 from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
+from flask_sock import Sock
 from flask_sqlalchemy import SQLAlchemy
 
 
 db = SQLAlchemy()
 migrate = Migrate()
 jwt = JWTManager()
+sock = Sock()
 
 
 def init_extensions(app):
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    sock.init_app(app)
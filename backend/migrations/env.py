@@ -90,9 +90,19 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # The full-text search objects are created by hand in their migration and
+    # are not part of the models' metadata; autogenerate must not drop them.
+    def include_object(object, name, type_, reflected, compare_to):
+        if type_ == 'table' and name.startswith('analysis_results_fts'):
+            return False
+        if type_ == 'index' and name == 'ix_analysis_results_source_text_ft':
+            return False
+        return True
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
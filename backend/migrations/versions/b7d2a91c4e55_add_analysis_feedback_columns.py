@@ -0,0 +1,30 @@
+"""add analysis feedback columns
+
+Revision ID: b7d2a91c4e55
+Revises: 4cf23c07c2b1
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2a91c4e55'
+down_revision = '4cf23c07c2b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('analysis_results') as batch_op:
+        batch_op.add_column(sa.Column('corrected_label', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('corrected_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_analysis_results_corrected_at_id', ['corrected_at', 'id'])
+
+
+def downgrade():
+    with op.batch_alter_table('analysis_results') as batch_op:
+        batch_op.drop_index('ix_analysis_results_corrected_at_id')
+        batch_op.drop_column('corrected_at')
+        batch_op.drop_column('corrected_label')
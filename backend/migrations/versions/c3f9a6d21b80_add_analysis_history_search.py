@@ -0,0 +1,72 @@
+"""add analysis history search
+
+Revision ID: c3f9a6d21b80
+Revises: b7d2a91c4e55
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f9a6d21b80'
+down_revision = 'b7d2a91c4e55'
+branch_labels = None
+depends_on = None
+
+# External-content FTS5 table: the text is stored once, in analysis_results,
+# and the triggers keep the index in step with every INSERT/UPDATE/DELETE,
+# including the bulk inserts. A later batch_alter_table that recreates
+# analysis_results on SQLite drops these triggers and must create them again.
+SQLITE_FTS_UPGRADE = (
+    "CREATE VIRTUAL TABLE analysis_results_fts USING fts5("
+    "source_text, content='analysis_results', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "INSERT INTO analysis_results_fts(analysis_results_fts) VALUES ('rebuild')",
+    "CREATE TRIGGER analysis_results_fts_ai AFTER INSERT ON analysis_results BEGIN "
+    "INSERT INTO analysis_results_fts(rowid, source_text) VALUES (new.id, new.source_text); END",
+    "CREATE TRIGGER analysis_results_fts_ad AFTER DELETE ON analysis_results BEGIN "
+    "INSERT INTO analysis_results_fts(analysis_results_fts, rowid, source_text) "
+    "VALUES ('delete', old.id, old.source_text); END",
+    "CREATE TRIGGER analysis_results_fts_au AFTER UPDATE OF source_text ON analysis_results BEGIN "
+    "INSERT INTO analysis_results_fts(analysis_results_fts, rowid, source_text) "
+    "VALUES ('delete', old.id, old.source_text); "
+    "INSERT INTO analysis_results_fts(rowid, source_text) VALUES (new.id, new.source_text); END",
+)
+
+SQLITE_FTS_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS analysis_results_fts_au",
+    "DROP TRIGGER IF EXISTS analysis_results_fts_ad",
+    "DROP TRIGGER IF EXISTS analysis_results_fts_ai",
+    "DROP TABLE IF EXISTS analysis_results_fts",
+)
+
+
+def upgrade():
+    with op.batch_alter_table('analysis_results') as batch_op:
+        batch_op.create_index('ix_analysis_results_user_created_id', ['user_id', 'created_at', 'id'])
+        batch_op.create_index(
+            'ix_analysis_results_user_label_created_id', ['user_id', 'sentiment_label', 'created_at', 'id']
+        )
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_FTS_UPGRADE:
+            op.execute(sa.text(statement))
+    elif dialect in ('mysql', 'mariadb'):
+        op.create_index(
+            'ix_analysis_results_source_text_ft', 'analysis_results', ['source_text'], mysql_prefix='FULLTEXT'
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_FTS_DOWNGRADE:
+            op.execute(sa.text(statement))
+    elif dialect in ('mysql', 'mariadb'):
+        op.drop_index('ix_analysis_results_source_text_ft', table_name='analysis_results')
+
+    with op.batch_alter_table('analysis_results') as batch_op:
+        batch_op.drop_index('ix_analysis_results_user_label_created_id')
+        batch_op.drop_index('ix_analysis_results_user_created_id')
@@ -15,6 +15,17 @@ class AnalysisResult(db.Model):
     summary = db.Column(db.String(255))
     context_data = db.Column(db.JSON)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Label supplied by the user when the prediction was wrong; read by online training.
+    corrected_label = db.Column(db.String(20))
+    corrected_at = db.Column(db.DateTime)
+
+    # The full-text index (FTS5 table on SQLite, FULLTEXT on MySQL) is created by
+    # its migration only; see services.analysis_search.
+    __table_args__ = (
+        db.Index("ix_analysis_results_corrected_at_id", "corrected_at", "id"),
+        db.Index("ix_analysis_results_user_created_id", "user_id", "created_at", "id"),
+        db.Index("ix_analysis_results_user_label_created_id", "user_id", "sentiment_label", "created_at", "id"),
+    )
 
     user = db.relationship("User", back_populates="analyses")
 
@@ -27,4 +38,5 @@ class AnalysisResult(db.Model):
             "summary": self.summary,
             "created_at": self.created_at.isoformat(),
             "context_data": self.context_data,
+            "corrected_label": self.corrected_label,
         }
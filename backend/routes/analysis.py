@@ -1,14 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from http import HTTPStatus
+from pathlib import Path
+from uuid import uuid4
+import atexit
+import os
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request, send_file, url_for
 from flask_jwt_extended import get_jwt_identity, jwt_required
+from werkzeug.utils import secure_filename
 
 from extensions import db
 from models.analysis import AnalysisResult
+from services.analysis_search import HistoryQueryError, detect_search_backend, history_page
+from services.bulk_text import (
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_PENDING,
+    JOB_RUNNING,
+    SUPPORTED_SUFFIXES,
+    BulkTextError,
+    analyze_file,
+    database_writer,
+    job_abandoned,
+    read_job_status,
+    remove_job,
+    sweep_jobs,
+    write_job_status,
+)
 from services.ia_service import TextSentimentService
+from services.text_segments import SENTENCE
 
 analysis_bp = Blueprint("analysis", __name__)
-sentiment_service = TextSentimentService()
+
+
+@analysis_bp.record_once
+def _load_sentiment_model(state) -> None:
+    # Load the published model when the app starts, not on the first request.
+    config = state.app.config
+    service = TextSentimentService(
+        model_dir=config.get("SENTIMENT_MODEL_DIR"),
+        reload_interval=config.get("SENTIMENT_MODEL_RELOAD_SECONDS", 30.0),
+        cache_size=config.get("SENTIMENT_CACHE_SIZE", 10000),
+    )
+    version = service.warm_up()
+    if version:
+        state.app.logger.info("Modelo de sentimiento activo: %s", version)
+    state.app.extensions["sentiment_service"] = service
+
+
+def _get_sentiment_service() -> TextSentimentService:
+    return current_app.extensions["sentiment_service"]
+
 
 def _current_user_id():
     identity = get_jwt_identity()
@@ -24,14 +67,30 @@ def analyze_text():
     payload = request.get_json(force=True) or {}
     source_text = (payload.get("text") or "").strip()
     channel = payload.get("channel", "manual")
+    mode = payload.get("mode", "auto")
 
     if not source_text:
         return jsonify({"message": "The 'text' field is required."}), HTTPStatus.BAD_REQUEST
+    if mode not in {"auto", "text", "document"}:
+        return jsonify({"message": "The 'mode' field must be auto, text or document."}), HTTPStatus.BAD_REQUEST
 
     user_id = _current_user_id()
+    config = current_app.config
+    as_document = mode == "document" or (
+        mode == "auto" and len(source_text) >= config.get("SENTIMENT_DOCUMENT_MIN_CHARS", 2000)
+    )
+    context_data = {"channel": channel}
 
     try:
-        ai_result = sentiment_service.analyze(source_text)
+        if as_document:
+            ai_result = _get_sentiment_service().analyze_document(
+                source_text,
+                granularity=payload.get("segment_by", SENTENCE),
+                max_segments=config.get("SENTIMENT_DOCUMENT_MAX_SEGMENTS", 2000),
+            )
+            context_data["document"] = ai_result.details()
+        else:
+            ai_result = _get_sentiment_service().analyze(source_text)
     except ValueError as exc:
         return jsonify({"message": str(exc)}), HTTPStatus.BAD_REQUEST
 
@@ -42,9 +101,327 @@ def analyze_text():
         polarity=ai_result.polarity,
         subjectivity=ai_result.subjectivity,
         summary=ai_result.summary,
-        context_data={"channel": channel},
+        context_data=context_data,
     )
     db.session.add(record)
     db.session.commit()
 
     return jsonify({"analysis": record.to_dict(), "message": "Text analyzed successfully."})
+
+
+@analysis_bp.post("/analyze-text/batch")
+@jwt_required()
+def analyze_text_batch():
+    payload = request.get_json(force=True) or {}
+    texts = payload.get("texts")
+    channel = payload.get("channel", "manual")
+
+    if not isinstance(texts, list) or not texts:
+        return jsonify({"message": "The 'texts' field must be a non-empty list."}), HTTPStatus.BAD_REQUEST
+    max_texts = current_app.config.get("ANALYSIS_BATCH_MAX_TEXTS", 5000)
+    if len(texts) > max_texts:
+        return (
+            jsonify({"message": f"A batch accepts at most {max_texts} texts."}),
+            HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+        )
+
+    source_texts = [text.strip() if isinstance(text, str) else "" for text in texts]
+    invalid = [index for index, text in enumerate(source_texts) if not text]
+    if invalid:
+        return (
+            jsonify({"message": "Every item in 'texts' must be a non-empty string.", "invalid_indexes": invalid[:50]}),
+            HTTPStatus.BAD_REQUEST,
+        )
+
+    user_id = _current_user_id()
+    try:
+        ai_results = _get_sentiment_service().analyze_many(source_texts)
+    except ValueError as exc:
+        return jsonify({"message": str(exc)}), HTTPStatus.BAD_REQUEST
+
+    records = [
+        AnalysisResult(
+            user_id=user_id,
+            source_text=source_text,
+            sentiment_label=ai_result.label,
+            polarity=ai_result.polarity,
+            subjectivity=ai_result.subjectivity,
+            summary=ai_result.summary,
+            context_data={"channel": channel},
+        )
+        for source_text, ai_result in zip(source_texts, ai_results)
+    ]
+    # One transaction for the whole batch; the ORM groups the rows into multi-row INSERTs.
+    db.session.add_all(records)
+    db.session.commit()
+
+    return jsonify(
+        {
+            "analyses": [record.to_dict() for record in records],
+            "count": len(records),
+            "message": "Texts analyzed successfully.",
+        }
+    )
+
+
+@analysis_bp.get("/analyze-text/stats")
+@jwt_required()
+def analyze_text_stats():
+    service = _get_sentiment_service()
+    return jsonify({"model_version": service.model_version, "cache": service.cache_stats()})
+
+
+def _get_search_backend() -> str:
+    backend = current_app.extensions.get("analysis_search_backend")
+    if backend is None:
+        with db.engine.connect() as connection:
+            backend = detect_search_backend(connection)
+        current_app.extensions["analysis_search_backend"] = backend
+    return backend
+
+
+def _parse_history_date(value, *, end: bool = False):
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError as exc:
+        raise HistoryQueryError("Dates must use the ISO format (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS).") from exc
+    # A bare date as the upper bound includes that whole day.
+    return parsed + timedelta(days=1) if end and len(value) == 10 else parsed
+
+
+@analysis_bp.get("/analyze-text/history")
+@jwt_required()
+def analysis_history():
+    args = request.args
+    labels = [label.strip().lower() for label in args.get("label", "").split(",") if label.strip()]
+    unknown = sorted(set(labels) - set(_get_sentiment_service().classes))
+    if unknown:
+        return jsonify({"message": f"Unknown label: {', '.join(unknown)}."}), HTTPStatus.BAD_REQUEST
+    max_limit = current_app.config.get("ANALYSIS_HISTORY_MAX_LIMIT", 100)
+    limit = min(max(args.get("limit", 20, type=int), 1), max_limit)
+    backend = _get_search_backend()
+
+    try:
+        page = history_page(
+            _current_user_id(),
+            backend=backend,
+            query=args.get("q", "").strip() or None,
+            labels=labels,
+            date_from=_parse_history_date(args.get("from")),
+            date_to=_parse_history_date(args.get("to"), end=True),
+            cursor=args.get("cursor") or None,
+            limit=limit,
+        )
+    except HistoryQueryError as exc:
+        return jsonify({"message": str(exc)}), HTTPStatus.BAD_REQUEST
+
+    return jsonify(
+        {
+            "analyses": [{**record.to_dict(), "source_text": record.source_text} for record in page.records],
+            "next_cursor": page.next_cursor,
+            "search_backend": backend,
+        }
+    )
+
+
+@analysis_bp.post("/analyze-text/<int:analysis_id>/feedback")
+@jwt_required()
+def analysis_feedback(analysis_id: int):
+    payload = request.get_json(force=True) or {}
+    label = (payload.get("label") or "").strip().lower()
+    classes = _get_sentiment_service().classes
+    if label not in classes:
+        return (
+            jsonify({"message": f"The 'label' field must be one of: {', '.join(classes)}."}),
+            HTTPStatus.BAD_REQUEST,
+        )
+
+    record = AnalysisResult.query.filter_by(id=analysis_id, user_id=_current_user_id()).first()
+    if record is None:
+        return jsonify({"message": "Analysis not found."}), HTTPStatus.NOT_FOUND
+
+    record.corrected_label = label
+    record.corrected_at = datetime.utcnow()
+    db.session.commit()
+    return jsonify({"analysis": record.to_dict(), "message": "Feedback saved."})
+
+
+def _get_bulk_executor() -> ThreadPoolExecutor:
+    executor = current_app.extensions.get("bulk_text_executor")
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, current_app.config.get("BULK_TEXT_JOBS", 1)), thread_name_prefix="bulk-text"
+        )
+        current_app.extensions["bulk_text_executor"] = executor
+        atexit.register(executor.shutdown)
+    return executor
+
+
+def _bulk_job_dir(job_id: str) -> Path:
+    return Path(current_app.config["BULK_TEXT_DIR"]) / secure_filename(job_id)
+
+
+def _run_bulk_job(app, job_dir: Path, status: dict, source: Path, options: dict) -> None:
+    def report(progress) -> None:
+        status["progress"] = progress.to_dict()
+        write_job_status(job_dir, status)
+
+    on_chunk = options["on_chunk"]
+    if on_chunk is not None:
+        write_rows = on_chunk
+
+        # Each chunk is committed on its own, so the status says how many rows
+        # are already in the history if the job fails part-way through.
+        def on_chunk(texts, payloads) -> None:
+            write_rows(texts, payloads)
+            status["rows_saved"] += len(texts)
+
+    with app.app_context():
+        status["status"] = JOB_RUNNING
+        write_job_status(job_dir, status)
+        try:
+            progress = analyze_file(
+                source,
+                job_dir / status["result_file"],
+                service=app.extensions["sentiment_service"],
+                model_dir=app.config.get("SENTIMENT_MODEL_DIR"),
+                text_field=options["text_field"],
+                chunk_size=app.config.get("BULK_TEXT_CHUNK_SIZE", 2000),
+                workers=app.config.get("BULK_TEXT_WORKERS", 1),
+                on_chunk=on_chunk,
+                on_progress=report,
+            )
+        except BulkTextError as exc:
+            db.session.rollback()
+            status.update(status=JOB_FAILED, error=str(exc))
+        except Exception:  # pragma: no cover - the job outlives the request, report it
+            db.session.rollback()
+            app.logger.exception("Bulk text job %s failed", job_dir.name)
+            status.update(status=JOB_FAILED, error="Processing failed.")
+        else:
+            status.update(status=JOB_DONE, progress=progress.to_dict())
+        finally:
+            # The uploaded file is only needed while it is being read.
+            source.unlink(missing_ok=True)
+        write_job_status(job_dir, status)
+
+
+def _bulk_stale_seconds() -> float:
+    return current_app.config.get("BULK_TEXT_STALE_MINUTES", 30) * 60
+
+
+@analysis_bp.post("/analyze-text/bulk")
+@jwt_required()
+def analyze_text_bulk():
+    upload = request.files.get("file")
+    if upload is None or not upload.filename:
+        return jsonify({"message": "A CSV or JSONL 'file' is required."}), HTTPStatus.BAD_REQUEST
+    suffix = Path(upload.filename).suffix.lower()
+    if suffix not in SUPPORTED_SUFFIXES:
+        return jsonify({"message": "The file must be CSV or JSONL."}), HTTPStatus.BAD_REQUEST
+
+    text_field = request.form.get("text_field", "text")
+    channel = request.form.get("channel", "bulk")
+    persist = request.form.get("persist", "true").lower() not in {"0", "false", "no"}
+    user_id = _current_user_id()
+
+    config = current_app.config
+    removed = sweep_jobs(
+        Path(config["BULK_TEXT_DIR"]), config.get("BULK_TEXT_RETENTION_HOURS", 72) * 3600, _bulk_stale_seconds()
+    )
+    if removed:
+        current_app.logger.info("Se eliminaron %s trabajos de análisis masivo vencidos", removed)
+
+    job_id = uuid4().hex
+    job_dir = _bulk_job_dir(job_id)
+    job_dir.mkdir(parents=True, exist_ok=True)
+    source = job_dir / f"input{suffix}"
+    upload.save(source)
+
+    status = {
+        "job_id": job_id,
+        "user_id": user_id,
+        "pid": os.getpid(),
+        "status": JOB_PENDING,
+        "source_file": secure_filename(upload.filename),
+        "result_file": f"results{suffix}",
+        "persist": persist,
+        "rows_saved": 0 if persist else None,
+        "progress": None,
+        "error": None,
+    }
+    write_job_status(job_dir, status)
+    options = {
+        "text_field": text_field,
+        "on_chunk": database_writer(user_id, channel, status["source_file"]) if persist else None,
+    }
+    _get_bulk_executor().submit(
+        _run_bulk_job, current_app._get_current_object(), job_dir, status, source, options
+    )
+    return (
+        jsonify(
+            {
+                "job_id": job_id,
+                "status": JOB_PENDING,
+                "status_url": url_for("analysis.analyze_text_bulk_status", job_id=job_id),
+                "message": "Bulk analysis started.",
+            }
+        ),
+        HTTPStatus.ACCEPTED,
+    )
+
+
+def _owned_bulk_status(job_id: str):
+    job_dir = _bulk_job_dir(job_id)
+    status = read_job_status(job_dir)
+    if status is None or status.get("user_id") != _current_user_id():
+        return None
+    if job_abandoned(job_dir, status, _bulk_stale_seconds()):
+        # The process running it died or hung; report it once as failed so the
+        # job can be deleted and is swept with the other finished ones.
+        status.update(status=JOB_FAILED, error="The job was interrupted before it finished.")
+        write_job_status(job_dir, status)
+    return status
+
+
+@analysis_bp.get("/analyze-text/bulk/<job_id>")
+@jwt_required()
+def analyze_text_bulk_status(job_id: str):
+    status = _owned_bulk_status(job_id)
+    if status is None:
+        return jsonify({"message": "Bulk job not found."}), HTTPStatus.NOT_FOUND
+    status.pop("user_id", None)
+    status.pop("pid", None)
+    if status["status"] == JOB_DONE:
+        status["results_url"] = url_for("analysis.analyze_text_bulk_results", job_id=job_id)
+        return jsonify(status)
+    if status["status"] == JOB_FAILED:
+        # The poll itself succeeded; the failure is part of the job's state.
+        return jsonify(status)
+    return jsonify(status), HTTPStatus.ACCEPTED
+
+
+@analysis_bp.get("/analyze-text/bulk/<job_id>/results")
+@jwt_required()
+def analyze_text_bulk_results(job_id: str):
+    status = _owned_bulk_status(job_id)
+    if status is None or status["status"] != JOB_DONE:
+        return jsonify({"message": "Bulk results not available."}), HTTPStatus.NOT_FOUND
+    result_name = f"{Path(status['source_file']).stem}.sentiment{Path(status['result_file']).suffix}"
+    return send_file(
+        _bulk_job_dir(job_id) / status["result_file"], as_attachment=True, download_name=result_name
+    )
+
+
+@analysis_bp.delete("/analyze-text/bulk/<job_id>")
+@jwt_required()
+def delete_bulk_job(job_id: str):
+    status = _owned_bulk_status(job_id)
+    if status is None:
+        return jsonify({"message": "Bulk job not found."}), HTTPStatus.NOT_FOUND
+    if status["status"] not in (JOB_DONE, JOB_FAILED):
+        return jsonify({"message": "The bulk job is still running."}), HTTPStatus.CONFLICT
+    remove_job(_bulk_job_dir(job_id))
+    return jsonify({"message": "Bulk job deleted."})
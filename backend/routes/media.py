@@ -2,19 +2,26 @@ from __future__ import annotations
 
 from http import HTTPStatus
 from pathlib import Path
-import tempfile
+import atexit
+import json
+import time
 from uuid import uuid4
 
 import cv2
 import numpy as np
-from flask import Blueprint, abort, current_app, jsonify, request, send_file, url_for
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask import Blueprint, Response, abort, current_app, jsonify, request, send_file, url_for
+from flask_jwt_extended import decode_token, get_jwt_identity, jwt_required
 from sqlalchemy import or_
 
-from extensions import db
+from extensions import db, sock
 from models.media import MediaAnalysis, MediaEmotionCount
-from services.live_session import LiveSessionManager, LiveSessionError, LiveSessionSummary
+from services.chunked_upload import ChunkedUploadError, ChunkedUploadManager, ChunkInProgressError, ChunkOffsetError
+from services.frame_broadcast import MJPEG_BOUNDARY
+from services.live_session import LiveSessionManager, LiveSessionError, LiveSessionSummary, segment_dir_for
 from services.media_service import MediaEmotionAnalyzer, MediaStorage
+from services.memory_staging import MemoryStagingArea, StagingLimitError, StagingUnavailableError
+from services.session_store import FINALIZATION_DONE, FINALIZATION_FAILED, build_session_store
+from services.session_timeline import read_timeline_slice, timeline_pending
 
 media_bp = Blueprint("media", __name__)
 analyzer = MediaEmotionAnalyzer()
@@ -26,6 +33,7 @@ SOURCE_ALIAS_MAP = {
     "image": ["image-upload"],
     "video": ["video-upload"],
 }
+TIMELINE_SLICE_MAX_FRAMES = 10000
 
 
 def _build_storage() -> MediaStorage:
@@ -47,11 +55,91 @@ def _get_live_session_manager() -> LiveSessionManager:
             labels=analyzer.labels,
             snapshot_interval=config.get("SESSION_SNAPSHOT_INTERVAL", 5),
             video_fps=config.get("SESSION_VIDEO_FPS", 12),
+            segment_seconds=config.get("SESSION_SEGMENT_SECONDS", 10),
+            encoder_queue_size=config.get("SESSION_ENCODER_QUEUE_SIZE", 24),
+            encoder_drop_policy=config.get("SESSION_ENCODER_DROP_POLICY", "oldest"),
+            pacing={
+                "target_ms": config.get("LIVE_SESSION_LATENCY_TARGET_MS", 250),
+                "min_interval_ms": config.get("LIVE_SESSION_MIN_INTERVAL_MS", 100),
+                "max_interval_ms": config.get("LIVE_SESSION_MAX_INTERVAL_MS", 2000),
+                "max_width": config.get("LIVE_SESSION_MAX_FRAME_WIDTH", 1280),
+            },
+            temporal_cache={
+                "threshold": config.get("LIVE_SESSION_SKIP_THRESHOLD", 4.0),
+                "refresh_frames": config.get("LIVE_SESSION_REFRESH_FRAMES", 10),
+            },
+            face_tracking={
+                "margin": config.get("LIVE_SESSION_ROI_MARGIN", 0.5),
+                "full_scan_every": config.get("LIVE_SESSION_FULL_SCAN_FRAMES", 15),
+            },
+            stat_windows=config.get("LIVE_SESSION_STAT_WINDOWS", (10.0, 60.0)),
+            snapshot_hash_distance=config.get("SESSION_SNAPSHOT_HASH_DISTANCE", 6),
+            store=build_session_store(
+                config.get("LIVE_SESSION_STORE", "memory"),
+                Path(config.get("LIVE_SESSION_STORE_PATH")).resolve(),
+            ),
+            poll_interval=config.get("LIVE_SESSION_POLL_SECONDS", 1.0),
+            idle_timeout=config.get("LIVE_SESSION_IDLE_TIMEOUT", 120),
+            memory_budget_bytes=config.get("LIVE_SESSION_MEMORY_BUDGET_BYTES", 256 * 1024 * 1024),
+            on_session_finalized=_finalized_session_persister(current_app._get_current_object()),
+            finalizer_workers=config.get("LIVE_SESSION_FINALIZER_WORKERS", 2),
         )
         current_app.extensions["live_session_manager"] = manager
+        # Graceful shutdown waits for sessions still being finalized.
+        atexit.register(manager.shutdown)
+    return manager
+
+
+def _finalized_session_persister(app):
+    """Callback run on the finalizer executor once a stopped session is closed."""
+
+    def _persist(summary: LiveSessionSummary) -> dict:
+        with app.app_context():
+            analysis_ids = [record.id for record in _persist_live_session_summary(summary)]
+        return {
+            "analysis_ids": analysis_ids,
+            "counts": summary.counts,
+            "dominant_emotion": summary.dominant_emotion,
+            "confidence": summary.confidence,
+            "duration_seconds": summary.duration_seconds,
+            "frames": summary.frames,
+            "snapshot_path": summary.snapshot_relative,
+            "stream_path": summary.stream_relative,
+            "encoder": summary.encoder_stats,
+        }
+
+    return _persist
+
+
+def _get_chunked_upload_manager() -> ChunkedUploadManager:
+    manager = current_app.extensions.get("chunked_upload_manager")
+    if manager is None:
+        config = current_app.config
+        manager = ChunkedUploadManager(
+            analyzer=analyzer,
+            chunk_max_bytes=config.get("MEDIA_UPLOAD_CHUNK_MAX_BYTES", 8 * 1024 * 1024),
+            analyze_min_bytes=config.get("MEDIA_UPLOAD_ANALYZE_MIN_BYTES", 512 * 1024),
+            workers=config.get("MEDIA_UPLOAD_WORKERS", 2),
+            idle_timeout=config.get("MEDIA_UPLOAD_IDLE_TIMEOUT", 3600),
+        )
+        current_app.extensions["chunked_upload_manager"] = manager
     return manager
 
 
+def _get_preview_staging() -> MemoryStagingArea:
+    staging = current_app.extensions.get("preview_staging")
+    if staging is None:
+        config = current_app.config
+        staging = MemoryStagingArea(
+            max_item_bytes=config.get("PREVIEW_STAGING_MAX_ITEM_BYTES", 64 * 1024 * 1024),
+            max_total_bytes=config.get("PREVIEW_STAGING_MAX_TOTAL_BYTES", 256 * 1024 * 1024),
+            tmpfs_dir=config.get("PREVIEW_STAGING_DIR", "/dev/shm"),
+            allow_disk=config.get("PREVIEW_STAGING_ALLOW_DISK", False),
+        )
+        current_app.extensions["preview_staging"] = staging
+    return staging
+
+
 def _payload_from_request() -> dict:
     if request.is_json:
         return request.get_json(silent=True) or {}
@@ -61,11 +149,15 @@ def _payload_from_request() -> dict:
 def _decode_image_from_upload(upload) -> np.ndarray:
     upload.stream.seek(0)
     data = upload.read()
+    upload.stream.seek(0)
+    return _decode_image_bytes(data)
+
+
+def _decode_image_bytes(data: bytes) -> np.ndarray:
     if not data:
         raise ValueError("El fotograma recibido está vacío.")
     array = np.frombuffer(data, dtype=np.uint8)
     frame = cv2.imdecode(array, cv2.IMREAD_COLOR)
-    upload.stream.seek(0)
     if frame is None or frame.size == 0:
         raise ValueError("El fotograma recibido no es una imagen válida.")
     return frame
@@ -188,13 +280,13 @@ def _build_detection_payload(
     return payload
 
 
-def _persist_live_session_summary(summary: LiveSessionSummary) -> dict | None:
+def _persist_live_session_summary(summary: LiveSessionSummary) -> list[MediaAnalysis]:
     if summary.frames == 0 or not summary.stream_relative:
-        return None
+        return []
 
     counts = summary.counts or {}
     if not counts:
-        return None
+        return []
 
     snapshots = summary.emotion_snapshots or {}
     confidences = summary.emotion_confidences or {}
@@ -219,6 +311,12 @@ def _persist_live_session_summary(summary: LiveSessionSummary) -> dict | None:
                 "session_id": summary.session_id,
                 "duration_seconds": summary.duration_seconds,
                 "frames": summary.frames,
+                "stream_segments": summary.stream_segments_relative,
+                "timeline": (
+                    {"path": summary.timeline_relative, "labels": summary.timeline_labels}
+                    if summary.timeline_relative
+                    else None
+                ),
             },
         )
         record = MediaAnalysis(
@@ -242,17 +340,16 @@ def _persist_live_session_summary(summary: LiveSessionSummary) -> dict | None:
         records.append(record)
 
     if not records:
-        return None
+        return []
 
     db.session.add_all(records)
     try:
         db.session.commit()
-    except Exception as exc:  # pragma: no cover - safeguard
+    except Exception:
         db.session.rollback()
-        current_app.logger.exception("No se pudo guardar la sesión en vivo", exc_info=exc)
-        return None
+        raise
 
-    return [_serialize_record(record) for record in records]
+    return records
 
 
 def _process_media_upload(media_type: str, source_type: str, channel: str, upload):
@@ -274,21 +371,46 @@ def _process_media_upload(media_type: str, source_type: str, channel: str, uploa
 
     try:
         summary = analysis_fn(raw_path)
-    except FileNotFoundError as exc:
-        raw_path.unlink(missing_ok=True)
+    except Exception as exc:
+        return _analysis_failure_response(exc, raw_path)
+
+    return _persist_media_summary(
+        summary,
+        storage,
+        media_type=media_type,
+        source_type=source_type,
+        channel=channel,
+        original_filename=upload.filename,
+        raw_path=raw_path,
+        relative_raw=relative_raw,
+    )
+
+
+def _analysis_failure_response(exc: Exception, raw_path: Path):
+    raw_path.unlink(missing_ok=True)
+    if isinstance(exc, FileNotFoundError):
         current_app.logger.exception("Modelo o recursos no encontrados", exc_info=exc)
         return (
             jsonify({"message": "Modelo de emociones no disponible. Verifique los archivos en 'tracked/'."}),
             HTTPStatus.INTERNAL_SERVER_ERROR,
         )
-    except ValueError as exc:
-        raw_path.unlink(missing_ok=True)
+    if isinstance(exc, ValueError):
         return jsonify({"message": str(exc)}), HTTPStatus.BAD_REQUEST
-    except Exception as exc:  # pragma: no cover - safeguard
-        raw_path.unlink(missing_ok=True)
-        current_app.logger.exception("Falla inesperada al analizar multimedia", exc_info=exc)
-        return jsonify({"message": "Error interno al procesar el archivo."}), HTTPStatus.INTERNAL_SERVER_ERROR
-
+    current_app.logger.exception("Falla inesperada al analizar multimedia", exc_info=exc)
+    return jsonify({"message": "Error interno al procesar el archivo."}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def _persist_media_summary(
+    summary: dict,
+    storage: MediaStorage,
+    *,
+    media_type: str,
+    source_type: str,
+    channel: str,
+    original_filename: str | None,
+    raw_path: Path,
+    relative_raw: str,
+):
     dominant_face = summary.pop("dominant_face", None)
     annotated_frame = summary.pop("annotated_frame", None)
     emotion_faces = summary.pop("emotion_faces", {}) or {}
@@ -345,7 +467,7 @@ def _process_media_upload(media_type: str, source_type: str, channel: str, uploa
                 media_type=media_type,
                 source_type=source_type,
                 channel=channel or "manual",
-                original_filename=upload.filename,
+                original_filename=original_filename,
                 original_path=relative_raw,
                 snapshot_path=relative_snapshot,
                 dominant_emotion=label,
@@ -393,33 +515,6 @@ def _process_media_upload(media_type: str, source_type: str, channel: str, uploa
     return jsonify(payload), HTTPStatus.CREATED
 
 
-def _analyze_preview_media(media_type: str, upload):
-    if upload is None:
-        return (
-            jsonify({"message": "Se requiere el archivo 'file' en la solicitud."}),
-            HTTPStatus.BAD_REQUEST,
-        )
-
-    if media_type == "image":
-        frame = _decode_image_from_upload(upload)
-        summary = analyzer.analyze_array(frame)
-        return summary, frame
-
-    suffix = ".mp4"
-    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    temp_name = tmp_file.name
-    tmp_file.close()
-    upload.save(temp_name)
-    temp_path = Path(temp_name)
-
-    try:
-        summary = analyzer.analyze_video(temp_path, max_frames=90, sample_rate=6)
-    finally:
-        temp_path.unlink(missing_ok=True)
-
-    return summary, None
-
-
 @media_bp.get("/media/model-metadata")
 @jwt_required(optional=True)
 def model_metadata():
@@ -427,9 +522,52 @@ def model_metadata():
     metadata["storage_root"] = current_app.config.get("MEDIA_STORAGE_ROOT")
     metadata["raw_subdir"] = current_app.config.get("MEDIA_RAW_SUBDIR")
     metadata["snapshot_subdir"] = current_app.config.get("MEDIA_SNAPSHOT_SUBDIR")
+    metadata["preview_staging"] = _get_preview_staging().stats()
     return jsonify(metadata)
 
 
+@media_bp.post("/media/preview-video")
+@jwt_required()
+def preview_video():
+    """Analyze a short clip without storing it: the bytes only live in the preview staging area.
+
+    The clip is the raw request body (``?filename=`` gives its extension). A
+    multipart form would make Werkzeug spool it to a temporary file on disk
+    first, so it is read from ``request.stream`` straight into staging.
+    """
+    if request.mimetype.startswith("multipart/"):
+        return (
+            jsonify({"message": "Envía el video como cuerpo binario con ?filename=<nombre>."}),
+            HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+        )
+    filename = request.args.get("filename", "")
+    if not _is_allowed(filename, "video"):
+        return jsonify({"message": "Formato de video no permitido."}), HTTPStatus.BAD_REQUEST
+
+    suffix = f".{filename.rsplit('.', 1)[1].lower()}"
+    try:
+        with _get_preview_staging().stage(
+            request.stream, suffix=suffix, size_hint=request.content_length or None
+        ) as staged_path:
+            if staged_path.stat().st_size == 0:
+                return jsonify({"message": "El cuerpo de la solicitud está vacío."}), HTTPStatus.BAD_REQUEST
+            summary = analyzer.analyze_video(staged_path, max_frames=90, sample_rate=6)
+    except StagingLimitError as exc:
+        return jsonify({"message": str(exc)}), HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    except StagingUnavailableError as exc:
+        return jsonify({"message": str(exc)}), HTTPStatus.SERVICE_UNAVAILABLE
+    except FileNotFoundError as exc:
+        current_app.logger.exception("Modelo no disponible para vista previa", exc_info=exc)
+        return (
+            jsonify({"message": "Modelo de emociones no disponible para vista previa."}),
+            HTTPStatus.INTERNAL_SERVER_ERROR,
+        )
+    except ValueError as exc:
+        return jsonify({"message": str(exc)}), HTTPStatus.BAD_REQUEST
+
+    return jsonify(_live_frame_payload(summary, None, None))
+
+
 @media_bp.post("/media/analyze")
 @jwt_required()
 def analyze_media():
@@ -476,6 +614,108 @@ def analyze_webcam_capture():
     return _process_media_upload("video", "webcam", channel, upload)
 
 
+@media_bp.post("/media/uploads")
+@jwt_required()
+def start_chunked_upload():
+    payload = request.get_json(silent=True) or {}
+    media_type = (payload.get("media_type") or "video").lower()
+    if media_type not in {"image", "video"}:
+        return jsonify({"message": "El parámetro 'media_type' debe ser 'image' o 'video'."}), HTTPStatus.BAD_REQUEST
+
+    filename = (payload.get("filename") or "").strip()
+    if not _is_allowed(filename, media_type):
+        return (
+            jsonify({"message": "Formato de archivo no soportado para este tipo de medio."}),
+            HTTPStatus.BAD_REQUEST,
+        )
+
+    default_source = "image-upload" if media_type == "image" else "video-upload"
+    source_type = (payload.get("source_type") or default_source).lower()
+    channel = payload.get("channel", "manual")
+
+    manager = _get_chunked_upload_manager()
+    storage = _build_storage()
+    raw_path, relative_raw = storage.reserve_raw(f"{uuid4().hex[:8]}_{filename}", source_type)
+    upload = manager.start_upload(
+        user_id=_current_user_id(),
+        media_type=media_type,
+        source_type=source_type,
+        channel=channel,
+        original_filename=filename,
+        raw_path=raw_path,
+        relative_raw=relative_raw,
+    )
+    response = upload.to_dict()
+    response["chunk_max_bytes"] = manager.chunk_max_bytes
+    return jsonify(response), HTTPStatus.CREATED
+
+
+@media_bp.get("/media/uploads/<upload_id>")
+@jwt_required()
+def chunked_upload_status(upload_id: str):
+    manager = _get_chunked_upload_manager()
+    try:
+        upload = manager.get_upload(upload_id, _current_user_id())
+    except ChunkedUploadError as exc:
+        return jsonify({"message": str(exc)}), HTTPStatus.NOT_FOUND
+    return jsonify(upload.to_dict())
+
+
+@media_bp.put("/media/uploads/<upload_id>")
+@jwt_required()
+def append_chunked_upload(upload_id: str):
+    """Append the raw request body at ``offset``; ``final=1`` closes the upload."""
+    raw_offset = request.args.get("offset", request.headers.get("Upload-Offset", "0"))
+    try:
+        offset = int(raw_offset)
+    except (TypeError, ValueError):
+        return jsonify({"message": "El parámetro 'offset' debe ser numérico."}), HTTPStatus.BAD_REQUEST
+    is_final = (request.args.get("final") or "").lower() in {"1", "true", "yes"}
+
+    manager = _get_chunked_upload_manager()
+    user_id = _current_user_id()
+    try:
+        upload = manager.append_chunk(upload_id, user_id, request.stream, offset)
+    except ChunkOffsetError as exc:
+        return jsonify({"message": str(exc), "offset": exc.expected_offset}), HTTPStatus.CONFLICT
+    except ChunkInProgressError as exc:
+        return jsonify({"message": str(exc)}), HTTPStatus.CONFLICT
+    except ChunkedUploadError as exc:
+        return jsonify({"message": str(exc)}), HTTPStatus.BAD_REQUEST
+
+    if not is_final:
+        return jsonify(upload.to_dict())
+
+    try:
+        upload, summary = manager.complete_upload(upload_id, user_id)
+    except ChunkedUploadError as exc:
+        return jsonify({"message": str(exc)}), HTTPStatus.BAD_REQUEST
+    except Exception as exc:
+        return _analysis_failure_response(exc, upload.raw_path)
+
+    return _persist_media_summary(
+        summary,
+        _build_storage(),
+        media_type=upload.media_type,
+        source_type=upload.source_type,
+        channel=upload.channel,
+        original_filename=upload.original_filename,
+        raw_path=upload.raw_path,
+        relative_raw=upload.relative_raw,
+    )
+
+
+@media_bp.delete("/media/uploads/<upload_id>")
+@jwt_required()
+def abort_chunked_upload(upload_id: str):
+    manager = _get_chunked_upload_manager()
+    try:
+        manager.abort_upload(upload_id, _current_user_id())
+    except ChunkedUploadError as exc:
+        return jsonify({"message": str(exc)}), HTTPStatus.NOT_FOUND
+    return jsonify({"upload_id": upload_id, "message": "Carga cancelada."})
+
+
 @media_bp.post("/media/live-session/start")
 @jwt_required()
 def start_live_session():
@@ -496,27 +736,77 @@ def stop_live_session():
 
     manager = _get_live_session_manager()
     try:
-        summary = manager.stop_session(session_id)
+        provisional = manager.stop_session(session_id)
     except LiveSessionError as exc:
         return jsonify({"message": str(exc)}), HTTPStatus.NOT_FOUND
 
-    records = _persist_live_session_summary(summary) or []
+    provisional["provisional"] = True
+    provisional["status_url"] = url_for(
+        "media.live_session_finalization", finalization_id=provisional["finalization_id"], _external=False
+    )
+    return jsonify(provisional), HTTPStatus.ACCEPTED
+
+
+@media_bp.get("/media/live-session/finalizations/<finalization_id>")
+@jwt_required()
+def live_session_finalization(finalization_id: str):
+    finalization = _get_live_session_manager().get_finalization(finalization_id)
+    user_id = _current_user_id()
+    if finalization is None or finalization["user_id"] != user_id:
+        return jsonify({"message": "Finalización no encontrada."}), HTTPStatus.NOT_FOUND
+
+    status = finalization["status"]
     response = {
-        "session_id": summary.session_id,
-        "counts": summary.counts,
-        "dominant_emotion": summary.dominant_emotion,
-        "confidence": summary.confidence,
-        "duration_seconds": summary.duration_seconds,
-        "frames": summary.frames,
-        "snapshot_path": summary.snapshot_relative,
-        "stream_path": summary.stream_relative,
-        "analyses": records,
+        "finalization_id": finalization_id,
+        "session_id": finalization["session_id"],
+        "status": status,
     }
-    if records:
-        response["analysis"] = records[0]
+    if status == FINALIZATION_FAILED:
+        response["message"] = "No se pudo guardar la sesión en vivo."
+        return jsonify(response), HTTPStatus.INTERNAL_SERVER_ERROR
+    if status != FINALIZATION_DONE:
+        return jsonify(response), HTTPStatus.ACCEPTED
+
+    result = dict(finalization.get("result") or {})
+    analysis_ids = result.pop("analysis_ids", [])
+    records = []
+    if analysis_ids:
+        records = (
+            MediaAnalysis.query.filter(MediaAnalysis.id.in_(analysis_ids), MediaAnalysis.user_id == user_id)
+            .order_by(MediaAnalysis.id)
+            .all()
+        )
+    response.update(result)
+    response["analyses"] = [_serialize_record(record) for record in records]
+    if response["analyses"]:
+        response["analysis"] = response["analyses"][0]
     return jsonify(response)
 
 
+@media_bp.get("/media/live-session/<session_id>/watch")
+@jwt_required(locations=["headers", "query_string"])
+def watch_live_session(session_id: str):
+    manager = _get_live_session_manager()
+    if manager.session_owner(session_id) != _current_user_id():
+        return jsonify({"message": "Sesión en vivo no encontrada o finalizada."}), HTTPStatus.NOT_FOUND
+    try:
+        parts = manager.watch_session(session_id)
+    except LiveSessionError as exc:
+        return jsonify({"message": str(exc)}), HTTPStatus.NOT_FOUND
+    return Response(
+        parts,
+        mimetype=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+
+
+@media_bp.get("/media/live-session/stats")
+@jwt_required()
+def live_session_stats():
+    manager = _get_live_session_manager()
+    return jsonify(manager.memory_report(user_id=_current_user_id()))
+
+
 @media_bp.post("/analyze-webcam-frame")
 @jwt_required()
 def analyze_webcam_frame():
@@ -533,42 +823,112 @@ def analyze_webcam_frame():
             HTTPStatus.BAD_REQUEST,
         )
 
+    session_id = (request.form.get("session_id") or "").strip()
+    slot = None
+    if session_id:
+        try:
+            slot = _get_live_session_manager().admit_frame(session_id)
+        except LiveSessionError as exc:
+            return jsonify({"message": str(exc)}), HTTPStatus.BAD_REQUEST
+        if not slot.admitted:
+            return jsonify(_stale_frame_payload(slot, session_id))
+
+    published = None
+    try:
+        response, published = _analyze_webcam_frame_upload(upload, session_id)
+        return response
+    finally:
+        if slot is not None:
+            slot.release(published)
+
+
+def _analyze_webcam_frame_upload(upload, session_id: str):
+    """Run inference on an uploaded webcam frame; returns the response and the published payload."""
+    started_at = time.monotonic()
     try:
-        summary, raw_frame = _analyze_preview_media("image", upload)
+        summary, raw_frame = _analyze_live_frame(_decode_image_from_upload(upload), session_id)
     except FileNotFoundError as exc:
         current_app.logger.exception("Modelo no disponible para vista previa", exc_info=exc)
         return (
             jsonify({"message": "Modelo de emociones no disponible para vista previa."}),
             HTTPStatus.INTERNAL_SERVER_ERROR,
-        )
+        ), None
     except ValueError as exc:
-        return jsonify({"message": str(exc)}), HTTPStatus.BAD_REQUEST
+        return (jsonify({"message": str(exc)}), HTTPStatus.BAD_REQUEST), None
     except cv2.error as exc:
         current_app.logger.exception("OpenCV error en vista previa de webcam", exc_info=exc)
         return (
-            jsonify({"message": "La cámara envió un fotograma incompatible. Intenta reducir la resolución."}),
+            jsonify({"message": "La cámara envió un fotograma incompatible."}),
             HTTPStatus.BAD_REQUEST,
-        )
+        ), None
+    except LiveSessionError as exc:
+        # The session was stopped or reaped while the client was still posting.
+        return (jsonify({"message": str(exc)}), HTTPStatus.BAD_REQUEST), None
     except Exception as exc:  # pragma: no cover
         current_app.logger.exception("Error en vista previa de webcam", exc_info=exc)
-        return jsonify({"message": "No se pudo analizar el fotograma."}), HTTPStatus.INTERNAL_SERVER_ERROR
+        return (jsonify({"message": "No se pudo analizar el fotograma."}), HTTPStatus.INTERNAL_SERVER_ERROR), None
 
-    session_id = (request.form.get("session_id") or "").strip()
+    try:
+        payload = _live_frame_payload(summary, raw_frame, session_id, started_at)
+    except LiveSessionError as exc:
+        return (jsonify({"message": str(exc)}), HTTPStatus.BAD_REQUEST), None
+    return jsonify(payload), payload
+
+
+def _stale_frame_payload(slot, session_id: str) -> dict:
+    """Answer a frame that lost admission to a newer one with the last published result."""
+    if slot.last_payload is None:
+        return {
+            "dominant_emotion": None,
+            "confidence": 0.0,
+            "counts": {},
+            "detections": [],
+            "stale": True,
+            "session": {"session_id": session_id, "dropped_frames": slot.dropped},
+        }
+    payload = dict(slot.last_payload, stale=True)
+    if payload.get("session"):
+        payload["session"] = dict(payload["session"], dropped_frames=slot.dropped)
+    return payload
+
+
+def _analyze_live_frame(frame: np.ndarray, session_id: str | None) -> tuple[dict, np.ndarray]:
+    """Analyze a webcam frame, clamped to the session's current resolution when it belongs to one."""
+    scale = 1.0
+    cache = tracker = None
+    if session_id:
+        manager = _get_live_session_manager()
+        frame, scale = manager.clamp_frame(session_id, frame)
+        cache = manager.analysis_cache(session_id)
+        tracker = manager.face_tracker(session_id)
+    summary = analyzer.analyze_array(frame, cache=cache, tracker=tracker)
+    if scale != 1.0:
+        # Report boxes in the coordinates of the frame the client sent.
+        for detection in summary.get("detections", []):
+            detection["box"] = [int(round(value * scale)) for value in detection["box"]]
+    return summary, frame
+
+
+def _live_frame_payload(
+    summary: dict,
+    raw_frame: np.ndarray | None,
+    session_id: str | None,
+    started_at: float | None = None,
+) -> dict:
+    """Feed an analyzed webcam frame to its live session and build the response payload."""
     session_payload = None
     annotated_frame = summary.get("annotated_frame")
     if session_id and raw_frame is not None:
         manager = _get_live_session_manager()
-        try:
-            session_payload = manager.process_frame(
-                session_id,
-                raw_frame,
-                summary,
-                annotated_frame,
-                summary.get("dominant_face"),
-                summary.get("emotion_faces"),
-            )
-        except LiveSessionError as exc:
-            return jsonify({"message": str(exc)}), HTTPStatus.BAD_REQUEST
+        session_payload = manager.process_frame(
+            session_id,
+            raw_frame,
+            summary,
+            annotated_frame,
+            summary.get("dominant_face"),
+            summary.get("emotion_faces"),
+            started_at,
+        )
 
     summary.pop("annotated_frame", None)
     summary.pop("dominant_face", None)
@@ -582,7 +942,161 @@ def analyze_webcam_frame():
     }
     if session_payload:
         payload["session"] = session_payload
-    return jsonify(payload)
+    return payload
+
+
+def _compact_frame_payload(payload: dict, labels: list[str]) -> dict:
+    """Socket message for a frame: label indexes instead of names and boxes as flat lists."""
+    label_index = {label: index for index, label in enumerate(labels)}
+    counts = payload.get("counts") or {}
+    message = {
+        "t": "r",
+        "d": label_index.get(payload["dominant_emotion"]),
+        "c": payload["confidence"],
+        "n": [counts.get(label, 0) for label in labels],
+        "b": [
+            [*det["box"], label_index.get(det["label"]), det["confidence"]]
+            for det in payload.get("detections", [])
+        ],
+    }
+    if payload.get("stale"):
+        message["o"] = 1
+    session_payload = payload.get("session")
+    if session_payload:
+        message["f"] = session_payload.get("frames")
+        message["s"] = {
+            "d": label_index.get(session_payload.get("dominant_emotion")),
+            "c": session_payload.get("confidence"),
+            "n": [session_payload.get("counts", {}).get(label, 0) for label in labels],
+            "x": session_payload.get("dropped_frames", 0),
+        }
+        pacing = session_payload.get("pacing")
+        if pacing:
+            message["p"] = [pacing["max_width"], pacing["jpeg_quality"], pacing["interval_ms"]]
+    return message
+
+
+def _socket_user_id(ws):
+    """Authenticate a socket once, from ``?jwt=`` or a first ``{"token": ...}`` message."""
+    token = request.args.get("jwt")
+    if not token:
+        message = ws.receive(timeout=10)
+        token = _socket_token_message(message)
+    return _user_id_from_token(token)
+
+
+def _socket_token_message(message) -> str | None:
+    try:
+        return (json.loads(message) or {}).get("token") if isinstance(message, str) else None
+    except ValueError:
+        return None
+
+
+def _user_id_from_token(token: str | None):
+    """Identity of a valid access token, for transports that cannot use ``jwt_required``."""
+    if not token:
+        return None
+    try:
+        claims = decode_token(token)
+    except Exception:
+        return None
+    if claims.get("type") != "access":
+        return None
+    identity = claims.get(current_app.config.get("JWT_IDENTITY_CLAIM", "sub"))
+    try:
+        return int(identity)
+    except (TypeError, ValueError):
+        return identity
+
+
+def _socket_send(ws, message: dict) -> None:
+    ws.send(json.dumps(message, separators=(",", ":")))
+
+
+def _socket_error(ws, status: HTTPStatus, message: str) -> None:
+    _socket_send(ws, _socket_error_message(status, message))
+
+
+def _socket_error_message(status: HTTPStatus, message: str) -> dict:
+    return {"t": "e", "s": int(status), "m": message}
+
+
+def _socket_frame_reply(session_id: str, data: bytes, labels: list[str]) -> tuple[dict, bool]:
+    """Admit and analyze one socket frame; returns the reply and whether the socket stays open."""
+    manager = _get_live_session_manager()
+    try:
+        slot = manager.admit_frame(session_id)
+    except LiveSessionError as exc:
+        return _socket_error_message(HTTPStatus.GONE, str(exc)), False
+    if not slot.admitted:
+        return _compact_frame_payload(_stale_frame_payload(slot, session_id), labels), True
+
+    payload = None
+    started_at = time.monotonic()
+    try:
+        summary, frame = _analyze_live_frame(_decode_image_bytes(data), session_id)
+        payload = _live_frame_payload(summary, frame, session_id, started_at)
+    except LiveSessionError as exc:
+        return _socket_error_message(HTTPStatus.GONE, str(exc)), False
+    except FileNotFoundError as exc:
+        current_app.logger.exception("Modelo no disponible para la sesión en vivo", exc_info=exc)
+        return _socket_error_message(HTTPStatus.INTERNAL_SERVER_ERROR, "Modelo de emociones no disponible."), False
+    except ValueError as exc:
+        return _socket_error_message(HTTPStatus.BAD_REQUEST, str(exc)), True
+    except cv2.error as exc:
+        current_app.logger.exception("OpenCV error en sesión en vivo", exc_info=exc)
+        return _socket_error_message(HTTPStatus.BAD_REQUEST, "La cámara envió un fotograma incompatible."), True
+    finally:
+        slot.release(payload)
+    return _compact_frame_payload(payload, labels), True
+
+
+def _stale_socket_reply(session_id: str, labels: list[str]) -> dict:
+    """Reply for a socket frame superseded by a newer one queued behind it."""
+    stale = _get_live_session_manager().discard_frame(session_id)
+    return _compact_frame_payload(_stale_frame_payload(stale, session_id), labels)
+
+
+@sock.route("/media/live-session/<session_id>/ws", bp=media_bp)
+def live_session_socket(ws, session_id: str):
+    """Persistent transport for a live session: binary JPEG frames in, compact detections out."""
+    user_id = _socket_user_id(ws)
+    if user_id is None:
+        _socket_error(ws, HTTPStatus.UNAUTHORIZED, "Token inválido o ausente.")
+        return
+    manager = _get_live_session_manager()
+    if manager.session_owner(session_id) != user_id:
+        _socket_error(ws, HTTPStatus.NOT_FOUND, "Sesión en vivo no encontrada o finalizada.")
+        return
+
+    labels = analyzer.labels
+    _socket_send(ws, {"t": "h", "session_id": session_id, "labels": labels})
+    while True:
+        message = ws.receive()
+        if isinstance(message, str):
+            if message == "ping":
+                _socket_send(ws, {"t": "p"})
+            continue
+        if not message:
+            continue
+        try:
+            # Latest frame wins: frames queued behind this one supersede it and
+            # the older ones are answered from the last result.
+            while (newer := ws.receive(timeout=0)) is not None:
+                if isinstance(newer, str):
+                    if newer == "ping":
+                        _socket_send(ws, {"t": "p"})
+                    continue
+                if newer:
+                    _socket_send(ws, _stale_socket_reply(session_id, labels))
+                    message = newer
+        except LiveSessionError as exc:
+            _socket_error(ws, HTTPStatus.GONE, str(exc))
+            return
+        reply, keep_open = _socket_frame_reply(session_id, message, labels)
+        _socket_send(ws, reply)
+        if not keep_open:
+            return
 
 
 @media_bp.get("/media/records")
@@ -654,6 +1168,42 @@ def list_media_records():
     return jsonify(payload)
 
 
+@media_bp.get("/media/records/<int:analysis_id>/timeline")
+@jwt_required()
+def fetch_media_timeline(analysis_id: int):
+    record = MediaAnalysis.query.filter_by(id=analysis_id, user_id=_current_user_id()).first()
+    timeline = (record.detections or {}).get("timeline") if record is not None else None
+    if not timeline or not timeline.get("path"):
+        return jsonify({"message": "El análisis no tiene línea de tiempo."}), HTTPStatus.NOT_FOUND
+
+    try:
+        start = float(request.args["start"]) if request.args.get("start") else None
+        end = float(request.args["end"]) if request.args.get("end") else None
+        limit = int(request.args.get("limit", 2000))
+    except ValueError:
+        return (
+            jsonify({"message": "Los parámetros 'start', 'end' y 'limit' deben ser numéricos."}),
+            HTTPStatus.BAD_REQUEST,
+        )
+    limit = max(1, min(limit, TIMELINE_SLICE_MAX_FRAMES))
+
+    tracked_root = Path(current_app.config.get("TRACKED_ROOT")).resolve()
+    target_path = (tracked_root / timeline["path"]).resolve()
+    if tracked_root not in target_path.parents:
+        return jsonify({"message": "El análisis no tiene línea de tiempo."}), HTTPStatus.NOT_FOUND
+    if not target_path.exists():
+        if timeline_pending(target_path):
+            return (
+                jsonify({"message": "La línea de tiempo se está generando; intenta de nuevo en unos segundos."}),
+                HTTPStatus.ACCEPTED,
+            )
+        return jsonify({"message": "El análisis no tiene línea de tiempo."}), HTTPStatus.NOT_FOUND
+
+    payload = read_timeline_slice(target_path, start, end, limit)
+    payload.update({"analysis_id": record.id, "labels": timeline.get("labels", []), "start": start, "end": end})
+    return jsonify(payload)
+
+
 @media_bp.get("/media/files/<path:relative_path>")
 @jwt_required()
 def fetch_media_file(relative_path: str):
@@ -677,10 +1227,15 @@ def fetch_media_file(relative_path: str):
 
     for root in candidate_roots:
         target_path = (root / relative_path).resolve()
-        if not target_path.exists():
-            continue
         if root not in target_path.parents and target_path != root:
             continue
+        if not target_path.exists():
+            if segment_dir_for(target_path).is_dir():
+                return (
+                    jsonify({"message": "La grabación se está compactando; intenta de nuevo en unos segundos."}),
+                    HTTPStatus.ACCEPTED,
+                )
+            continue
         return send_file(target_path)
 
     abort(404)
@@ -0,0 +1,222 @@
+"""Native asyncio handlers for the media endpoints whose connections stay open.
+
+Used by the ASGI entry point (``asgi.py``). Live-session sockets and MJPEG
+viewers wait on the event loop; frame analysis and store lookups run on the
+shared executor inside an application context, reusing the helpers of the
+synchronous blueprint so both transports answer identically.
+"""
+from __future__ import annotations
+
+from concurrent.futures import Executor
+from functools import partial
+from http import HTTPStatus
+from typing import Awaitable, Callable, Optional
+from urllib.parse import parse_qs
+import asyncio
+import json
+import re
+
+from flask import Flask
+
+from services.frame_broadcast import MJPEG_BOUNDARY
+from services.live_session import LiveSessionError
+from utils.asgi_bridge import send_json, wait_disconnect
+
+from .media import (
+    _get_live_session_manager,
+    analyzer,
+    _socket_error_message,
+    _socket_frame_reply,
+    _socket_token_message,
+    _stale_socket_reply,
+    _user_id_from_token,
+)
+
+SOCKET_PATH = re.compile(r"^/media/live-session/(?P<session_id>[^/]+)/ws$")
+WATCH_PATH = re.compile(r"^/media/live-session/(?P<session_id>[^/]+)/watch$")
+SOCKET_AUTH_TIMEOUT_SECONDS = 10
+_CORS_HEADERS = [(b"access-control-allow-origin", b"*")]
+
+Handler = Callable[..., Awaitable[None]]
+
+
+class MediaAsyncRoutes:
+    def __init__(self, app: Flask, executor: Executor) -> None:
+        self._app = app
+        self._executor = executor
+        # (scope type, method, path, handler)
+        self._routes = [
+            ("websocket", None, SOCKET_PATH, self.live_session_socket),
+            ("http", "GET", WATCH_PATH, self.watch_live_session),
+        ]
+
+    def match(self, scope) -> Optional[Handler]:
+        for scope_type, method, pattern, handler in self._routes:
+            if scope["type"] != scope_type or (method and scope.get("method") != method):
+                continue
+            found = pattern.match(_route_path(scope))
+            if found:
+                return partial(handler, **found.groupdict())
+        return None
+
+    async def _call(self, func, *args):
+        """Run blocking work on the executor inside an application context."""
+
+        def run():
+            with self._app.app_context():
+                return func(*args)
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, run)
+
+    async def watch_live_session(self, scope, receive, send, session_id: str) -> None:
+        token = _query_param(scope, "jwt") or _bearer_token(scope)
+
+        def open_stream():
+            user_id = _user_id_from_token(token)
+            if user_id is None:
+                return HTTPStatus.UNAUTHORIZED, "Token inválido o ausente.", None
+            manager = _get_live_session_manager()
+            if manager.session_owner(session_id) != user_id:
+                return HTTPStatus.NOT_FOUND, "Sesión en vivo no encontrada o finalizada.", None
+            try:
+                return HTTPStatus.OK, None, manager.watch_session_async(session_id)
+            except LiveSessionError as exc:
+                return HTTPStatus.NOT_FOUND, str(exc), None
+
+        status, message, parts = await self._call(open_stream)
+        if parts is None:
+            await send_json(send, status, {"message": message}, _CORS_HEADERS)
+            return
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": HTTPStatus.OK,
+                "headers": [
+                    (b"content-type", f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}".encode()),
+                    (b"cache-control", b"no-store"),
+                    (b"x-accel-buffering", b"no"),
+                    *_CORS_HEADERS,
+                ],
+            }
+        )
+
+        async def pump():
+            async for part in parts:
+                await send({"type": "http.response.body", "body": part, "more_body": True})
+
+        streaming = asyncio.ensure_future(pump())
+        disconnected = asyncio.ensure_future(wait_disconnect(receive))
+        try:
+            done, _ = await asyncio.wait({streaming, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            streaming.cancel()
+            disconnected.cancel()
+            # Cancelling the pump closes the stream, which unregisters the viewer.
+            await asyncio.gather(streaming, return_exceptions=True)
+        if disconnected not in done:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def live_session_socket(self, scope, receive, send, session_id: str) -> None:
+        """Same protocol as the flask-sock route, with one executor call per analyzed frame."""
+        if (await receive())["type"] != "websocket.connect":
+            return
+        await send({"type": "websocket.accept"})
+        queue: asyncio.Queue = asyncio.Queue()
+        reader = asyncio.ensure_future(_read_socket(receive, queue))
+        try:
+            token = _query_param(scope, "jwt")
+            if not token:
+                try:
+                    token = _socket_token_message(
+                        await asyncio.wait_for(queue.get(), timeout=SOCKET_AUTH_TIMEOUT_SECONDS)
+                    )
+                except asyncio.TimeoutError:
+                    token = None
+
+            def authorize():
+                user_id = _user_id_from_token(token)
+                if user_id is None:
+                    return HTTPStatus.UNAUTHORIZED, "Token inválido o ausente.", None
+                if _get_live_session_manager().session_owner(session_id) != user_id:
+                    return HTTPStatus.NOT_FOUND, "Sesión en vivo no encontrada o finalizada.", None
+                return HTTPStatus.OK, None, analyzer.labels
+
+            status, denied, labels = await self._call(authorize)
+            if labels is None:
+                await _socket_send(send, _socket_error_message(status, denied))
+                return
+
+            await _socket_send(send, {"t": "h", "session_id": session_id, "labels": labels})
+            while True:
+                message = await queue.get()
+                if message is None:
+                    return
+                if isinstance(message, str):
+                    if message == "ping":
+                        await _socket_send(send, {"t": "p"})
+                    continue
+                if not message:
+                    continue
+                # Latest frame wins, as in the synchronous route.
+                while not queue.empty():
+                    newer = queue.get_nowait()
+                    if newer is None:
+                        return
+                    if isinstance(newer, str):
+                        if newer == "ping":
+                            await _socket_send(send, {"t": "p"})
+                        continue
+                    if newer:
+                        try:
+                            stale = await self._call(_stale_socket_reply, session_id, labels)
+                        except LiveSessionError as exc:
+                            await _socket_send(send, _socket_error_message(HTTPStatus.GONE, str(exc)))
+                            return
+                        await _socket_send(send, stale)
+                        message = newer
+                reply, keep_open = await self._call(_socket_frame_reply, session_id, message, labels)
+                await _socket_send(send, reply)
+                if not keep_open:
+                    return
+        finally:
+            client_gone = reader.done()
+            reader.cancel()
+            if not client_gone:
+                await send({"type": "websocket.close", "code": 1000})
+
+
+async def _read_socket(receive, queue: asyncio.Queue) -> None:
+    """Feed incoming socket messages to ``queue``; ``None`` marks the disconnect."""
+    while True:
+        message = await receive()
+        if message["type"] == "websocket.disconnect":
+            await queue.put(None)
+            return
+        if message.get("bytes") is not None:
+            await queue.put(message["bytes"])
+        elif message.get("text") is not None:
+            await queue.put(message["text"])
+
+
+async def _socket_send(send, message: dict) -> None:
+    await send({"type": "websocket.send", "text": json.dumps(message, separators=(",", ":"))})
+
+
+def _route_path(scope) -> str:
+    path, root_path = scope["path"], scope.get("root_path", "")
+    return path[len(root_path) :] if root_path and path.startswith(root_path) else path
+
+
+def _query_param(scope, name: str) -> Optional[str]:
+    values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get(name)
+    return values[0] if values else None
+
+
+def _bearer_token(scope) -> Optional[str]:
+    for raw_name, raw_value in scope.get("headers", []):
+        if raw_name.lower() == b"authorization":
+            scheme, _, token = raw_value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return token.strip()
+    return None
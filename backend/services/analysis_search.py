@@ -0,0 +1,179 @@
+"""History queries over ``AnalysisResult`` with full-text search and keyset pagination.
+
+The search uses whatever the database offers: the FTS5 table kept in sync by
+triggers on SQLite, the FULLTEXT index on MySQL, or a ``LIKE`` scan when
+neither exists (e.g. a database created with ``db.create_all()`` instead of
+``flask db upgrade``). Terms the MySQL index never stores (shorter than
+``innodb_ft_min_token_size`` or InnoDB stopwords) fall back to ``LIKE`` so
+every backend finds the same rows, and the ``LIKE`` scan ignores accents the
+way FTS5's ``remove_diacritics`` does. Pages are ordered by ``(created_at, id)`` descending and
+continue from an opaque cursor, so deep pages cost the same as the first one.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Sequence
+import base64
+import json
+import re
+import unicodedata
+
+from sqlalchemy import and_, column, func, or_, select, table, text
+
+FTS_TABLE = "analysis_results_fts"
+FULLTEXT_INDEX = "ix_analysis_results_source_text_ft"
+
+SEARCH_FTS5 = "fts5"
+SEARCH_FULLTEXT = "fulltext"
+SEARCH_LIKE = "like"
+
+MAX_SEARCH_TERMS = 8
+
+# InnoDB defaults: tokens shorter than ``innodb_ft_min_token_size`` and the
+# built-in stopword list are not indexed, so ``+term*`` would match nothing.
+MYSQL_FT_MIN_TOKEN_SIZE = 3
+MYSQL_FT_STOPWORDS = frozenset(
+    "a about an are as at be by com de en for from how i in is it la of on or that the this to was what when "
+    "where who will with und www".split()
+)
+
+# Spanish letters folded by the LIKE fallback, as FTS5's unicode61 tokenizer folds them.
+_ACCENTED = "áéíóúüñÁÉÍÓÚÜÑ"
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+class HistoryQueryError(ValueError):
+    """Raised for an invalid search term, filter or cursor."""
+
+
+@dataclass
+class HistoryPage:
+    records: list
+    next_cursor: Optional[str]
+
+
+def detect_search_backend(connection) -> str:
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        found = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).first()
+        return SEARCH_FTS5 if found else SEARCH_LIKE
+    if dialect in {"mysql", "mariadb"}:
+        found = connection.execute(
+            text("SHOW INDEX FROM analysis_results WHERE Key_name = :name"), {"name": FULLTEXT_INDEX}
+        ).first()
+        return SEARCH_FULLTEXT if found else SEARCH_LIKE
+    return SEARCH_LIKE
+
+
+def search_terms(query: str) -> List[str]:
+    # Only word characters reach the engines, so user input cannot inject
+    # FTS5 or boolean-mode operators.
+    terms = _TERM.findall(query.lower())
+    if not terms:
+        raise HistoryQueryError("The search query must contain at least one word.")
+    return terms[:MAX_SEARCH_TERMS]
+
+
+def search_condition(backend: str, terms: Sequence[str]):
+    """Condition matching rows whose text contains every term (as a prefix on the indexed backends)."""
+    from models.analysis import AnalysisResult
+
+    if backend == SEARCH_FTS5:
+        match = " ".join(f'"{term}"*' for term in terms)
+        matches = (
+            select(column("rowid"))
+            .select_from(table(FTS_TABLE))
+            .where(text(f"{FTS_TABLE} MATCH :fts_query").bindparams(fts_query=match))
+        )
+        return AnalysisResult.id.in_(matches)
+    if backend == SEARCH_FULLTEXT:
+        indexed = [term for term in terms if _mysql_indexes(term)]
+        conditions = [_like_condition(AnalysisResult.source_text, term) for term in terms if term not in indexed]
+        if indexed:
+            match = " ".join(f"+{term}*" for term in indexed)
+            conditions.append(
+                text("MATCH (analysis_results.source_text) AGAINST (:ft_query IN BOOLEAN MODE)").bindparams(
+                    ft_query=match
+                )
+            )
+        return and_(*conditions)
+    return and_(*(_like_condition(AnalysisResult.source_text, term) for term in terms))
+
+
+def _mysql_indexes(term: str) -> bool:
+    return len(term) >= MYSQL_FT_MIN_TOKEN_SIZE and term not in MYSQL_FT_STOPWORDS
+
+
+def _fold(value: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", value.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _like_condition(source, term: str):
+    folded = source
+    for char in _ACCENTED:
+        folded = func.replace(folded, char, _fold(char))
+    # "_" is a word character but a LIKE wildcard.
+    pattern = "%" + _fold(term).replace("_", "\\_") + "%"
+    return func.lower(folded).like(pattern, escape="\\")
+
+
+def encode_cursor(created_at: datetime, record_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), record_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, record_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(record_id)
+    except (ValueError, TypeError) as exc:
+        raise HistoryQueryError("Invalid cursor.") from exc
+
+
+def history_page(
+    user_id: int,
+    *,
+    backend: str,
+    query: Optional[str] = None,
+    labels: Sequence[str] = (),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+) -> HistoryPage:
+    """One page of the user's analyses, newest first; ``date_to`` is exclusive.
+
+    Needs an application context.
+    """
+    from models.analysis import AnalysisResult
+
+    statement = AnalysisResult.query.filter(AnalysisResult.user_id == user_id)
+    if query:
+        statement = statement.filter(search_condition(backend, search_terms(query)))
+    if labels:
+        statement = statement.filter(AnalysisResult.sentiment_label.in_(list(labels)))
+    if date_from is not None:
+        statement = statement.filter(AnalysisResult.created_at >= date_from)
+    if date_to is not None:
+        statement = statement.filter(AnalysisResult.created_at < date_to)
+    if cursor:
+        created_at, record_id = decode_cursor(cursor)
+        statement = statement.filter(
+            or_(
+                AnalysisResult.created_at < created_at,
+                and_(AnalysisResult.created_at == created_at, AnalysisResult.id < record_id),
+            )
+        )
+    # One extra row tells whether another page exists without a COUNT(*).
+    records = statement.order_by(AnalysisResult.created_at.desc(), AnalysisResult.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = encode_cursor(records[-1].created_at, records[-1].id)
+    return HistoryPage(records, next_cursor)
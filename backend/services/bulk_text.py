@@ -0,0 +1,390 @@
+"""Sentiment analysis of large CSV / JSON Lines files in constant memory.
+
+Records are streamed from the file, grouped into chunks, scored with one
+``analyze_many`` call per chunk (optionally on a pool of processes), written to
+a results file and handed to an optional callback, such as the bulk database
+insert from ``database_writer``. At most a few chunks are in memory at once,
+whatever the size of the input.
+
+Analyze a file from the backend directory with::
+
+    python -m services.bulk_text transcripts.csv --output results.jsonl --workers 4
+"""
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+
+from .ia_service import SentimentPayload, TextSentimentService
+
+RESULT_FIELDS = ("sentiment_label", "polarity", "subjectivity", "summary")
+JSONL_SUFFIXES = {".jsonl", ".ndjson"}
+SUPPORTED_SUFFIXES = JSONL_SUFFIXES | {".csv"}
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_STATUS_NAME = "status.json"
+
+ChunkCallback = Callable[[List[str], List[SentimentPayload]], None]
+
+
+class BulkTextError(ValueError):
+    """Raised when an input file cannot be read as CSV or JSON Lines."""
+
+
+@dataclass
+class BulkProgress:
+    total_bytes: int = 0
+    bytes_read: int = 0
+    rows: int = 0
+    skipped: int = 0
+    chunks: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    def to_dict(self) -> Dict:
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "rows": self.rows,
+            "skipped": self.skipped,
+            "chunks": self.chunks,
+            "bytes_read": self.bytes_read,
+            "total_bytes": self.total_bytes,
+            "percent": round(100.0 * self.bytes_read / self.total_bytes, 1) if self.total_bytes else 0.0,
+            "elapsed_seconds": round(elapsed, 2),
+            "rows_per_second": round(self.rows / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+
+def iter_records(path: Path, progress: Optional[BulkProgress] = None) -> Iterator[Dict]:
+    """Stream the rows of a CSV (with header) or JSON Lines file as dicts."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix not in SUPPORTED_SUFFIXES:
+        raise BulkTextError("El archivo debe ser CSV o JSONL.")
+    if progress is not None:
+        progress.total_bytes = path.stat().st_size
+    with open(path, "rb") as handle:
+        lines = _decoded_lines(handle, progress)
+        if suffix in JSONL_SUFFIXES:
+            for number, line in enumerate(lines, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as exc:
+                    raise BulkTextError(f"Línea {number}: JSON inválido.") from exc
+                if isinstance(record, dict):
+                    yield record
+                elif progress is not None:
+                    progress.skipped += 1
+        else:
+            yield from csv.DictReader(lines)
+
+
+def _decoded_lines(handle, progress: Optional[BulkProgress]) -> Iterator[str]:
+    # Reading bytes keeps an exact position for the progress report, which a
+    # text-mode handle cannot give while it is being iterated.
+    encoding = "utf-8-sig"
+    for raw in handle:
+        if progress is not None:
+            progress.bytes_read += len(raw)
+        yield raw.decode(encoding)
+        encoding = "utf-8"
+
+
+def iter_chunks(
+    records: Iterable[Dict], text_field: str, chunk_size: int, progress: Optional[BulkProgress] = None
+) -> Iterator[Tuple[List[Dict], List[str]]]:
+    """Group records with a non-empty ``text_field`` into chunks of ``chunk_size``."""
+    iterator = iter(records)
+    while chunk := list(islice(iterator, chunk_size)):
+        kept, texts = [], []
+        for record in chunk:
+            text = record.get(text_field)
+            text = text.strip() if isinstance(text, str) else ""
+            if text:
+                kept.append(record)
+                texts.append(text)
+            elif progress is not None:
+                progress.skipped += 1
+        if kept:
+            yield kept, texts
+
+
+def analyze_file(
+    source: Path,
+    output: Path,
+    *,
+    service: Optional[TextSentimentService] = None,
+    model_dir: Optional[Path] = None,
+    text_field: str = "text",
+    chunk_size: int = 2000,
+    workers: int = 1,
+    on_chunk: Optional[ChunkCallback] = None,
+    on_progress: Optional[Callable[[BulkProgress], None]] = None,
+) -> BulkProgress:
+    """Score every record of ``source`` and write the results to ``output`` (CSV or JSONL by suffix)."""
+    progress = BulkProgress()
+    chunks = iter_chunks(iter_records(source, progress), text_field, max(1, chunk_size), progress)
+    with _ResultWriter(Path(output)) as writer:
+        for records, texts, payloads in _score_chunks(chunks, service, model_dir, workers):
+            writer.write(records, payloads)
+            if on_chunk is not None:
+                on_chunk(texts, payloads)
+            progress.rows += len(records)
+            progress.chunks += 1
+            if on_progress is not None:
+                on_progress(progress)
+    return progress
+
+
+def _score_chunks(chunks, service, model_dir, workers: int):
+    if workers <= 1:
+        service = service or TextSentimentService(model_dir)
+        for records, texts in chunks:
+            yield records, texts, service.analyze_many(texts)
+        return
+
+    # Only ``2 * workers`` chunks are in flight, so a fast reader cannot queue
+    # the whole file in memory ahead of the pool; results keep the input order.
+    # Workers are spawned, not forked: the server process is multithreaded and
+    # may hold TensorFlow/OpenCV state that is not safe to copy mid-flight.
+    window: deque = deque()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(model_dir,),
+    ) as pool:
+        for records, texts in chunks:
+            window.append((records, texts, pool.submit(_score_in_worker, texts)))
+            if len(window) >= 2 * workers:
+                records, texts, future = window.popleft()
+                yield records, texts, future.result()
+        while window:
+            records, texts, future = window.popleft()
+            yield records, texts, future.result()
+
+
+_worker_service: Optional[TextSentimentService] = None
+
+
+def _init_worker(model_dir: Optional[Path]) -> None:
+    global _worker_service
+    # Every worker maps the same published model file.
+    _worker_service = TextSentimentService(model_dir)
+
+
+def _score_in_worker(texts: Sequence[str]) -> List[SentimentPayload]:
+    return _worker_service.analyze_many(texts)
+
+
+class _ResultWriter:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._jsonl = path.suffix.lower() in JSONL_SUFFIXES
+        self._handle = None
+        self._csv: Optional[csv.DictWriter] = None
+
+    def __enter__(self) -> "_ResultWriter":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = open(self.path, "w", encoding="utf-8", newline="")
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._handle.close()
+
+    def write(self, records: List[Dict], payloads: List[SentimentPayload]) -> None:
+        rows = [
+            {**record, **_result_fields(payload)}
+            for record, payload in zip(records, payloads)
+        ]
+        if self._jsonl:
+            self._handle.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+            return
+        if self._csv is None:
+            fieldnames = [name for name in rows[0] if name not in RESULT_FIELDS] + list(RESULT_FIELDS)
+            self._csv = csv.DictWriter(self._handle, fieldnames=fieldnames, extrasaction="ignore")
+            self._csv.writeheader()
+        self._csv.writerows(rows)
+
+
+def _result_fields(payload: SentimentPayload) -> Dict:
+    return {
+        "sentiment_label": payload.label,
+        "polarity": payload.polarity,
+        "subjectivity": payload.subjectivity,
+        "summary": payload.summary,
+    }
+
+
+def database_writer(user_id: int, channel: str, source_name: str) -> ChunkCallback:
+    """Chunk callback that inserts ``AnalysisResult`` rows with one executemany and commit per chunk.
+
+    Needs an application context.
+    """
+    from sqlalchemy import insert
+
+    from extensions import db
+    from models.analysis import AnalysisResult
+
+    context = {"channel": channel, "source_file": source_name}
+
+    def write(texts: List[str], payloads: List[SentimentPayload]) -> None:
+        now = datetime.utcnow()
+        db.session.execute(
+            insert(AnalysisResult),
+            [
+                {
+                    "user_id": user_id,
+                    "source_text": text,
+                    "sentiment_label": payload.label,
+                    "polarity": payload.polarity,
+                    "subjectivity": payload.subjectivity,
+                    "summary": payload.summary,
+                    "context_data": context,
+                    "created_at": now,
+                }
+                for text, payload in zip(texts, payloads)
+            ],
+        )
+        db.session.commit()
+
+    return write
+
+
+def write_job_status(job_dir: Path, status: Dict) -> None:
+    """Atomically replace the job's status file so any worker process can report it."""
+    tmp_path = job_dir / f".{JOB_STATUS_NAME}.{os.getpid()}.tmp"
+    tmp_path.write_text(json.dumps(status), encoding="utf-8")
+    os.replace(tmp_path, job_dir / JOB_STATUS_NAME)
+
+
+def read_job_status(job_dir: Path) -> Optional[Dict]:
+    try:
+        return json.loads((job_dir / JOB_STATUS_NAME).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def remove_job(job_dir: Path) -> None:
+    shutil.rmtree(job_dir, ignore_errors=True)
+
+
+def job_abandoned(job_dir: Path, status: Dict, stale_seconds: float = 0) -> bool:
+    """Whether an unfinished job can no longer finish.
+
+    That is the case when the process that owns it is gone, or when a running
+    job has not reported progress for ``stale_seconds``.
+    """
+    if status.get("status") in (JOB_DONE, JOB_FAILED):
+        return False
+    if not _process_alive(status.get("pid")):
+        return True
+    if status.get("status") != JOB_RUNNING or stale_seconds <= 0:
+        return False
+    try:
+        return time.time() - (job_dir / JOB_STATUS_NAME).stat().st_mtime > stale_seconds
+    except FileNotFoundError:
+        return False
+
+
+def _process_alive(pid) -> bool:
+    if not isinstance(pid, int):
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def sweep_jobs(root: Path, max_age_seconds: float, stale_seconds: float = 0) -> int:
+    """Delete finished, failed or abandoned jobs under ``root`` whose status is older than ``max_age_seconds``."""
+    root = Path(root)
+    if max_age_seconds <= 0 or not root.is_dir():
+        return 0
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for job_dir in root.iterdir():
+        status_path = job_dir / JOB_STATUS_NAME
+        try:
+            if status_path.stat().st_mtime >= cutoff:
+                continue
+        except FileNotFoundError:
+            continue
+        status = read_job_status(job_dir)
+        if (
+            status is not None
+            and status.get("status") not in (JOB_DONE, JOB_FAILED)
+            and not job_abandoned(job_dir, status, stale_seconds)
+        ):
+            continue
+        remove_job(job_dir)
+        removed += 1
+    return removed
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from config import BaseConfig
+
+    parser = argparse.ArgumentParser(description="Analyze the sentiment of every row of a CSV or JSONL file.")
+    parser.add_argument("source", type=Path)
+    parser.add_argument("--output", type=Path, help="Archivo de resultados (.csv o .jsonl)")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--model-dir", type=Path, default=Path(BaseConfig.SENTIMENT_MODEL_DIR))
+    parser.add_argument("--user-id", type=int, help="Guardar los resultados como análisis de este usuario")
+    parser.add_argument("--channel", default="bulk")
+    args = parser.parse_args(argv)
+    output = args.output or args.source.with_name(f"{args.source.stem}.sentiment.jsonl")
+
+    def report(progress: BulkProgress) -> None:
+        status = progress.to_dict()
+        sys.stderr.write(
+            f"\r{status['percent']:5.1f}%  {status['rows']} filas  {status['rows_per_second']} filas/s"
+        )
+        sys.stderr.flush()
+
+    kwargs = dict(
+        model_dir=args.model_dir,
+        text_field=args.text_field,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        on_progress=report,
+    )
+    if args.user_id is None:
+        progress = analyze_file(args.source, output, **kwargs)
+    else:
+        from app import create_app
+
+        with create_app().app_context():
+            writer = database_writer(args.user_id, args.channel, args.source.name)
+            progress = analyze_file(args.source, output, on_chunk=writer, **kwargs)
+    status = progress.to_dict()
+    sys.stderr.write("\n")
+    print(
+        f"{status['rows']} filas analizadas ({status['skipped']} sin texto) "
+        f"en {status['elapsed_seconds']} s -> {output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
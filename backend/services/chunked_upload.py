@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Event, Lock, RLock
+from typing import BinaryIO, Dict, List, Optional
+from uuid import uuid4
+import logging
+import time
+
+import cv2
+
+COPY_BUFFER_SIZE = 64 * 1024
+# Containers whose index ("moov" atom) may follow the media data.
+MP4_SUFFIXES = {".mp4", ".m4v", ".mov"}
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkedUploadError(RuntimeError):
+    """Raised when a chunked upload is unknown or cannot accept more data."""
+
+
+class ChunkOffsetError(ChunkedUploadError):
+    """Raised when a chunk does not start where the stored data ends."""
+
+    def __init__(self, expected_offset: int) -> None:
+        super().__init__(
+            f"El fragmento no coincide con los datos recibidos; continúa desde el byte {expected_offset}."
+        )
+        self.expected_offset = expected_offset
+
+
+class ChunkInProgressError(ChunkedUploadError):
+    """Raised when another request is still sending a chunk of the same upload."""
+
+
+class ProgressiveVideoAnalysis:
+    """Analyzes the already received prefix of a video that is still being uploaded.
+
+    Each pass reopens the growing file and seeks to the first frame it has not
+    consumed, since a capture does not see data appended after it was opened.
+    An MP4/MOV whose ``moov`` atom comes after the media data (a file written
+    without "faststart") cannot be opened until it is complete; that layout is
+    detected from the first atoms and such uploads are only analyzed when the
+    last chunk arrives (``progressive`` is ``False``).
+    """
+
+    def __init__(self, analyzer, video_path: Path, *, max_frames: int, sample_rate: int) -> None:
+        self._analyzer = analyzer
+        self._video_path = video_path
+        self._max_frames = max_frames
+        self._sample_rate = max(1, sample_rate)
+        self._summaries: List[Dict] = []
+        self._next_frame = 0
+        self._lock = Lock()
+        self._cancelled = Event()
+        self.progressive: Optional[bool] = None if video_path.suffix.lower() in MP4_SUFFIXES else True
+
+    @property
+    def frames_consumed(self) -> int:
+        return self._next_frame
+
+    def cancel(self) -> None:
+        """Stop a pass in progress after its current frame; later passes do nothing."""
+        self._cancelled.set()
+
+    def advance(self, final: bool = False) -> int:
+        """Analyze frames decoded since the previous pass and return how many were consumed."""
+        with self._lock:
+            if self._next_frame >= self._max_frames or self._cancelled.is_set():
+                return 0
+            if not final and not self._check_layout():
+                return 0
+            capture = cv2.VideoCapture(str(self._video_path))
+            try:
+                if not capture.isOpened():
+                    if final:
+                        raise ValueError("No se pudo procesar el video proporcionado.")
+                    return 0
+                if self._next_frame and not capture.set(cv2.CAP_PROP_POS_FRAMES, self._next_frame):
+                    for _ in range(self._next_frame):
+                        if not capture.grab():
+                            return 0
+                start = self._next_frame
+                self._next_frame = self._analyzer.sample_capture(
+                    _CancellableCapture(capture, self._cancelled),
+                    self._summaries,
+                    start,
+                    self._max_frames,
+                    self._sample_rate,
+                    hold_last=not final,
+                )
+                return self._next_frame - start
+            finally:
+                capture.release()
+
+    def finish(self) -> Dict:
+        self.advance(final=True)
+        with self._lock:
+            return self._analyzer.combine_summaries(self._summaries)
+
+    def _check_layout(self) -> bool:
+        if self.progressive is None:
+            self.progressive = _moov_first(self._video_path)
+            if self.progressive is False:
+                logger.info("%s tiene el índice al final; se analizará al completar la carga", self._video_path.name)
+        return self.progressive is not False
+
+
+class _CancellableCapture:
+    """Capture wrapper that reports end of stream once the analysis is cancelled."""
+
+    def __init__(self, capture, cancelled: Event) -> None:
+        self._capture = capture
+        self._cancelled = cancelled
+
+    def read(self):
+        if self._cancelled.is_set():
+            return False, None
+        return self._capture.read()
+
+
+def _moov_first(path: Path) -> Optional[bool]:
+    """``False`` when the ``mdat`` atom precedes ``moov``, ``True`` when ``moov`` comes first.
+
+    ``None`` while the received prefix does not show either yet.
+    """
+    try:
+        size = path.stat().st_size
+        with path.open("rb") as handle:
+            offset = 0
+            while offset + 8 <= size:
+                handle.seek(offset)
+                header = handle.read(16)
+                box_size = int.from_bytes(header[:4], "big")
+                kind = header[4:8]
+                if kind == b"moov":
+                    return True
+                if kind == b"mdat":
+                    return False
+                if box_size == 1 and len(header) == 16:
+                    box_size = int.from_bytes(header[8:16], "big")
+                if box_size < 8:
+                    return None
+                offset += box_size
+    except OSError:
+        return None
+    return None
+
+
+@dataclass
+class ChunkedUpload:
+    upload_id: str
+    user_id: int
+    media_type: str
+    source_type: str
+    channel: str
+    original_filename: Optional[str]
+    raw_path: Path
+    relative_raw: str
+    analysis: Optional[ProgressiveVideoAnalysis] = None
+    received_bytes: int = 0
+    analyzed_bytes: int = 0
+    completed: bool = False
+    receiving: bool = False
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    pending: Optional[Future] = field(default=None, repr=False)
+    lock: RLock = field(default_factory=RLock, repr=False)
+
+    def to_dict(self) -> Dict:
+        return {
+            "upload_id": self.upload_id,
+            "media_type": self.media_type,
+            "source_type": self.source_type,
+            "filename": self.original_filename,
+            "offset": self.received_bytes,
+            "completed": self.completed,
+            "frames_analyzed": self.analysis.frames_consumed if self.analysis else 0,
+            "progressive": self.analysis.progressive is not False if self.analysis else False,
+        }
+
+
+class ChunkedUploadManager:
+    """Keeps resumable uploads and analyzes video prefixes while chunks arrive.
+
+    Uploads that receive no chunk for ``idle_timeout`` seconds are dropped and
+    their raw file deleted; the sweep piggybacks on ``start_upload`` and
+    ``append_chunk`` so no extra thread is needed.
+    """
+
+    def __init__(
+        self,
+        *,
+        analyzer,
+        chunk_max_bytes: int,
+        analyze_min_bytes: int,
+        max_frames: int = 180,
+        sample_rate: int = 6,
+        workers: int = 2,
+        idle_timeout: float = 3600.0,
+    ) -> None:
+        self._analyzer = analyzer
+        self.chunk_max_bytes = max(1, chunk_max_bytes)
+        self._analyze_min_bytes = max(0, analyze_min_bytes)
+        self._max_frames = max_frames
+        self._sample_rate = sample_rate
+        self._uploads: Dict[str, ChunkedUpload] = {}
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="chunked-upload")
+        self._idle_timeout = idle_timeout
+        self._next_sweep = 0.0
+        self.reaped = 0
+
+    def start_upload(
+        self,
+        *,
+        user_id: int,
+        media_type: str,
+        source_type: str,
+        channel: str,
+        original_filename: Optional[str],
+        raw_path: Path,
+        relative_raw: str,
+    ) -> ChunkedUpload:
+        self._maybe_reap()
+        raw_path.parent.mkdir(parents=True, exist_ok=True)
+        raw_path.touch()
+        analysis = None
+        if media_type == "video":
+            analysis = ProgressiveVideoAnalysis(
+                self._analyzer,
+                raw_path,
+                max_frames=self._max_frames,
+                sample_rate=self._sample_rate,
+            )
+        upload = ChunkedUpload(
+            upload_id=uuid4().hex,
+            user_id=user_id,
+            media_type=media_type,
+            source_type=source_type,
+            channel=channel,
+            original_filename=original_filename,
+            raw_path=raw_path,
+            relative_raw=relative_raw,
+            analysis=analysis,
+        )
+        with self._lock:
+            self._uploads[upload.upload_id] = upload
+        return upload
+
+    def get_upload(self, upload_id: str, user_id: int) -> ChunkedUpload:
+        with self._lock:
+            upload = self._uploads.get(upload_id)
+        if upload is None or upload.user_id != user_id:
+            raise ChunkedUploadError("Carga no encontrada o ya finalizada.")
+        return upload
+
+    def append_chunk(self, upload_id: str, user_id: int, stream: BinaryIO, offset: int) -> ChunkedUpload:
+        self._maybe_reap()
+        upload = self.get_upload(upload_id, user_id)
+        # The lock is only held to claim the upload and to commit the chunk: the
+        # body of a slow client is read without it, so analysis callbacks and
+        # status requests never wait for the network.
+        with upload.lock:
+            if upload.completed:
+                raise ChunkedUploadError("La carga ya fue finalizada.")
+            if upload.receiving:
+                raise ChunkInProgressError("Ya se está recibiendo un fragmento de esta carga.")
+            if offset != upload.received_bytes:
+                raise ChunkOffsetError(upload.received_bytes)
+            upload.receiving = True
+        written = 0
+        try:
+            with upload.raw_path.open("ab") as target:
+                while True:
+                    block = stream.read(COPY_BUFFER_SIZE)
+                    if not block:
+                        break
+                    written += len(block)
+                    if written > self.chunk_max_bytes:
+                        raise ChunkedUploadError("El fragmento excede el tamaño máximo permitido.")
+                    target.write(block)
+        finally:
+            with upload.lock:
+                upload.receiving = False
+                if not upload.completed:
+                    # Whatever reached the disk counts, so an interrupted chunk can be resumed.
+                    upload.received_bytes = upload.raw_path.stat().st_size
+                    upload.updated_at = time.time()
+        with upload.lock:
+            if upload.completed:
+                raise ChunkedUploadError("La carga ya fue finalizada.")
+            self._schedule_analysis(upload)
+        return upload
+
+    def complete_upload(self, upload_id: str, user_id: int) -> tuple[ChunkedUpload, Dict]:
+        """Close the upload and return the analysis summary of the whole file."""
+        upload = self.get_upload(upload_id, user_id)
+        with upload.lock:
+            if upload.completed:
+                raise ChunkedUploadError("La carga ya fue finalizada.")
+            if upload.receiving:
+                raise ChunkInProgressError("Ya se está recibiendo un fragmento de esta carga.")
+            if upload.received_bytes == 0:
+                raise ChunkedUploadError("La carga no contiene datos.")
+            upload.completed = True
+            pending = upload.pending
+        with self._lock:
+            self._uploads.pop(upload.upload_id, None)
+        if pending is not None:
+            # Errors of intermediate passes are irrelevant; the final pass reports its own.
+            pending.exception()
+        if upload.analysis is not None:
+            summary = upload.analysis.finish()
+        else:
+            summary = self._analyzer.analyze_image(upload.raw_path)
+        return upload, summary
+
+    def abort_upload(self, upload_id: str, user_id: int) -> None:
+        upload = self.get_upload(upload_id, user_id)
+        with upload.lock:
+            upload.completed = True
+        with self._lock:
+            self._uploads.pop(upload.upload_id, None)
+        self._cancel_analysis(upload)
+        if upload.pending is not None and not upload.pending.cancelled():
+            upload.pending.exception()
+        upload.raw_path.unlink(missing_ok=True)
+
+    def reap_idle(self, now: Optional[float] = None) -> int:
+        """Drop uploads idle for longer than ``idle_timeout`` and delete their raw files."""
+        if self._idle_timeout <= 0:
+            return 0
+        cutoff = (now if now is not None else time.time()) - self._idle_timeout
+        with self._lock:
+            stale = [upload for upload in self._uploads.values() if upload.updated_at < cutoff]
+        reaped = 0
+        for upload in stale:
+            if not upload.lock.acquire(blocking=False):
+                continue
+            try:
+                # An upload busy with a chunk is not idle; leave it for the next sweep.
+                if upload.completed or upload.receiving or upload.updated_at >= cutoff:
+                    continue
+                upload.completed = True
+            finally:
+                upload.lock.release()
+            with self._lock:
+                self._uploads.pop(upload.upload_id, None)
+            # A pass still running stops at its next frame instead of decoding a deleted file.
+            self._cancel_analysis(upload)
+            upload.raw_path.unlink(missing_ok=True)
+            reaped += 1
+            logger.info("Carga %s descartada por inactividad", upload.upload_id)
+        self.reaped += reaped
+        return reaped
+
+    def _maybe_reap(self) -> None:
+        now = time.time()
+        if self._idle_timeout <= 0 or now < self._next_sweep:
+            return
+        self._next_sweep = now + min(60.0, self._idle_timeout / 2)
+        self.reap_idle(now)
+
+    @staticmethod
+    def _cancel_analysis(upload: ChunkedUpload) -> None:
+        if upload.analysis is not None:
+            upload.analysis.cancel()
+        if upload.pending is not None:
+            upload.pending.cancel()
+
+    def _schedule_analysis(self, upload: ChunkedUpload) -> None:
+        if upload.analysis is None or upload.analysis.progressive is False:
+            return
+        if upload.received_bytes < self._analyze_min_bytes:
+            return
+        if upload.received_bytes <= upload.analyzed_bytes:
+            return
+        if upload.pending is not None and not upload.pending.done():
+            return
+        upload.analyzed_bytes = upload.received_bytes
+        upload.pending = self._executor.submit(upload.analysis.advance)
+        upload.pending.add_done_callback(lambda _future: self._resume_analysis(upload))
+
+    def _resume_analysis(self, upload: ChunkedUpload) -> None:
+        # Chunks that arrived while the previous pass was running are picked up here.
+        with upload.lock:
+            if not upload.completed:
+                self._schedule_analysis(upload)
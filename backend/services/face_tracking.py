@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+
+Box = Tuple[int, int, int, int]
+# (x0, y0, x1, y1, min_size, max_size)
+SearchWindow = Tuple[int, int, int, int, int, int]
+
+
+class FaceRegionTracker:
+    """Narrows the face search of a live session to the surroundings of its last faces.
+
+    After a full-frame scan, later frames are searched only inside windows that
+    expand each known box by ``margin`` of its size, looking for faces between
+    ``1 / size_tolerance`` and ``size_tolerance`` times the previous size. A full
+    scan runs every ``full_scan_every`` frames, and whenever a window loses its
+    face, so people entering the frame are still picked up.
+    """
+
+    def __init__(self, *, margin: float = 0.5, size_tolerance: float = 1.4, full_scan_every: int = 15) -> None:
+        self._margin = max(0.0, margin)
+        self._size_tolerance = max(1.0, size_tolerance)
+        self._full_scan_every = max(1, full_scan_every)
+        self._lock = Lock()
+        self._shape: Optional[Tuple[int, int]] = None
+        self._boxes: List[Box] = []
+        self._since_full_scan = 0
+        self._full_scans = 0
+        self._roi_scans = 0
+        self._fallbacks = 0
+
+    def windows(self, shape: Tuple[int, ...]) -> Optional[List[SearchWindow]]:
+        """Search windows for the next frame, or ``None`` when a full scan is due."""
+        height, width = shape[:2]
+        with self._lock:
+            if self._shape != (height, width):
+                self._shape = (height, width)
+                self._boxes = []
+            if not self._boxes or self._since_full_scan + 1 >= self._full_scan_every:
+                return None
+            windows = []
+            for x, y, w, h in self._boxes:
+                pad_x = int(w * self._margin)
+                pad_y = int(h * self._margin)
+                size = max(w, h)
+                windows.append(
+                    (
+                        max(0, x - pad_x),
+                        max(0, y - pad_y),
+                        min(width, x + w + pad_x),
+                        min(height, y + h + pad_y),
+                        max(1, int(size / self._size_tolerance)),
+                        int(size * self._size_tolerance),
+                    )
+                )
+            return windows
+
+    def update(self, boxes: Sequence[Box], *, full_scan: bool) -> None:
+        with self._lock:
+            self._boxes = [tuple(int(v) for v in box) for box in boxes]
+            if full_scan:
+                self._full_scans += 1
+                self._since_full_scan = 0
+            else:
+                self._roi_scans += 1
+                self._since_full_scan += 1
+
+    def record_fallback(self) -> None:
+        with self._lock:
+            self._fallbacks += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            scans = self._full_scans + self._roi_scans
+            return {
+                "full_scans": self._full_scans,
+                "roi_scans": self._roi_scans,
+                "fallbacks": self._fallbacks,
+                "roi_scan_ratio": round(self._roi_scans / scans, 3) if scans else 0.0,
+            }
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+from pathlib import Path
+from threading import Condition, Thread, get_ident
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional, Set
+import asyncio
+import os
+import time
+
+import cv2
+import numpy as np
+
+MJPEG_BOUNDARY = "frame"
+
+
+class SharedFrameFeed:
+    """Latest JPEG of one session in a file shared by the worker processes of a node.
+
+    The worker that ingests a frame replaces the file atomically; every worker
+    with viewers polls it. Viewers keep a marker file fresh so ingesting
+    workers only encode while someone, in any worker, is watching.
+    """
+
+    def __init__(self, path: Path, *, poll_interval: float = 0.05, watch_ttl: float = 3.0) -> None:
+        self.path = path
+        self.marker_path = path.with_name(path.name + ".watch")
+        self.poll_interval = poll_interval
+        self._watch_ttl = watch_ttl
+        self._marked_at = 0.0
+
+    def watched(self) -> bool:
+        try:
+            return time.time() - self.marker_path.stat().st_mtime < self._watch_ttl
+        except FileNotFoundError:
+            return False
+
+    def mark_watched(self) -> None:
+        now = time.time()
+        if now - self._marked_at >= 1.0:
+            self._marked_at = now
+            self.marker_path.touch()
+
+    def write(self, jpeg: bytes) -> None:
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}-{get_ident()}.tmp")
+        tmp_path.write_bytes(jpeg)
+        os.replace(tmp_path, self.path)
+
+    def read_if_changed(self, version: Optional[tuple]) -> tuple[Optional[tuple], Optional[bytes]]:
+        """Return the file's version and bytes, or ``None`` bytes when it is unchanged since ``version``."""
+        try:
+            stat = os.stat(self.path)
+            current = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if current == version:
+                return version, None
+            return current, self.path.read_bytes()
+        except FileNotFoundError:
+            return version, None
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+        self.marker_path.unlink(missing_ok=True)
+
+
+class FrameBroadcaster:
+    """Latest-frame buffer shared by every viewer of one live session.
+
+    ``publish`` only hands the frame to a background thread that encodes the
+    newest pending frame to JPEG while someone is watching, so ingestion never
+    waits on the encoder and frames published faster than they encode are
+    skipped. Viewers wait on a sequence number and all receive the same bytes,
+    so each extra viewer costs no encoding or inference. ``astream`` serves the
+    same parts to asyncio viewers without parking a thread per viewer.
+
+    With a ``feed`` the encoded frames go through a file shared by the worker
+    processes, and viewers in every worker get the frames of the whole session.
+    """
+
+    def __init__(self, *, jpeg_quality: int = 75, feed: Optional[SharedFrameFeed] = None) -> None:
+        self._jpeg_quality = int(jpeg_quality)
+        self._feed = feed
+        self._cond = Condition()
+        self._jpeg: Optional[bytes] = None
+        self._seq = 0
+        self._viewers = 0
+        self._closed = False
+        self._listeners: Set[Callable[[], None]] = set()
+        self._pending: Optional[np.ndarray] = None
+        self._encoder: Optional[Thread] = None
+        self._poller: Optional[Thread] = None
+        self.encoded_frames = 0
+
+    @property
+    def viewers(self) -> int:
+        with self._cond:
+            return self._viewers
+
+    def publish(self, frame: Optional[np.ndarray]) -> None:
+        if frame is None:
+            return
+        with self._cond:
+            if self._closed:
+                return
+            watched = self._viewers > 0
+        if not watched and (self._feed is None or not self._feed.watched()):
+            return
+        with self._cond:
+            self._pending = frame
+            if self._encoder is None:
+                self._encoder = Thread(target=self._encode_loop, name="frame-broadcast-encoder", daemon=True)
+                self._encoder.start()
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """Stop the viewers and background threads; removes the shared feed files."""
+        with self._cond:
+            self._closed = True
+            self._notify()
+            threads = [thread for thread in (self._encoder, self._poller) if thread is not None]
+        for thread in threads:
+            thread.join()
+        if self._feed is not None:
+            self._feed.remove()
+
+    def _encode_loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or self._pending is not None)
+                if self._closed:
+                    return
+                frame, self._pending = self._pending, None
+            ok, buffer = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), self._jpeg_quality])
+            if not ok:
+                continue
+            with self._cond:
+                self.encoded_frames += 1
+            if self._feed is not None:
+                self._feed.write(buffer.tobytes())
+            else:
+                self._deliver(buffer.tobytes())
+
+    def _poll_loop(self) -> None:
+        version = None
+        while True:
+            with self._cond:
+                if self._closed or not self._viewers:
+                    self._poller = None
+                    return
+            self._feed.mark_watched()
+            version, jpeg = self._feed.read_if_changed(version)
+            if jpeg is not None:
+                self._deliver(jpeg)
+            time.sleep(self._feed.poll_interval)
+
+    def _add_viewer(self) -> None:
+        # Called with the condition held.
+        self._viewers += 1
+        if self._feed is not None and self._poller is None and not self._closed:
+            self._poller = Thread(target=self._poll_loop, name="frame-broadcast-feed", daemon=True)
+            self._poller.start()
+
+    def _deliver(self, jpeg: bytes) -> None:
+        with self._cond:
+            self._jpeg = jpeg
+            self._seq += 1
+            self._notify()
+
+    def _notify(self) -> None:
+        self._cond.notify_all()
+        for listener in self._listeners:
+            listener()
+
+    def stream(self, keepalive_seconds: float = 5.0) -> Iterator[bytes]:
+        """Yield ``multipart/x-mixed-replace`` parts until the session closes."""
+        with self._cond:
+            self._add_viewer()
+            last_seq = 0
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._closed or self._seq != last_seq, timeout=keepalive_seconds)
+                    if self._closed:
+                        return
+                    jpeg, seq = self._jpeg, self._seq
+                if jpeg is None:
+                    continue
+                # On a keepalive timeout the last part is repeated so proxies keep
+                # the connection open and a gone viewer is noticed on write.
+                last_seq = seq
+                yield _mjpeg_part(jpeg)
+        finally:
+            with self._cond:
+                self._viewers -= 1
+
+    async def astream(self, keepalive_seconds: float = 5.0) -> AsyncIterator[bytes]:
+        """Asyncio counterpart of ``stream``; publishers wake it through the event loop."""
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+
+        def listener() -> None:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:  # the loop is already closed
+                pass
+
+        with self._cond:
+            self._add_viewer()
+            self._listeners.add(listener)
+        last_seq = 0
+        try:
+            while True:
+                with self._cond:
+                    closed, jpeg, seq = self._closed, self._jpeg, self._seq
+                if closed:
+                    return
+                if seq == last_seq:
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), timeout=keepalive_seconds)
+                    except asyncio.TimeoutError:
+                        pass
+                    wakeup.clear()
+                    with self._cond:
+                        closed, jpeg, seq = self._closed, self._jpeg, self._seq
+                    if closed:
+                        return
+                if jpeg is None:
+                    continue
+                last_seq = seq
+                yield _mjpeg_part(jpeg)
+        finally:
+            with self._cond:
+                self._viewers -= 1
+                self._listeners.discard(listener)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"viewers": self._viewers, "encoded_frames": self.encoded_frames}
+
+
+def _mjpeg_part(jpeg: bytes) -> bytes:
+    return (
+        f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode()
+        + jpeg
+        + b"\r\n"
+    )
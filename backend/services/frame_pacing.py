@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# (max frame width, JPEG quality) from richest to cheapest.
+QUALITY_LADDER: Tuple[Tuple[int, int], ...] = (
+    (1280, 85),
+    (960, 80),
+    (640, 75),
+    (480, 70),
+    (320, 60),
+)
+
+
+class FramePacer:
+    """Keeps one live session within a processing latency target.
+
+    Latency is smoothed with an exponential moving average. When it stays above
+    the target the session steps down ``QUALITY_LADDER`` (smaller frames, lower
+    JPEG quality); when it is well below, it steps back up. The suggested frame
+    interval follows the measured latency so clients never queue frames.
+    """
+
+    def __init__(
+        self,
+        *,
+        target_ms: float = 250.0,
+        min_interval_ms: int = 100,
+        max_interval_ms: int = 2000,
+        max_width: int = 1280,
+        smoothing: float = 0.3,
+        cooldown_frames: int = 5,
+    ) -> None:
+        self._target_ms = max(1.0, target_ms)
+        self._min_interval_ms = max(1, min_interval_ms)
+        self._max_interval_ms = max(self._min_interval_ms, max_interval_ms)
+        self._ladder = [step for step in QUALITY_LADDER if step[0] <= max_width] or [QUALITY_LADDER[-1]]
+        self._smoothing = min(1.0, max(0.01, smoothing))
+        self._cooldown_frames = max(1, cooldown_frames)
+        self._lock = Lock()
+        self._level = 0
+        self._latency_ms: Optional[float] = None
+        self._since_change = 0
+        self.clamped_frames = 0
+
+    @property
+    def max_width(self) -> int:
+        return self._ladder[self._level][0]
+
+    def clamp(self, frame: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Downscale ``frame`` to the current width; returns the frame and the factor back to the original."""
+        height, width = frame.shape[:2]
+        max_width = self.max_width
+        if width <= max_width:
+            return frame, 1.0
+        scale = max_width / float(width)
+        resized = cv2.resize(frame, (max_width, max(1, int(round(height * scale)))), interpolation=cv2.INTER_AREA)
+        with self._lock:
+            self.clamped_frames += 1
+        return resized, width / float(max_width)
+
+    def observe(self, latency_seconds: float) -> Dict:
+        latency_ms = latency_seconds * 1000.0
+        with self._lock:
+            if self._latency_ms is None:
+                self._latency_ms = latency_ms
+            else:
+                self._latency_ms += self._smoothing * (latency_ms - self._latency_ms)
+            self._since_change += 1
+            if self._since_change >= self._cooldown_frames:
+                if self._latency_ms > self._target_ms * 1.1 and self._level < len(self._ladder) - 1:
+                    self._level += 1
+                    self._since_change = 0
+                elif self._latency_ms < self._target_ms * 0.6 and self._level > 0:
+                    self._level -= 1
+                    self._since_change = 0
+            return self._hints()
+
+    def hints(self) -> Dict:
+        with self._lock:
+            return self._hints()
+
+    def _hints(self) -> Dict:
+        width, quality = self._ladder[self._level]
+        latency_ms = self._latency_ms or 0.0
+        interval_ms = int(min(self._max_interval_ms, max(self._min_interval_ms, latency_ms * 1.25)))
+        return {
+            "max_width": width,
+            "jpeg_quality": round(quality / 100.0, 2),
+            "interval_ms": interval_ms,
+            "latency_ms": round(latency_ms, 1),
+            "target_ms": self._target_ms,
+            "clamped_frames": self.clamped_frames,
+        }
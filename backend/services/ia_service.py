@@ -1,12 +1,23 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from pathlib import Path
+import hashlib
+import logging
 import threading
-from typing import List, Sequence
+from typing import Dict, List, Optional, Sequence
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import Pipeline
+import numpy as np
+
+from .sentiment_cache import SentimentCache, normalize_text
+from .sentiment_model import LoadedSentimentModel, SentimentModelStore, fit_pipeline
+from .text_segments import SENTENCE, Segment, split_segments
+
+logger = logging.getLogger(__name__)
+
+# Up to this many texts are scored with the compiled scorer instead of the Pipeline.
+FAST_SCORER_MAX_TEXTS = 32
+SEGMENT_PREVIEW_CHARS = 280
 
 
 @dataclass
@@ -17,6 +28,40 @@ class SentimentPayload:
     summary: str
 
 
+@dataclass
+class SegmentScore:
+    start: int
+    end: int
+    text: str
+    label: str
+    polarity: float
+
+    def to_dict(self) -> Dict:
+        return {
+            "start": self.start,
+            "end": self.end,
+            "text": self.text[:SEGMENT_PREVIEW_CHARS],
+            "label": self.label,
+            "polarity": self.polarity,
+        }
+
+
+@dataclass
+class DocumentSentiment(SentimentPayload):
+    segments: int
+    distribution: Dict[str, int]
+    strongest_positive: List[SegmentScore]
+    strongest_negative: List[SegmentScore]
+
+    def details(self) -> Dict:
+        return {
+            "segments": self.segments,
+            "distribution": self.distribution,
+            "strongest_positive": [segment.to_dict() for segment in self.strongest_positive],
+            "strongest_negative": [segment.to_dict() for segment in self.strongest_negative],
+        }
+
+
 TRAINING_DATA: Sequence[tuple[str, str]] = (
     # Positive
     ("Me encantó la experiencia del servicio y volveré pronto", "positive"),
@@ -46,46 +91,170 @@ TRAINING_DATA: Sequence[tuple[str, str]] = (
 
 
 class TextSentimentService:
-    """Sentiment classifier powered by a compact scikit-learn pipeline."""
+    """Sentiment classifier powered by a compact scikit-learn pipeline.
+
+    The pipeline is the one published in ``model_dir`` by
+    ``python -m services.sentiment_model``; without a published model it is
+    fitted in-process from ``TRAINING_DATA`` as before.
+    """
 
-    def __init__(self) -> None:
-        self._pipeline: Pipeline | None = None
+    def __init__(
+        self,
+        model_dir: Optional[Path] = None,
+        *,
+        reload_interval: float = 30.0,
+        cache_size: int = 10000,
+    ) -> None:
+        self._store = SentimentModelStore(model_dir, reload_interval=reload_interval) if model_dir else None
+        self._fallback: LoadedSentimentModel | None = None
         self._lock = threading.Lock()
+        self._cache = SentimentCache(cache_size) if cache_size > 0 else None
+
+    @property
+    def model_version(self) -> str:
+        return self._current_model().version
+
+    @property
+    def classes(self) -> List[str]:
+        return [str(label) for label in self._current_model().pipeline.classes_]
+
+    def warm_up(self) -> Optional[str]:
+        """Load the published model now instead of on the first request."""
+        model = self._store.current() if self._store is not None else None
+        return model.version if model is not None else None
+
+    def cache_stats(self) -> Optional[Dict]:
+        return self._cache.stats() if self._cache is not None else None
 
     def analyze(self, text: str) -> SentimentPayload:
         if not text or not text.strip():
             raise ValueError("Input text is required for analysis.")
+        return self.analyze_many([text])[0]
 
-        pipeline = self._ensure_model()
-        prediction = pipeline.predict([text])[0]
-        probabilities = pipeline.predict_proba([text])[0]
-        classes: List[str] = list(pipeline.classes_)
-        score_lookup = {label: prob for label, prob in zip(classes, probabilities)}
+    def analyze_many(self, texts: Sequence[str]) -> List[SentimentPayload]:
+        """Score a batch with a single TF-IDF transform and ``predict_proba`` call."""
+        if any(not text or not text.strip() for text in texts):
+            raise ValueError("Input text is required for analysis.")
+        if not texts:
+            return []
+
+        model = self._current_model()
+        probabilities = self._probabilities(model, texts)
+        classes: List[str] = list(model.pipeline.classes_)
+        # Labels come from the same probabilities instead of a second predict() pass.
+        predictions = np.asarray(classes)[probabilities.argmax(axis=1)]
+        positive_scores, negative_scores, neutral_scores = _label_columns(classes, probabilities)
+
+        polarities = np.round(positive_scores - negative_scores, 4)
+        subjectivities = np.round(1.0 - neutral_scores, 4)
+        return [
+            SentimentPayload(
+                str(predictions[row]),
+                float(polarities[row]),
+                float(subjectivities[row]),
+                self._build_summary(text, str(predictions[row]), positive_scores[row], negative_scores[row]),
+            )
+            for row, text in enumerate(texts)
+        ]
 
-        positive_score = score_lookup.get("positive", 0.0)
-        negative_score = score_lookup.get("negative", 0.0)
-        neutral_score = score_lookup.get("neutral", 0.0)
+    def analyze_document(
+        self, text: str, *, granularity: str = SENTENCE, top: int = 3, max_segments: int = 2000
+    ) -> DocumentSentiment:
+        """Score a long text segment by segment in one batch and aggregate the result.
+
+        Segment probabilities are averaged weighted by segment length, so the
+        label and polarity reflect the whole document rather than a single bag
+        of n-grams, and the most positive and negative segments are reported.
+        """
+        if not text or not text.strip():
+            raise ValueError("Input text is required for analysis.")
+        segments = split_segments(text, granularity, max_segments=max_segments)
+        model = self._current_model()
+        probabilities = self._probabilities(model, [segment.text for segment in segments])
+        classes: List[str] = [str(name) for name in model.pipeline.classes_]
+        positive_scores, negative_scores, neutral_scores = _label_columns(classes, probabilities)
+        labels = np.asarray(classes)[probabilities.argmax(axis=1)]
+        polarities = np.round(positive_scores - negative_scores, 4)
+
+        weights = np.fromiter((segment.end - segment.start for segment in segments), dtype=np.float64)
+        overall = weights @ probabilities / weights.sum()
+        positive, negative, neutral = (float(column[0]) for column in _label_columns(classes, overall[None, :]))
+        label = classes[int(overall.argmax())]
+
+        order = np.argsort(polarities, kind="stable")
+        strongest_negative = [
+            _segment_score(segments[index], labels[index], polarities[index])
+            for index in order[:top]
+            if polarities[index] < 0
+        ]
+        strongest_positive = [
+            _segment_score(segments[index], labels[index], polarities[index])
+            for index in order[::-1][:top]
+            if polarities[index] > 0
+        ]
+        lead = {"positive": strongest_positive, "negative": strongest_negative}.get(label)
+        snippet = lead[0].text if lead else segments[0].text
+        distribution = {name: int(np.count_nonzero(labels == name)) for name in classes}
+        return DocumentSentiment(
+            label=label,
+            polarity=round(positive - negative, 4),
+            subjectivity=round(1.0 - neutral, 4),
+            summary=self._build_summary(snippet, label, positive, negative),
+            segments=len(segments),
+            distribution=distribution,
+            strongest_positive=strongest_positive,
+            strongest_negative=strongest_negative,
+        )
 
-        polarity = round(positive_score - negative_score, 4)
-        subjectivity = round(1.0 - neutral_score, 4)
-        summary = self._build_summary(text, prediction, positive_score, negative_score)
-        return SentimentPayload(prediction, polarity, subjectivity, summary)
+    def _probabilities(self, model: LoadedSentimentModel, texts: Sequence[str]) -> np.ndarray:
+        """``predict_proba`` for ``texts``, answering repeated texts from the cache."""
+        if self._cache is None:
+            return _predict_proba(model, texts)
 
-    def _ensure_model(self) -> Pipeline:
-        if self._pipeline is not None:
-            return self._pipeline
+        rows: List[Optional[np.ndarray]] = [None] * len(texts)
+        pending: Dict[str, List[int]] = {}
+        uncached: List[int] = []
+        for index, text in enumerate(texts):
+            key = normalize_text(text)
+            if not self._cache.cacheable(key):
+                uncached.append(index)
+                continue
+            if key in pending:
+                pending[key].append(index)
+                continue
+            row = self._cache.get(model.version, key)
+            if row is None:
+                pending[key] = [index]
+            else:
+                rows[index] = row
+
+        # Every miss, plus the uncacheable texts, goes through one predict_proba call.
+        misses = [indexes[0] for indexes in pending.values()] + uncached
+        if misses:
+            scored = _predict_proba(model, [texts[index] for index in misses])
+            for position, (key, indexes) in enumerate(pending.items()):
+                self._cache.put(model.version, key, scored[position])
+                for index in indexes:
+                    rows[index] = scored[position]
+            for position, index in enumerate(uncached, start=len(pending)):
+                rows[index] = scored[position]
+        return np.vstack(rows)
+
+    def _current_model(self) -> LoadedSentimentModel:
+        if self._store is not None:
+            model = self._store.current()
+            if model is not None:
+                return model
+        if self._fallback is not None:
+            return self._fallback
         with self._lock:
-            if self._pipeline is None:
-                texts = [sample for sample, _ in TRAINING_DATA]
-                labels = [label for _, label in TRAINING_DATA]
-                self._pipeline = Pipeline(
-                    steps=[
-                        ("tfidf", TfidfVectorizer(ngram_range=(1, 2), max_features=5000)),
-                        ("clf", LogisticRegression(max_iter=400, multi_class="auto")),
-                    ]
+            if self._fallback is None:
+                logger.warning("Sin modelo de sentimiento publicado; se entrena en este proceso.")
+                digest = hashlib.sha256(repr(tuple(TRAINING_DATA)).encode("utf-8")).hexdigest()
+                self._fallback = LoadedSentimentModel.from_pipeline(
+                    f"inline-{digest[:8]}", digest, fit_pipeline(TRAINING_DATA)
                 )
-                self._pipeline.fit(texts, labels)
-        return self._pipeline
+        return self._fallback
 
     def _build_summary(self, text: str, label: str, pos_score: float, neg_score: float) -> str:
         snippet = (text.strip().splitlines() or [""])[0][:180].strip()
@@ -95,3 +264,21 @@ class TextSentimentService:
             if snippet
             else f"{label.title()} sentiment detected."
         )
+
+
+def _label_columns(classes: Sequence[str], probabilities: np.ndarray):
+    columns = {label: probabilities[:, index] for index, label in enumerate(classes)}
+    zeros = np.zeros(len(probabilities))
+    return columns.get("positive", zeros), columns.get("negative", zeros), columns.get("neutral", zeros)
+
+
+def _segment_score(segment: Segment, label: str, polarity: float) -> SegmentScore:
+    return SegmentScore(segment.start, segment.end, segment.text, str(label), float(polarity))
+
+
+def _predict_proba(model: LoadedSentimentModel, texts: Sequence[str]) -> np.ndarray:
+    # Small batches skip sklearn's validation and dispatch; large ones amortize
+    # it over a single sparse matrix product.
+    if model.scorer is not None and len(texts) <= FAST_SCORER_MAX_TEXTS:
+        return model.scorer.predict_proba(texts)
+    return model.pipeline.predict_proba(list(texts))
@@ -1,17 +1,52 @@
 from __future__ import annotations
 
-from collections import Counter
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+import heapq
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from threading import Lock
-from typing import Dict, Optional
+from threading import Condition, Lock, Thread
+from typing import AsyncIterator, Callable, Deque, Dict, Iterator, Optional
 from uuid import uuid4
+import json
+import logging
+import os
+import shutil
 import time
 
 import cv2
 import numpy as np
 
+from .face_tracking import FaceRegionTracker
+from .frame_broadcast import FrameBroadcaster, SharedFrameFeed
+from .frame_pacing import FramePacer
+from .rolling_stats import RollingEmotionStats, SharedRollingStats
+from .session_store import (
+    FINALIZATION_DONE,
+    FINALIZATION_FAILED,
+    FINALIZATION_PENDING,
+    FINALIZATION_RUNNING,
+    STATUS_ACTIVE,
+    MemorySessionStore,
+    SessionRecord,
+    SessionState,
+)
+from .session_timeline import RAW_SUFFIX, TimelineWriter, merge_timeline, timeline_dir_for, timeline_path_for
+from .snapshot_index import SharedSnapshotIndex, SnapshotIndex
+from .temporal_cache import TemporalCache
+
+logger = logging.getLogger(__name__)
+
+DROP_POLICIES = {"oldest", "newest"}
+SEGMENTS_SUFFIX = ".segments"
+MANIFEST_NAME = "manifest.json"
+COMPACTION_LOCK_NAME = ".compacting"
+COMPACTION_LOCK_STALE_SECONDS = 600
+LIVE_FRAME_SUFFIX = ".live.jpg"
+# A worker that dies mid-inference keeps the shared slot at most this long.
+INFERENCE_LEASE_SECONDS = 30.0
+
 
 class LiveSessionError(RuntimeError):
     """Raised when a requested live session is not available."""
@@ -33,26 +68,532 @@ class LiveSessionSummary:
     finished_at: datetime
     emotion_snapshots: Dict[str, str] = field(default_factory=dict)
     emotion_confidences: Dict[str, float] = field(default_factory=dict)
+    encoder_stats: Dict[str, int] = field(default_factory=dict)
+    stream_segments_relative: Optional[str] = None
+    timeline_relative: Optional[str] = None
+    timeline_labels: list[str] = field(default_factory=list)
+
+
+def _write_json_atomic(path: Path, payload: Dict) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _relative_to(root: Path, path: Optional[Path]) -> Optional[str]:
+    if path is None:
+        return None
+    try:
+        return path.relative_to(root).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def _summarize(
+    record: SessionRecord,
+    state: SessionState,
+    *,
+    tracked_root: Path,
+    stream_path: Path,
+    labels: list[str],
+    label_snapshots: Dict[str, Path],
+    last_snapshot_path: Optional[Path],
+    encoder_stats: Dict[str, int],
+) -> LiveSessionSummary:
+    """Summary of a stopped session from its store state.
+
+    The timeline path is reported before it exists: the raw files are merged by
+    ``compact_segments`` once every worker has closed its recording.
+    """
+    timeline_path = timeline_path_for(stream_path) if timeline_dir_for(stream_path).is_dir() else None
+    started_at = datetime.utcfromtimestamp(record.started_at)
+    finished_at = datetime.utcnow()
+    counts = Counter(state.counts)
+    dominant = counts.most_common(1)[0][0] if counts else None
+    emotion_snapshot_map = {label: _relative_to(tracked_root, path) for label, path in label_snapshots.items()}
+    return LiveSessionSummary(
+        session_id=record.session_id,
+        user_id=record.user_id,
+        channel=record.channel,
+        counts=dict(counts),
+        dominant_emotion=dominant,
+        confidence=state.confidence,
+        snapshot_relative=_relative_to(tracked_root, last_snapshot_path),
+        stream_relative=_relative_to(tracked_root, stream_path if state.frames else None),
+        duration_seconds=(finished_at - started_at).total_seconds(),
+        frames=state.frames,
+        started_at=started_at,
+        finished_at=finished_at,
+        emotion_snapshots={k: v for k, v in emotion_snapshot_map.items() if v},
+        emotion_confidences=dict(state.best_confidences),
+        encoder_stats=encoder_stats,
+        stream_segments_relative=_relative_to(tracked_root, segment_dir_for(stream_path) if state.frames else None),
+        timeline_relative=_relative_to(tracked_root, timeline_path),
+        timeline_labels=list(labels),
+    )
+
+
+def segment_dir_for(stream_path: Path) -> Path:
+    return stream_path.with_name(stream_path.stem + SEGMENTS_SUFFIX)
+
+
+def _worker_segment_dirs(segment_dir: Path) -> list[Path]:
+    # Each worker process records into its own sub-directory; recordings made
+    # before per-worker directories existed keep the manifest at the top level.
+    if (segment_dir / MANIFEST_NAME).exists():
+        return [segment_dir]
+    if not segment_dir.is_dir():
+        return []
+    return sorted(path for path in segment_dir.iterdir() if (path / MANIFEST_NAME).exists())
+
+
+def _load_manifests(segment_dir: Path, wait_timeout: float) -> list[tuple[Path, Dict]]:
+    deadline = time.time() + wait_timeout
+    while True:
+        manifests = []
+        for worker_dir in _worker_segment_dirs(segment_dir):
+            try:
+                manifests.append((worker_dir, json.loads((worker_dir / MANIFEST_NAME).read_text(encoding="utf-8"))))
+            except (OSError, ValueError):
+                logger.warning("Manifest de segmentos ilegible en %s", worker_dir)
+        if all(manifest.get("complete") for _, manifest in manifests) or time.time() >= deadline:
+            return manifests
+        time.sleep(0.5)
+
+
+def _iter_worker_frames(worker_dir: Path, manifest: Dict):
+    next_seq = 0
+    for segment in sorted(manifest.get("segments", []), key=lambda item: item.get("index", 0)):
+        seqs = segment.get("seqs") or []
+        capture = cv2.VideoCapture(str(worker_dir / segment["file"]))
+        try:
+            position = 0
+            while capture.isOpened():
+                grabbed, frame = capture.read()
+                if not grabbed:
+                    break
+                seq = seqs[position] if position < len(seqs) else next_seq
+                position += 1
+                next_seq = seq + 1
+                yield seq, frame
+        finally:
+            capture.release()
+
+
+def _acquire_compaction_lock(segment_dir: Path) -> bool:
+    lock_path = segment_dir / COMPACTION_LOCK_NAME
+    try:
+        if time.time() - lock_path.stat().st_mtime > COMPACTION_LOCK_STALE_SECONDS:
+            lock_path.unlink(missing_ok=True)
+    except FileNotFoundError:
+        pass
+    try:
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return False
+    return True
+
+
+def compact_segments(
+    segment_dir: Path,
+    target_path: Optional[Path] = None,
+    wait_timeout: float = 0.0,
+) -> Optional[Path]:
+    """Join the recorded segments of a session into a single mp4.
+
+    Frames of every worker that recorded the session are merged by their
+    global sequence number. Waits up to ``wait_timeout`` seconds for workers
+    to close their manifests; segments that cannot be decoded (e.g. the one
+    open when a process died) are skipped. The segment directory is removed
+    once the target exists. The session timeline is merged after the same
+    wait, since workers close their raw timeline before their manifest.
+    """
+    if not segment_dir.is_dir() or not _acquire_compaction_lock(segment_dir):
+        return None
+    manifests = _load_manifests(segment_dir, wait_timeout)
+    first_manifest = manifests[0][1] if manifests else {}
+    if target_path is None:
+        target_path = segment_dir.parent / first_manifest.get("target", segment_dir.stem + ".mp4")
+    raw_timeline = timeline_dir_for(target_path)
+    if raw_timeline.is_dir():
+        merge_timeline(raw_timeline, timeline_path_for(target_path))
+    if not manifests:
+        (segment_dir / COMPACTION_LOCK_NAME).unlink(missing_ok=True)
+        return None
+
+    partial_path = target_path.with_name(f"{target_path.stem}.partial{target_path.suffix}")
+    fps = max(1, int(first_manifest.get("fps") or 1))
+    writer: Optional[cv2.VideoWriter] = None
+    frame_size: Optional[tuple[int, int]] = None
+    streams = [_iter_worker_frames(worker_dir, manifest) for worker_dir, manifest in manifests]
+    try:
+        for _, frame in heapq.merge(*streams, key=lambda item: item[0]):
+            if writer is None:
+                height, width = frame.shape[:2]
+                frame_size = (width, height)
+                fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+                writer = cv2.VideoWriter(str(partial_path), fourcc, fps, frame_size)
+            if (frame.shape[1], frame.shape[0]) != frame_size:
+                frame = cv2.resize(frame, frame_size)
+            writer.write(frame)
+    finally:
+        if writer is not None:
+            writer.release()
+
+    if writer is None:
+        partial_path.unlink(missing_ok=True)
+        (segment_dir / COMPACTION_LOCK_NAME).unlink(missing_ok=True)
+        return None
+    os.replace(partial_path, target_path)
+    shutil.rmtree(segment_dir, ignore_errors=True)
+    return target_path
+
+
+class SessionEncoder:
+    """Background thread that writes the session video and snapshot files.
+
+    The video is split into segments of ``segment_frames`` frames listed in a
+    ``manifest.json`` next to them, so closing the recording only finalizes the
+    current short segment. Frames wait in a bounded queue; when it is full
+    either the oldest pending frame or the incoming one is dropped, depending
+    on ``drop_policy``. Snapshots are never dropped and do not count against
+    the bound.
+    """
+
+    def __init__(
+        self,
+        *,
+        segment_dir: Path,
+        target_name: str,
+        video_fps: int,
+        segment_frames: int,
+        queue_size: int,
+        drop_policy: str = "oldest",
+        name: str = "session",
+    ) -> None:
+        self.segment_dir = segment_dir
+        self.manifest_path = segment_dir / MANIFEST_NAME
+        self.video_fps = max(1, video_fps)
+        self._segment_frames = max(1, segment_frames)
+        self._segments: list[Dict] = []
+        self._target_name = target_name
+        self._max_frames = max(1, queue_size)
+        self._drop_policy = drop_policy if drop_policy in DROP_POLICIES else "oldest"
+        self._pending: Deque[tuple[str, np.ndarray, object]] = deque()
+        self._pending_frames = 0
+        self._condition = Condition()
+        self._closing = False
+        self._video_writer: Optional[cv2.VideoWriter] = None
+        self._frame_size: Optional[tuple[int, int]] = None
+        self._stats = Counter()
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+        self._write_manifest(complete=False)
+        self._thread = Thread(target=self._run, name=f"session-encoder-{name}", daemon=True)
+        self._thread.start()
+
+    def submit_frame(self, frame: np.ndarray, seq: Optional[int] = None) -> bool:
+        with self._condition:
+            if self._closing:
+                return False
+            if self._pending_frames >= self._max_frames:
+                self._stats["frames_dropped"] += 1
+                if self._drop_policy == "newest":
+                    return False
+                self._drop_oldest_frame()
+            self._pending.append(("frame", frame, seq))
+            self._pending_frames += 1
+            self._stats["frames_enqueued"] += 1
+            self._condition.notify()
+        return True
+
+    def submit_snapshot(self, destination: Path, frame: np.ndarray) -> None:
+        with self._condition:
+            if self._closing:
+                raise LiveSessionError("El codificador de la sesión ya fue cerrado.")
+            self._pending.append(("snapshot", frame, destination))
+            self._stats["snapshots_enqueued"] += 1
+            self._condition.notify()
+
+    def close(self) -> Dict[str, int]:
+        """Drain pending work, finalize the video file and return the final stats."""
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        self._thread.join()
+        return self.stats()
+
+    @property
+    def has_frames(self) -> bool:
+        return self._stats["frames_written"] > 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {
+                "frames_queued": self._pending_frames,
+                "frames_enqueued": self._stats["frames_enqueued"],
+                "frames_written": self._stats["frames_written"],
+                "frames_dropped": self._stats["frames_dropped"],
+                "snapshots_written": self._stats["snapshots_written"],
+                "write_errors": self._stats["write_errors"],
+                "segments": len(self._segments),
+            }
+
+    def pending_bytes(self) -> int:
+        with self._condition:
+            return sum(frame.nbytes for _, frame, _ in self._pending if frame is not None)
+
+    def _drop_oldest_frame(self) -> None:
+        for index, item in enumerate(self._pending):
+            if item[0] == "frame":
+                del self._pending[index]
+                self._pending_frames -= 1
+                return
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._closing:
+                    self._condition.wait()
+                if not self._pending:
+                    break
+                kind, frame, extra = self._pending.popleft()
+                if kind == "frame":
+                    self._pending_frames -= 1
+            try:
+                if kind == "frame":
+                    self._write_frame(frame, extra)
+                    counter = "frames_written"
+                else:
+                    if not cv2.imwrite(str(extra), frame):
+                        raise OSError(f"cv2.imwrite failed for {extra}")
+                    counter = "snapshots_written"
+            except Exception:  # pragma: no cover - keep encoding the rest of the session
+                logger.exception("Session encoder failed to write %s", kind)
+                counter = "write_errors"
+            with self._condition:
+                self._stats[counter] += 1
+        self._close_segment()
+        self._write_manifest(complete=True)
+
+    def _write_frame(self, frame: np.ndarray, seq: Optional[int]) -> None:
+        if self._frame_size is None:
+            height, width = frame.shape[:2]
+            self._frame_size = (width, height)
+        if self._video_writer is not None and self._segments[-1]["frames"] >= self._segment_frames:
+            self._close_segment()
+        if self._video_writer is None:
+            self._open_segment()
+        if (frame.shape[1], frame.shape[0]) != self._frame_size:
+            frame = cv2.resize(frame, self._frame_size)
+        self._video_writer.write(frame)
+        self._segments[-1]["frames"] += 1
+        if seq is not None:
+            self._segments[-1]["seqs"].append(seq)
+
+    def _open_segment(self) -> None:
+        index = len(self._segments)
+        filename = f"segment_{index:05d}.mp4"
+        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+        self._video_writer = cv2.VideoWriter(
+            str(self.segment_dir / filename), fourcc, self.video_fps, self._frame_size
+        )
+        self._segments.append(
+            {"index": index, "file": filename, "frames": 0, "seqs": [], "started_at": time.time(), "closed": False}
+        )
+        self._write_manifest(complete=False)
+
+    def _close_segment(self) -> None:
+        if self._video_writer is None:
+            return
+        self._video_writer.release()
+        self._video_writer = None
+        self._segments[-1]["closed"] = True
+        self._write_manifest(complete=False)
+
+    def _write_manifest(self, *, complete: bool) -> None:
+        _write_json_atomic(
+            self.manifest_path,
+            {
+                "target": self._target_name,
+                "fps": self.video_fps,
+                "frame_size": list(self._frame_size) if self._frame_size else None,
+                "segment_frames": self._segment_frames,
+                "complete": complete,
+                "segments": self._segments,
+            },
+        )
+
+
+def _worker_id() -> str:
+    return f"worker-{os.getpid()}"
+
+
+class FrameSlot:
+    """Outcome of ``FrameGate.admit``; admitted slots must be released."""
+
+    def __init__(
+        self,
+        gate: "FrameGate",
+        admitted: bool,
+        last_payload: Optional[Dict],
+        dropped: int,
+        ticket: int = 0,
+    ) -> None:
+        self._gate = gate
+        self.admitted = admitted
+        self.last_payload = last_payload
+        self.dropped = dropped
+        self.ticket = ticket
+        self._released = not admitted
+
+    def release(self, payload: Optional[Dict] = None) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._gate._release(payload, self.ticket)
+
+
+class FrameGate:
+    """Latest-frame-wins admission for one session.
+
+    At most one frame runs through inference at a time. A frame waiting for
+    that slot is dropped as soon as a newer frame for the same session arrives,
+    and is answered from the last published result instead; otherwise it runs
+    as soon as the slot frees, however long that takes.
+    """
+
+    def __init__(self) -> None:
+        self._cond = Condition()
+        self._busy = False
+        self._latest_ticket = 0
+        self._last_payload: Optional[Dict] = None
+        self.admitted = 0
+        self.dropped = 0
+
+    def admit(self) -> FrameSlot:
+        with self._cond:
+            self._latest_ticket += 1
+            ticket = self._latest_ticket
+            # Wake an older waiter so it notices it has been superseded.
+            self._cond.notify_all()
+            while self._busy and self._latest_ticket == ticket:
+                self._cond.wait()
+            if self._latest_ticket != ticket:
+                self.dropped += 1
+                return FrameSlot(self, False, self._last_payload, self.dropped)
+            self._busy = True
+            self.admitted += 1
+            return FrameSlot(self, True, None, self.dropped, ticket)
+
+    def discard(self, count: int = 1) -> FrameSlot:
+        """Count frames superseded before reaching ``admit`` (e.g. queued on a socket)."""
+        with self._cond:
+            self.dropped += count
+            return FrameSlot(self, False, self._last_payload, self.dropped)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"admitted": self.admitted, "dropped": self.dropped}
+
+    def _release(self, payload: Optional[Dict], ticket: int) -> None:
+        with self._cond:
+            self._busy = False
+            if payload is not None:
+                self._last_payload = payload
+            self._cond.notify_all()
+
+
+class SharedFrameGate(FrameGate):
+    """``FrameGate`` whose tickets and inference slot live in the shared session store.
+
+    Every worker takes tickets from the same counter, so a frame waiting in one
+    worker is superseded by a newer frame posted to any other. Waiters poll the
+    store while the slot is busy (a release in the same worker wakes them at
+    once); a slot held by a worker that died is reclaimed when its lease ends.
+    """
+
+    def __init__(
+        self,
+        store,
+        session_id: str,
+        *,
+        poll_interval: float = 0.02,
+        lease_seconds: float = INFERENCE_LEASE_SECONDS,
+    ) -> None:
+        super().__init__()
+        self._store = store
+        self._session_id = session_id
+        self._poll_interval = poll_interval
+        self._lease_seconds = lease_seconds
+
+    def admit(self) -> FrameSlot:
+        ticket = self._store.next_frame_ticket(self._session_id)
+        with self._cond:
+            self._cond.notify_all()
+        while True:
+            outcome = self._store.claim_inference(self._session_id, ticket, time.time(), self._lease_seconds)
+            if outcome is not None:
+                break
+            with self._cond:
+                self._cond.wait(self._poll_interval)
+        _, dropped, last_payload = self._store.frame_gate(self._session_id)
+        if not outcome:
+            return FrameSlot(self, False, last_payload, dropped)
+        return FrameSlot(self, True, None, dropped, ticket)
+
+    def discard(self, count: int = 1) -> FrameSlot:
+        self._store.discard_frames(self._session_id, count)
+        _, dropped, last_payload = self._store.frame_gate(self._session_id)
+        return FrameSlot(self, False, last_payload, dropped)
+
+    def stats(self) -> Dict[str, int]:
+        admitted, dropped, _ = self._store.frame_gate(self._session_id)
+        return {"admitted": admitted, "dropped": dropped}
+
+    def _release(self, payload: Optional[Dict], ticket: int) -> None:
+        self._store.release_inference(self._session_id, ticket, payload)
+        with self._cond:
+            self._cond.notify_all()
 
 
 class LiveSession:
+    """Worker-local handle of a live session.
+
+    Counters, confidences, snapshot paths, snapshot hashes and rolling
+    windows live in the session store so any worker can ingest frames; each
+    worker owns the writer of its own segment stream and the face crops it has
+    seen. Pacing, the temporal cache and the face regions are per-worker hints:
+    with several workers each one learns from the frames it receives.
+    """
+
     def __init__(
         self,
+        record: SessionRecord,
+        store,
         *,
-        user_id: int,
-        channel: str,
         tracked_root: Path,
         emotion_subdir: str,
         stream_subdir: str,
         labels: list[str],
         snapshot_interval: int,
         video_fps: int,
+        segment_seconds: int = 10,
+        encoder_queue_size: int = 24,
+        encoder_drop_policy: str = "oldest",
+        pacing: Optional[Dict] = None,
+        temporal_cache: Optional[Dict] = None,
+        face_tracking: Optional[Dict] = None,
+        stat_windows: tuple[float, ...] = (10.0, 60.0),
+        snapshot_hash_distance: int = 6,
+        broadcaster: Optional[FrameBroadcaster] = None,
     ) -> None:
-        self.session_id = uuid4().hex
-        self.user_id = user_id
-        self.channel = channel
-        self.started_at = datetime.utcnow()
+        self._record = record
+        self.session_id = record.session_id
+        self.user_id = record.user_id
+        self.channel = record.channel
+        self.started_at = datetime.utcfromtimestamp(record.started_at)
         self.finished_at: Optional[datetime] = None
+        self._store = store
 
         self.tracked_root = tracked_root
         self.emotion_root = tracked_root / emotion_subdir
@@ -62,39 +603,45 @@ class LiveSession:
         for label in labels:
             (self.emotion_root / label.lower()).mkdir(parents=True, exist_ok=True)
 
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
-        self.stream_path = self.stream_root / f"session_{timestamp}_{self.session_id}.mp4"
+        self.stream_path = self.stream_root / record.stream_name
         self.snapshot_interval = snapshot_interval
         self.video_fps = max(1, video_fps)
 
-        self._counts: Counter[str] = Counter()
-        self._last_snapshot_ts = 0.0
-        self._last_snapshot_path: Optional[Path] = None
-        self._label_snapshots: Dict[str, Path] = {}
-        self._video_writer: Optional[cv2.VideoWriter] = None
-        self._frame_size: Optional[tuple[int, int]] = None
-        self._frames = 0
-        self._latest_confidence: Optional[float] = None
-        self._latest_dominant: Optional[str] = None
+        self.segment_root = segment_dir_for(self.stream_path)
+        self._encoder = SessionEncoder(
+            segment_dir=self.segment_root / _worker_id(),
+            target_name=self.stream_path.name,
+            video_fps=self.video_fps,
+            segment_frames=self.video_fps * max(1, segment_seconds),
+            queue_size=encoder_queue_size,
+            drop_policy=encoder_drop_policy,
+            name=self.session_id[:8],
+        )
+        self.labels = list(labels)
+        self._label_index = {label: index for index, label in enumerate(self.labels)}
+        self._started_ts = record.started_at
+        self.timeline_dir = timeline_dir_for(self.stream_path)
+        self._timeline = TimelineWriter(self.timeline_dir / f"{_worker_id()}.bin")
+        if store.shared:
+            self.snapshot_index = SharedSnapshotIndex(store, self.session_id, max_distance=snapshot_hash_distance)
+            self.rolling_stats = SharedRollingStats(store, self.session_id, labels, windows=stat_windows)
+        else:
+            self.snapshot_index = SnapshotIndex(max_distance=snapshot_hash_distance)
+            # Sized for the longest window at 30 fps; frames beyond that just shorten it.
+            self.rolling_stats = RollingEmotionStats(
+                labels, windows=stat_windows, capacity=int(max(stat_windows, default=60.0) * 30)
+            )
+        self.broadcaster = broadcaster if broadcaster is not None else FrameBroadcaster()
+        self.frame_gate = SharedFrameGate(store, self.session_id) if store.shared else FrameGate()
+        self.pacer = FramePacer(**(pacing or {}))
+        self.temporal_cache = TemporalCache(**(temporal_cache or {}))
+        self.face_tracker = FaceRegionTracker(**(face_tracking or {}))
         self._latest_snapshot_frame: Optional[np.ndarray] = None
         self._last_face_by_label: Dict[str, np.ndarray] = {}
-        self._emotion_best_confidences: Dict[str, float] = {}
-
-    def _ensure_writer(self, frame: np.ndarray) -> None:
-        if self._video_writer is not None:
-            return
-        height, width = frame.shape[:2]
-        self._frame_size = (width, height)
-        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-        self._video_writer = cv2.VideoWriter(str(self.stream_path), fourcc, self.video_fps, (width, height))
+        self.last_activity = time.monotonic()
 
     def _relative_path(self, path: Optional[Path]) -> Optional[str]:
-        if path is None:
-            return None
-        try:
-            return path.relative_to(self.tracked_root).as_posix()
-        except ValueError:
-            return path.as_posix()
+        return _relative_to(self.tracked_root, path)
 
     def ingest(
         self,
@@ -103,15 +650,29 @@ class LiveSession:
         annotated_frame: Optional[np.ndarray],
         face_frame: Optional[np.ndarray] = None,
         emotion_faces: Optional[Dict[str, Dict[str, object]]] = None,
+        started_at: Optional[float] = None,
     ) -> Dict:
-        self._ensure_writer(frame)
-        self._video_writer.write(frame)
-        self._frames += 1
+        state = self._store.record_frame(
+            self.session_id,
+            dict(Counter(summary.get("counts") or {})),
+            summary.get("dominant_emotion"),
+            summary.get("confidence"),
+            summary.get("emotion_confidences") or {},
+        )
+        if state is None:
+            raise LiveSessionError("Sesión en vivo no encontrada o finalizada.")
+        self.last_activity = time.monotonic()
+        self._encoder.submit_frame(frame, seq=state.frames)
+        self._timeline.append(
+            time.time() - self._started_ts,
+            state.frames,
+            self._label_index.get(summary.get("dominant_emotion"), -1),
+            summary.get("confidence"),
+            len(summary.get("detections") or []),
+        )
+        self.rolling_stats.push(summary.get("counts") or {}, summary.get("confidence"))
 
-        counts = Counter(summary.get("counts") or {})
-        self._counts.update(counts)
-        self._latest_dominant = summary.get("dominant_emotion") or self._latest_dominant
-        self._latest_confidence = summary.get("confidence") or self._latest_confidence
+        latest_dominant = state.dominant_emotion
         if face_frame is not None and face_frame.size != 0:
             self._latest_snapshot_frame = face_frame
         elif annotated_frame is not None:
@@ -119,100 +680,134 @@ class LiveSession:
         else:
             self._latest_snapshot_frame = frame
 
-        for label, conf in (summary.get("emotion_confidences") or {}).items():
-            self._emotion_best_confidences[label] = max(
-                conf,
-                self._emotion_best_confidences.get(label, 0.0),
-            )
+        self.broadcaster.publish(annotated_frame if annotated_frame is not None else frame)
 
+        candidates: Dict[str, tuple[np.ndarray, float]] = {}
         if emotion_faces:
             for label, payload in emotion_faces.items():
                 face_payload = payload.get("face") if isinstance(payload, dict) else None
                 if face_payload is not None and getattr(face_payload, "size", 0) != 0:
                     self._last_face_by_label[label] = face_payload
+                    candidates[label] = (face_payload, float(payload.get("confidence") or 0.0))
+        elif latest_dominant and self._latest_snapshot_frame is not None:
+            candidates[latest_dominant] = (self._latest_snapshot_frame, float(summary.get("confidence") or 0.0))
 
+        last_snapshot_path = state.last_snapshot_path
         now = time.time()
-        should_capture = now - self._last_snapshot_ts >= self.snapshot_interval
-        if should_capture and emotion_faces:
-            any_saved = False
-            for label, payload in emotion_faces.items():
-                face_payload = payload.get("face") if isinstance(payload, dict) else None
-                if face_payload is None or getattr(face_payload, "size", 0) == 0:
-                    continue
-                destination = self._save_snapshot(label, face_payload, suffix=int(now))
-                self._label_snapshots[label] = destination
-                if label == self._latest_dominant:
-                    self._last_snapshot_path = destination
-                any_saved = True
-            if any_saved:
-                self._last_snapshot_ts = now
-        elif should_capture and self._latest_dominant and self._latest_snapshot_frame is not None:
-            destination = self._save_snapshot(self._latest_dominant, self._latest_snapshot_frame, suffix=int(now))
-            self._label_snapshots[self._latest_dominant] = destination
-            self._last_snapshot_path = destination
-            self._last_snapshot_ts = now
+        if candidates and self._store.claim_snapshot(self.session_id, now, self.snapshot_interval):
+            saved = {
+                label: str(self._save_snapshot(label, face, suffix=int(now), confidence=confidence))
+                for label, (face, confidence) in candidates.items()
+            }
+            latest_path = saved.get(latest_dominant)
+            self._store.set_snapshots(self.session_id, saved, latest_path)
+            last_snapshot_path = latest_path or last_snapshot_path
 
         return {
             "session_id": self.session_id,
-            "counts": dict(self._counts),
-            "frames": self._frames,
-            "dominant_emotion": self._latest_dominant,
-            "confidence": self._latest_confidence,
-            "snapshot_path": self._relative_path(self._last_snapshot_path),
+            "counts": state.counts,
+            "frames": state.frames,
+            "dominant_emotion": latest_dominant,
+            "confidence": state.confidence,
+            "snapshot_path": self._relative_path(Path(last_snapshot_path) if last_snapshot_path else None),
+            "encoder": self._encoder.stats(),
+            "memory": self.memory_usage(),
+            "dropped_frames": self.frame_gate.stats()["dropped"],
+            "rolling": self.rolling_stats.snapshot(),
+            "snapshots": self.snapshot_index.stats(),
+            "viewers": self.broadcaster.viewers,
+            "inference": self.temporal_cache.stats(),
+            "detection": self.face_tracker.stats(),
+            "pacing": self.pacer.observe(time.monotonic() - started_at) if started_at else self.pacer.hints(),
+        }
+
+    def memory_usage(self) -> Dict[str, int]:
+        faces = list(self._last_face_by_label.values())
+        snapshot_frame = self._latest_snapshot_frame
+        usage = {
+            "face_cache_bytes": sum(face.nbytes for face in faces if face is not None),
+            # The snapshot frame is usually one of the cached faces; count it once.
+            "snapshot_frame_bytes": (
+                snapshot_frame.nbytes
+                if snapshot_frame is not None and all(face is not snapshot_frame for face in faces)
+                else 0
+            ),
+            "encoder_queue_bytes": self._encoder.pending_bytes(),
         }
+        usage["total_bytes"] = sum(usage.values())
+        return usage
+
+    def evict_cached_frames(self) -> int:
+        """Drop the cached face crops; ``stop()`` then relies on the interval snapshots."""
+        usage = self.memory_usage()
+        self._last_face_by_label = {}
+        self._latest_snapshot_frame = None
+        return usage["face_cache_bytes"] + usage["snapshot_frame_bytes"]
 
-    def _save_snapshot(self, label: str, frame: np.ndarray, suffix: Optional[object] = None) -> Path:
+    def _save_snapshot(
+        self,
+        label: str,
+        frame: np.ndarray,
+        suffix: Optional[object] = None,
+        confidence: float = 0.0,
+    ) -> Path:
         label_slug = (label or "otros").strip().lower().replace(" ", "-") or "otros"
         label_dir = self.emotion_root / label_slug
         label_dir.mkdir(parents=True, exist_ok=True)
         timestamp = suffix if suffix is not None else int(time.time())
         filename = f"{label_slug}_{self.session_id}_{timestamp}.jpg"
-        destination = label_dir / filename
-        cv2.imwrite(str(destination), frame)
+        # Near-identical faces reuse the file already written for this label.
+        destination, write = self.snapshot_index.place(label, frame, confidence, label_dir / filename)
+        if write:
+            self._encoder.submit_snapshot(destination, frame)
         return destination
 
+    def detach(self) -> None:
+        """Close this worker's recording of a session finalized elsewhere."""
+        self.broadcaster.close()
+        # The timeline first: a complete manifest tells the compactor it may merge it.
+        self._timeline.close()
+        self._encoder.close()
+
     def stop(self) -> LiveSessionSummary:
-        if self._video_writer is not None:
-            self._video_writer.release()
-            self._video_writer = None
-        if self._latest_snapshot_frame is not None and self._latest_dominant:
-            if self._latest_dominant not in self._label_snapshots:
-                destination = self._save_snapshot(self._latest_dominant, self._latest_snapshot_frame, suffix="final")
-                self._label_snapshots[self._latest_dominant] = destination
-            if self._last_snapshot_path is None:
-                self._last_snapshot_path = self._label_snapshots[self._latest_dominant]
+        state = self._store.state(self.session_id) or SessionState()
+        label_snapshots = {label: Path(path) for label, path in state.label_snapshots.items()}
+        last_snapshot_path = Path(state.last_snapshot_path) if state.last_snapshot_path else None
+        latest_dominant = state.dominant_emotion
+        if self._latest_snapshot_frame is not None and latest_dominant:
+            if latest_dominant not in label_snapshots:
+                destination = self._save_snapshot(
+                    latest_dominant,
+                    self._latest_snapshot_frame,
+                    suffix="final",
+                    confidence=state.best_confidences.get(latest_dominant, 0.0),
+                )
+                label_snapshots[latest_dominant] = destination
+            if last_snapshot_path is None:
+                last_snapshot_path = label_snapshots[latest_dominant]
         for label, face in list(self._last_face_by_label.items()):
-            if label in self._label_snapshots:
+            if label in label_snapshots:
                 continue
             if face is None or getattr(face, "size", 0) == 0:
                 continue
-            self._label_snapshots[label] = self._save_snapshot(label, face, suffix="final")
-        self.finished_at = datetime.utcnow()
-        duration = (self.finished_at - self.started_at).total_seconds()
-        dominant, dominant_count = (None, 0)
-        if self._counts:
-            dominant, dominant_count = self._counts.most_common(1)[0]
-        emotion_snapshot_map = {
-            label: self._relative_path(path)
-            for label, path in self._label_snapshots.items()
-            if path is not None
-        }
-        return LiveSessionSummary(
-            session_id=self.session_id,
-            user_id=self.user_id,
-            channel=self.channel,
-            counts=dict(self._counts),
-            dominant_emotion=dominant,
-            confidence=self._latest_confidence,
-            snapshot_relative=self._relative_path(self._last_snapshot_path),
-            stream_relative=self._relative_path(self.stream_path if self._frames else None),
-            duration_seconds=duration,
-            frames=self._frames,
-            started_at=self.started_at,
-            finished_at=self.finished_at,
-            emotion_snapshots={k: v for k, v in emotion_snapshot_map.items() if v},
-            emotion_confidences=dict(self._emotion_best_confidences),
+            label_snapshots[label] = self._save_snapshot(
+                label, face, suffix="final", confidence=state.best_confidences.get(label, 0.0)
+            )
+        self.broadcaster.close()
+        self._timeline.close()
+        encoder_stats = self._encoder.close()
+        summary = _summarize(
+            self._record,
+            state,
+            tracked_root=self.tracked_root,
+            stream_path=self.stream_path,
+            labels=self.labels,
+            label_snapshots=label_snapshots,
+            last_snapshot_path=last_snapshot_path,
+            encoder_stats=encoder_stats,
         )
+        self.finished_at = summary.finished_at
+        return summary
 
 
 class LiveSessionManager:
@@ -225,6 +820,21 @@ class LiveSessionManager:
         labels: list[str],
         snapshot_interval: int,
         video_fps: int,
+        segment_seconds: int = 10,
+        encoder_queue_size: int = 24,
+        encoder_drop_policy: str = "oldest",
+        pacing: Optional[Dict] = None,
+        temporal_cache: Optional[Dict] = None,
+        face_tracking: Optional[Dict] = None,
+        stat_windows: tuple[float, ...] = (10.0, 60.0),
+        snapshot_hash_distance: int = 6,
+        store=None,
+        poll_interval: float = 1.0,
+        compaction_wait: float = 30.0,
+        idle_timeout: float = 120.0,
+        memory_budget_bytes: int = 256 * 1024 * 1024,
+        on_session_finalized: Optional[Callable[[LiveSessionSummary], Optional[Dict]]] = None,
+        finalizer_workers: int = 2,
     ) -> None:
         self._tracked_root = tracked_root
         self._emotion_subdir = emotion_subdir
@@ -232,31 +842,123 @@ class LiveSessionManager:
         self._labels = labels
         self._snapshot_interval = snapshot_interval
         self._video_fps = video_fps
+        self._segment_seconds = segment_seconds
+        self._encoder_queue_size = encoder_queue_size
+        self._encoder_drop_policy = encoder_drop_policy
+        self._pacing = dict(pacing or {})
+        self._temporal_cache = dict(temporal_cache or {})
+        self._face_tracking = dict(face_tracking or {})
+        self._stat_windows = tuple(stat_windows)
+        self._snapshot_hash_distance = snapshot_hash_distance
+        self._store = store if store is not None else MemorySessionStore()
+        self._poll_interval = max(0.1, poll_interval)
+        self._compaction_wait = compaction_wait if self._store.shared else 0.0
+        self._idle_timeout = idle_timeout
+        self._memory_budget_bytes = memory_budget_bytes
+        self._on_session_finalized = on_session_finalized
+        self._evictions = 0
+        self._closed = False
         self._sessions: Dict[str, LiveSession] = {}
+        # Kept apart from the sessions so a worker can serve viewers without recording.
+        self._broadcasters: Dict[str, FrameBroadcaster] = {}
         self._lock = Lock()
+        self._broadcast_lock = Lock()
+        self._compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="segment-compactor")
+        self._finalizer = ThreadPoolExecutor(
+            max_workers=max(1, finalizer_workers), thread_name_prefix="session-finalizer"
+        )
+        self._recover_orphaned_segments()
+        Thread(target=self._housekeeping_loop, name="live-session-housekeeping", daemon=True).start()
 
     def start_session(self, user_id: int, channel: str) -> LiveSession:
-        session = LiveSession(
+        session_id = uuid4().hex
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        record = SessionRecord(
+            session_id=session_id,
             user_id=user_id,
             channel=channel,
+            started_at=time.time(),
+            stream_name=f"session_{timestamp}_{session_id}.mp4",
+        )
+        self._store.create(record)
+        session = self._build_session(record)
+        with self._lock:
+            self._sessions[session.session_id] = session
+        return session
+
+    def _build_session(self, record: SessionRecord) -> LiveSession:
+        return LiveSession(
+            record,
+            self._store,
             tracked_root=self._tracked_root,
             emotion_subdir=self._emotion_subdir,
             stream_subdir=self._stream_subdir,
             labels=self._labels,
             snapshot_interval=self._snapshot_interval,
             video_fps=self._video_fps,
+            segment_seconds=self._segment_seconds,
+            encoder_queue_size=self._encoder_queue_size,
+            encoder_drop_policy=self._encoder_drop_policy,
+            pacing=self._pacing,
+            temporal_cache=self._temporal_cache,
+            face_tracking=self._face_tracking,
+            stat_windows=self._stat_windows,
+            snapshot_hash_distance=self._snapshot_hash_distance,
+            broadcaster=self._broadcaster_for(record),
         )
-        with self._lock:
-            self._sessions[session.session_id] = session
-        return session
+
+    def _broadcaster_for(self, record: SessionRecord) -> FrameBroadcaster:
+        with self._broadcast_lock:
+            broadcaster = self._broadcasters.get(record.session_id)
+            if broadcaster is None:
+                feed = None
+                if self._store.shared:
+                    stream_root = self._tracked_root / self._stream_subdir
+                    stream_root.mkdir(parents=True, exist_ok=True)
+                    feed = SharedFrameFeed(stream_root / (Path(record.stream_name).stem + LIVE_FRAME_SUFFIX))
+                broadcaster = FrameBroadcaster(feed=feed)
+                self._broadcasters[record.session_id] = broadcaster
+            return broadcaster
+
+    def _release_broadcaster(self, session_id: str) -> None:
+        with self._broadcast_lock:
+            broadcaster = self._broadcasters.pop(session_id, None)
+        if broadcaster is not None:
+            broadcaster.close()
 
     def _get_session(self, session_id: str) -> LiveSession:
         with self._lock:
             session = self._sessions.get(session_id)
-        if not session:
+        if session:
+            return session
+        # The session may have been started by another worker process.
+        record = self._store.get(session_id)
+        if record is None or record.status != STATUS_ACTIVE:
             raise LiveSessionError("Sesión en vivo no encontrada o finalizada.")
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._build_session(record)
+                self._sessions[session_id] = session
         return session
 
+    def admit_frame(self, session_id: str) -> FrameSlot:
+        """Wait for the session's inference slot; stale frames come back not admitted."""
+        return self._get_session(session_id).frame_gate.admit()
+
+    def discard_frame(self, session_id: str) -> FrameSlot:
+        return self._get_session(session_id).frame_gate.discard()
+
+    def clamp_frame(self, session_id: str, frame: np.ndarray) -> tuple[np.ndarray, float]:
+        """Downscale an oversized frame to the session's current resolution before detection."""
+        return self._get_session(session_id).pacer.clamp(frame)
+
+    def analysis_cache(self, session_id: str) -> TemporalCache:
+        return self._get_session(session_id).temporal_cache
+
+    def face_tracker(self, session_id: str) -> FaceRegionTracker:
+        return self._get_session(session_id).face_tracker
+
     def process_frame(
         self,
         session_id: str,
@@ -265,18 +967,232 @@ class LiveSessionManager:
         annotated_frame: Optional[np.ndarray],
         face_frame: Optional[np.ndarray] = None,
         emotion_faces: Optional[Dict[str, Dict[str, object]]] = None,
+        started_at: Optional[float] = None,
     ) -> Dict:
         session = self._get_session(session_id)
         payload_faces = emotion_faces if emotion_faces is not None else summary.get("emotion_faces")
-        return session.ingest(frame, summary, annotated_frame, face_frame, payload_faces)
+        return session.ingest(frame, summary, annotated_frame, face_frame, payload_faces, started_at)
+
+    def stop_session(self, session_id: str) -> Dict:
+        """Stop accepting frames and finalize the session in the background.
 
-    def stop_session(self, session_id: str) -> LiveSessionSummary:
+        Returns provisional totals plus the ``finalization_id`` to poll with
+        ``get_finalization``; releasing the writer, flushing snapshots and
+        ``on_session_finalized`` run on the finalizer executor.
+        """
+        if self._closed:
+            raise LiveSessionError("El servidor se está deteniendo; intenta de nuevo.")
         with self._lock:
             session = self._sessions.pop(session_id, None)
-        if session is None:
+        if not self._store.mark_stopping(session_id):
+            if session is not None:
+                session.detach()
+            self._release_broadcaster(session_id)
             raise LiveSessionError("Sesión en vivo no encontrada o ya cerrada.")
-        return session.stop()
+        record = self._store.get(session_id)
+        state = self._store.state(session_id) or SessionState()
+        finalization_id = uuid4().hex
+        self._store.create_finalization(finalization_id, session_id, record.user_id)
+        self._finalizer.submit(self._finalize_session, finalization_id, record, session)
+
+        counts = Counter(state.counts)
+        return {
+            "session_id": session_id,
+            "finalization_id": finalization_id,
+            "status": FINALIZATION_PENDING,
+            "counts": dict(counts),
+            "dominant_emotion": counts.most_common(1)[0][0] if counts else None,
+            "confidence": state.confidence,
+            "frames": state.frames,
+            "duration_seconds": time.time() - record.started_at,
+        }
+
+    def get_finalization(self, finalization_id: str) -> Optional[Dict]:
+        return self._store.get_finalization(finalization_id)
+
+    def shutdown(self) -> None:
+        """Wait for pending finalizations and compactions; used on graceful shutdown."""
+        self._closed = True
+        self._finalizer.shutdown(wait=True)
+        self._compactor.shutdown(wait=True)
+
+    def _finalize_session(self, finalization_id: str, record: SessionRecord, session: Optional[LiveSession]) -> None:
+        self._store.update_finalization(finalization_id, FINALIZATION_RUNNING)
+        stream_path = self._tracked_root / self._stream_subdir / record.stream_name
+        try:
+            try:
+                summary = session.stop() if session is not None else self._summarize_detached(record, stream_path)
+            finally:
+                self._store.remove(record.session_id)
+                self._release_broadcaster(record.session_id)
+            if summary.stream_relative:
+                self._compactor.submit(
+                    compact_segments, segment_dir_for(stream_path), stream_path, self._compaction_wait
+                )
+            else:
+                shutil.rmtree(segment_dir_for(stream_path), ignore_errors=True)
+            result = self._on_session_finalized(summary) if self._on_session_finalized is not None else None
+        except Exception as exc:
+            logger.exception("No se pudo finalizar la sesión en vivo %s", record.session_id)
+            self._store.update_finalization(finalization_id, FINALIZATION_FAILED, error=str(exc))
+            return
+        self._store.update_finalization(finalization_id, FINALIZATION_DONE, result=result or {})
+
+    def _summarize_detached(self, record: SessionRecord, stream_path: Path) -> LiveSessionSummary:
+        # Stopped from a worker that never ingested the session: the store holds
+        # everything the summary needs, so no encoder or segment directory is
+        # created here. The workers that recorded it detach on their next poll.
+        state = self._store.state(record.session_id) or SessionState()
+        return _summarize(
+            record,
+            state,
+            tracked_root=self._tracked_root,
+            stream_path=stream_path,
+            labels=self._labels,
+            label_snapshots={label: Path(path) for label, path in state.label_snapshots.items()},
+            last_snapshot_path=Path(state.last_snapshot_path) if state.last_snapshot_path else None,
+            encoder_stats={},
+        )
+
+    def watch_session(self, session_id: str) -> Iterator[bytes]:
+        """MJPEG parts of the frames ingested for ``session_id``, by any worker with a shared store."""
+        return self._watched_broadcaster(session_id).stream()
+
+    def watch_session_async(self, session_id: str) -> AsyncIterator[bytes]:
+        """Same parts as ``watch_session`` for viewers served from an event loop."""
+        return self._watched_broadcaster(session_id).astream()
+
+    def _watched_broadcaster(self, session_id: str) -> FrameBroadcaster:
+        # Watching does not open a recording in this worker.
+        record = self._store.get(session_id)
+        if record is None or record.status != STATUS_ACTIVE:
+            raise LiveSessionError("Sesión en vivo no encontrada o finalizada.")
+        return self._broadcaster_for(record)
+
+    def session_owner(self, session_id: str) -> Optional[int]:
+        record = self._store.get(session_id)
+        if record is None or record.status != STATUS_ACTIVE:
+            return None
+        return record.user_id
 
     def has_session(self, session_id: str) -> bool:
+        record = self._store.get(session_id)
+        return record is not None and record.status == STATUS_ACTIVE
+
+    def memory_report(self, user_id: Optional[int] = None) -> Dict:
         with self._lock:
-            return session_id in self._sessions
+            sessions = list(self._sessions.values())
+        now = time.monotonic()
+        entries = [
+            {
+                "session_id": session.session_id,
+                "channel": session.channel,
+                "idle_seconds": round(now - session.last_activity, 1),
+                "memory": session.memory_usage(),
+                "frames": session.frame_gate.stats(),
+                "pacing": session.pacer.hints(),
+                "inference": session.temporal_cache.stats(),
+                "detection": session.face_tracker.stats(),
+                "rolling": session.rolling_stats.snapshot(),
+                "broadcast": session.broadcaster.stats(),
+            }
+            for session in sessions
+            if user_id is None or session.user_id == user_id
+        ]
+        return {
+            "budget_bytes": self._memory_budget_bytes,
+            "total_bytes": sum(session.memory_usage()["total_bytes"] for session in sessions),
+            "evictions": self._evictions,
+            "sessions": entries,
+        }
+
+    def _housekeeping_loop(self) -> None:
+        while not self._closed:
+            time.sleep(self._poll_interval)
+            for task in (self._detach_finished_sessions, self._reap_idle_sessions, self._enforce_memory_budget):
+                try:
+                    task()
+                except Exception:  # pragma: no cover - keep the loop alive
+                    logger.exception("Live session housekeeping failed")
+
+    def _reap_idle_sessions(self) -> None:
+        # Clients that close the tab never call stop; finalize them here so
+        # writers and cached frames are released and the summary persisted.
+        if self._idle_timeout <= 0:
+            return
+        cutoff = time.time() - self._idle_timeout
+        for record in self._store.active_sessions():
+            if record.last_seen >= cutoff:
+                continue
+            try:
+                self.stop_session(record.session_id)
+            except LiveSessionError:
+                continue
+            logger.info("Sesión en vivo %s finalizada por inactividad", record.session_id)
+
+    def _enforce_memory_budget(self) -> None:
+        if self._memory_budget_bytes <= 0:
+            return
+        with self._lock:
+            sessions = list(self._sessions.values())
+        total = sum(session.memory_usage()["total_bytes"] for session in sessions)
+        if total <= self._memory_budget_bytes:
+            return
+        for session in sorted(sessions, key=lambda item: item.last_activity):
+            freed = session.evict_cached_frames()
+            if freed:
+                self._evictions += 1
+                total -= freed
+            if total <= self._memory_budget_bytes:
+                break
+
+    def _detach_finished_sessions(self) -> None:
+        # Sessions stopped by another worker: close this worker's segment so
+        # the compaction job can include it.
+        with self._lock:
+            local_sessions = list(self._sessions.items())
+        local_ids = {session_id for session_id, _ in local_sessions}
+        with self._broadcast_lock:
+            watched = [session_id for session_id in self._broadcasters if session_id not in local_ids]
+        for session_id, session in local_sessions:
+            record = self._store.get(session_id)
+            if record is not None and record.status == STATUS_ACTIVE:
+                continue
+            with self._lock:
+                if self._sessions.get(session_id) is not session:
+                    continue
+                self._sessions.pop(session_id)
+            session.detach()
+            self._release_broadcaster(session_id)
+        # Viewers served by this worker of sessions it never recorded.
+        for session_id in watched:
+            record = self._store.get(session_id)
+            if record is None or record.status != STATUS_ACTIVE:
+                self._release_broadcaster(session_id)
+
+    def _recover_orphaned_segments(self) -> None:
+        # Segments left behind by a previous process (crash or restart) are
+        # compacted with whatever was closed before it died. Sessions still
+        # known to the store belong to a live worker and are left alone. Raw
+        # timelines are merged by that compaction, or on their own when the
+        # session left no segments. Shared viewer frames are just removed.
+        stream_root = self._tracked_root / self._stream_subdir
+        if not stream_root.is_dir():
+            return
+        for segment_dir in stream_root.glob(f"*{SEGMENTS_SUFFIX}"):
+            session_id = segment_dir.name[: -len(SEGMENTS_SUFFIX)].rsplit("_", 1)[-1]
+            if self._store.get(session_id) is not None:
+                continue
+            if _worker_segment_dirs(segment_dir):
+                self._compactor.submit(compact_segments, segment_dir)
+        for raw_dir in stream_root.glob(f"*{RAW_SUFFIX}"):
+            session_id = raw_dir.name[: -len(RAW_SUFFIX)].rsplit("_", 1)[-1]
+            stream_path = raw_dir.with_name(raw_dir.name[: -len(RAW_SUFFIX)] + ".mp4")
+            if not raw_dir.is_dir() or self._store.get(session_id) is not None:
+                continue
+            if not _worker_segment_dirs(segment_dir_for(stream_path)):
+                self._compactor.submit(merge_timeline, raw_dir, timeline_path_for(stream_path))
+        for live_frame in stream_root.glob(f"*{LIVE_FRAME_SUFFIX}*"):
+            session_id = live_frame.name.split(LIVE_FRAME_SUFFIX, 1)[0].rsplit("_", 1)[-1]
+            if self._store.get(session_id) is None:
+                live_frame.unlink(missing_ok=True)
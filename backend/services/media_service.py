@@ -4,7 +4,7 @@ import time
 from collections import Counter
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from uuid import uuid4
 
 import cv2
@@ -13,6 +13,9 @@ from tensorflow.keras.models import load_model
 from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
+from .face_tracking import FaceRegionTracker
+from .temporal_cache import TemporalCache
+
 
 class MediaEmotionAnalyzer:
     """Loads the CNN model and performs emotion detection on images or videos."""
@@ -42,10 +45,16 @@ class MediaEmotionAnalyzer:
         summary["annotated_frame"] = annotated
         return summary
 
-    def analyze_array(self, frame) -> Dict:
+    def analyze_array(
+        self,
+        frame,
+        cache: Optional[TemporalCache] = None,
+        tracker: Optional[FaceRegionTracker] = None,
+    ) -> Dict:
+        """Analyze a decoded frame; live sessions pass their cache and tracker to skip repeated work."""
         if frame is None or getattr(frame, "size", 0) == 0:
             raise ValueError("El fotograma recibido está vacío o es inválido.")
-        summary, annotated = self._analyze_frame(frame)
+        summary, annotated = self._analyze_frame(frame, cache, tracker)
         summary["annotated_frame"] = annotated
         return summary
 
@@ -55,11 +64,41 @@ class MediaEmotionAnalyzer:
             raise ValueError("No se pudo procesar el video proporcionado.")
 
         summaries: List[Dict] = []
-        frame_index = 0
+        try:
+            self.sample_capture(capture, summaries, 0, max_frames, sample_rate)
+        finally:
+            capture.release()
+
+        if not summaries:
+            raise ValueError("No se detectaron rostros en el video.")
+
+        return self._combine_summaries(summaries)
+
+    def sample_capture(
+        self,
+        capture,
+        summaries: List[Dict],
+        frame_index: int,
+        max_frames: int,
+        sample_rate: int,
+        hold_last: bool = False,
+    ) -> int:
+        """Analyze every ``sample_rate``-th frame read from ``capture``.
+
+        ``frame_index`` is the index of the next frame the capture will return;
+        the index after the last consumed frame is returned so callers can
+        resume later. With ``hold_last`` the most recently decoded frame is not
+        consumed, because on a file that is still growing it may be truncated.
+        """
+        pending = None
         while frame_index < max_frames:
             grabbed, frame = capture.read()
             if not grabbed:
                 break
+            if hold_last:
+                pending, frame = frame, pending
+                if frame is None:
+                    continue
             if frame_index % sample_rate == 0:
                 try:
                     summary, annotated = self._analyze_frame(frame)
@@ -69,12 +108,11 @@ class MediaEmotionAnalyzer:
                 summary["annotated_frame"] = annotated
                 summaries.append(summary)
             frame_index += 1
+        return frame_index
 
-        capture.release()
-
+    def combine_summaries(self, summaries: List[Dict]) -> Dict:
         if not summaries:
             raise ValueError("No se detectaron rostros en el video.")
-
         return self._combine_summaries(summaries)
 
     def model_metadata(self) -> Dict:
@@ -98,23 +136,26 @@ class MediaEmotionAnalyzer:
             self._model = load_model(self._weights_path)
         return self._model
 
-    def _analyze_frame(self, frame) -> Tuple[Dict, np.ndarray]:
+    def _analyze_frame(
+        self,
+        frame,
+        cache: Optional[TemporalCache] = None,
+        tracker: Optional[FaceRegionTracker] = None,
+    ) -> Tuple[Dict, np.ndarray]:
         grayscale = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self._face_detector.detectMultiScale(grayscale, 1.3, 5)
-        if len(faces) == 0:
+        predicted = cache.lookup_frame(grayscale) if cache is not None else None
+        if predicted is None:
+            faces = self._detect_faces(grayscale, tracker)
+            predicted = self._predict_faces(grayscale, faces, cache)
+        if len(predicted) == 0:
             raise ValueError("No se detectaron rostros en la imagen proporcionada.")
 
         annotated = frame.copy()
         detections = []
         emotion_faces: Dict[str, Dict[str, object]] = {}
         height, width = frame.shape[:2]
-        model = self._load_model()
 
-        for (x, y, w, h) in faces:
-            roi_gray = grayscale[y : y + h, x : x + w]
-            roi_gray = cv2.resize(roi_gray, (48, 48))
-            roi = roi_gray.reshape(1, 48, 48, 1) / 255.0
-            prediction = model.predict(roi, verbose=0)[0]
+        for (x, y, w, h), prediction in predicted:
             index = int(np.argmax(prediction))
             label = self._emotion_labels[index]
             confidence = float(prediction[index])
@@ -175,6 +216,55 @@ class MediaEmotionAnalyzer:
             summary["dominant_face"] = dominant_face
         return summary, annotated
 
+    def _detect_faces(self, grayscale, tracker: Optional[FaceRegionTracker] = None):
+        windows = tracker.windows(grayscale.shape) if tracker is not None else None
+        if windows:
+            faces = []
+            for x0, y0, x1, y1, min_size, max_size in windows:
+                found = self._face_detector.detectMultiScale(
+                    grayscale[y0:y1, x0:x1],
+                    1.1,
+                    5,
+                    minSize=(min_size, min_size),
+                    maxSize=(max_size, max_size),
+                )
+                if len(found) == 0:
+                    # A face left its window; look at the whole frame instead.
+                    tracker.record_fallback()
+                    break
+                faces.extend((int(x) + x0, int(y) + y0, int(w), int(h)) for x, y, w, h in found)
+            else:
+                faces = _dedupe_boxes(faces)
+                tracker.update(faces, full_scan=False)
+                return faces
+
+        faces = self._face_detector.detectMultiScale(grayscale, 1.3, 5)
+        if tracker is not None:
+            tracker.update([tuple(face) for face in faces], full_scan=True)
+        return faces
+
+    def _predict_faces(
+        self,
+        grayscale,
+        faces,
+        cache: Optional[TemporalCache],
+    ) -> List[Tuple[Tuple[int, int, int, int], np.ndarray]]:
+        predicted = []
+        cached_faces = []
+        model = self._load_model() if len(faces) else None
+        for (x, y, w, h) in faces:
+            box = (int(x), int(y), int(w), int(h))
+            roi_gray = grayscale[y : y + h, x : x + w]
+            prediction = cache.lookup_roi(box, roi_gray) if cache is not None else None
+            if prediction is None:
+                roi = cv2.resize(roi_gray, (48, 48)).reshape(1, 48, 48, 1) / 255.0
+                prediction = model.predict(roi, verbose=0)[0]
+            predicted.append((box, prediction))
+            cached_faces.append((box, roi_gray, prediction))
+        if cache is not None:
+            cache.store(cached_faces)
+        return predicted
+
     def _build_summary(self, detections: List[Dict]) -> Dict:
         counts = Counter(det["label"] for det in detections)
         dominant = counts.most_common(1)[0]
@@ -225,6 +315,17 @@ class MediaEmotionAnalyzer:
         }
 
 
+def _dedupe_boxes(boxes: List[Tuple[int, int, int, int]]) -> List[Tuple[int, int, int, int]]:
+    """Drop boxes found twice by overlapping search windows."""
+    kept: List[Tuple[int, int, int, int]] = []
+    for box in boxes:
+        x, y, w, h = box
+        cx, cy = x + w / 2, y + h / 2
+        if not any(kx <= cx <= kx + kw and ky <= cy <= ky + kh for kx, ky, kw, kh in kept):
+            kept.append(box)
+    return kept
+
+
 @dataclass
 class MediaStorage:
     root_dir: Path
@@ -268,12 +369,16 @@ class MediaStorage:
         return resized
 
     def save_raw(self, file_storage: FileStorage, source_bucket: str | None) -> Tuple[Path, str]:
-        filename = secure_filename(file_storage.filename or f"media_{uuid4().hex}")
+        destination, relative = self.reserve_raw(file_storage.filename, source_bucket)
+        file_storage.save(destination)
+        return destination, relative
+
+    def reserve_raw(self, original_filename: str | None, source_bucket: str | None) -> Tuple[Path, str]:
+        filename = secure_filename(original_filename or "") or f"media_{uuid4().hex}"
         final_name = f"{int(time.time())}_{filename}"
         destination_dir = self._category_dir(self.raw_dir, source_bucket)
         destination = destination_dir / final_name
         destination.parent.mkdir(parents=True, exist_ok=True)
-        file_storage.save(destination)
         relative = destination.relative_to(self.root_dir).as_posix()
         return destination, relative
 
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import BinaryIO, Dict, Iterator, Optional
+import logging
+import os
+import tempfile
+
+COPY_BUFFER_SIZE = 64 * 1024
+MEMORY_FILESYSTEMS = {"tmpfs", "ramfs"}
+
+logger = logging.getLogger(__name__)
+
+
+class StagingLimitError(ValueError):
+    """Raised when a staged file exceeds the per-item or global memory budget."""
+
+
+class StagingUnavailableError(RuntimeError):
+    """Raised when there is no memory-backed place to stage into and disk staging is not allowed."""
+
+
+class MemoryStagingArea:
+    """Stages short-lived media in anonymous memory so decoders can open it by path.
+
+    ``memfd_create`` is used when the platform offers it; otherwise files are
+    created inside ``tmpfs_dir``, which must be a memory filesystem such as
+    ``/dev/shm``. Persistent storage is only used when ``allow_disk`` is set,
+    with a warning per file, and is reported through ``stats()``.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_item_bytes: int,
+        max_total_bytes: int,
+        tmpfs_dir: Optional[str] = "/dev/shm",
+        allow_disk: bool = False,
+    ) -> None:
+        self._max_item_bytes = max(1, max_item_bytes)
+        self._max_total_bytes = max(self._max_item_bytes, max_total_bytes)
+        self._tmpfs_dir = tmpfs_dir if tmpfs_dir and _is_memory_filesystem(tmpfs_dir) else None
+        self._allow_disk = allow_disk
+        self._lock = Lock()
+        self._active_items = 0
+        self._active_bytes = 0
+        self._peak_bytes = 0
+        self._staged_total = 0
+        self._rejected_total = 0
+
+    @property
+    def backend(self) -> Optional[str]:
+        if hasattr(os, "memfd_create") and Path("/proc/self/fd").is_dir():
+            return "memfd"
+        if self._tmpfs_dir:
+            return "tmpfs"
+        return "disk" if self._allow_disk else None
+
+    @contextmanager
+    def stage(self, stream: BinaryIO, suffix: str = "", size_hint: Optional[int] = None) -> Iterator[Path]:
+        """Copy ``stream`` into memory and yield a path that stays valid inside the block."""
+        if size_hint is not None and size_hint > self._max_item_bytes:
+            self._reject()
+            raise StagingLimitError("El archivo excede el tamaño máximo permitido para la vista previa.")
+
+        fd, path, cleanup = self._open(suffix)
+        reserved = 0
+        with self._lock:
+            self._active_items += 1
+        try:
+            while True:
+                block = stream.read(COPY_BUFFER_SIZE)
+                if not block:
+                    break
+                self._reserve(reserved, len(block))
+                reserved += len(block)
+                view = memoryview(block)
+                while view:
+                    written = os.write(fd, view)
+                    view = view[written:]
+            with self._lock:
+                self._staged_total += 1
+            yield path
+        finally:
+            os.close(fd)
+            if cleanup is not None:
+                cleanup.unlink(missing_ok=True)
+            with self._lock:
+                self._active_items -= 1
+                self._active_bytes -= reserved
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "active_items": self._active_items,
+                "active_bytes": self._active_bytes,
+                "peak_bytes": self._peak_bytes,
+                "staged_total": self._staged_total,
+                "rejected_total": self._rejected_total,
+                "max_item_bytes": self._max_item_bytes,
+                "max_total_bytes": self._max_total_bytes,
+            }
+
+    # ------------------------------------------------------------------
+    def _open(self, suffix: str) -> tuple[int, Path, Optional[Path]]:
+        backend = self.backend
+        if backend == "memfd":
+            fd = os.memfd_create("preview-media", os.MFD_CLOEXEC)
+            # The descriptor path keeps the anonymous file reachable for decoders
+            # that only accept filenames; it disappears once ``fd`` is closed.
+            return fd, Path(f"/proc/self/fd/{fd}"), None
+        if backend is None:
+            self._reject()
+            raise StagingUnavailableError("No hay memoria disponible para la vista previa en este servidor.")
+        if backend == "disk":
+            logger.warning("Vista previa en disco: no hay memfd ni tmpfs disponible")
+        fd, name = tempfile.mkstemp(suffix=suffix, dir=self._tmpfs_dir)
+        return fd, Path(name), Path(name)
+
+    def _reserve(self, current: int, extra: int) -> None:
+        with self._lock:
+            if current + extra > self._max_item_bytes:
+                self._rejected_total += 1
+                raise StagingLimitError("El archivo excede el tamaño máximo permitido para la vista previa.")
+            if self._active_bytes + extra > self._max_total_bytes:
+                self._rejected_total += 1
+                raise StagingLimitError("El servidor está procesando demasiadas vistas previas; intenta de nuevo.")
+            self._active_bytes += extra
+            self._peak_bytes = max(self._peak_bytes, self._active_bytes)
+
+    def _reject(self) -> None:
+        with self._lock:
+            self._rejected_total += 1
+
+
+def _is_memory_filesystem(path: str) -> bool:
+    """Whether ``path`` lives on tmpfs/ramfs, according to the longest matching entry of ``/proc/self/mounts``."""
+    try:
+        real = os.path.realpath(path)
+        with open("/proc/self/mounts", encoding="utf-8") as mounts:
+            entries = [line.split()[1:3] for line in mounts if len(line.split()) >= 3]
+    except OSError:
+        return False
+    best, fs_type = "", None
+    for mount_point, kind in entries:
+        mount_point = mount_point.replace("\\040", " ")
+        inside = real == mount_point or real.startswith(mount_point.rstrip("/") + "/")
+        if inside and len(mount_point) >= len(best):
+            best, fs_type = mount_point, kind
+    return os.path.isdir(real) and fs_type in MEMORY_FILESYSTEMS
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+from threading import Lock
+from typing import Dict, Optional, Sequence
+import time
+
+import numpy as np
+
+
+class RollingEmotionStats:
+    """Per-frame emotion vectors kept in a fixed-size ring with O(1) window sums.
+
+    Each pushed frame stores its label counts and dominant confidence. Every
+    window keeps a running sum plus the index of its oldest frame, so adding a
+    frame only subtracts the frames that just fell out of each window. An
+    exponential moving average of the per-frame label distribution is kept
+    alongside.
+    """
+
+    def __init__(
+        self,
+        labels: Sequence[str],
+        *,
+        windows: Sequence[float] = (10.0, 60.0),
+        capacity: int = 1800,
+        ema_alpha: float = 0.2,
+    ) -> None:
+        self._labels = list(labels)
+        self._index = {label: position for position, label in enumerate(self._labels)}
+        self._windows = sorted(float(window) for window in windows)
+        self._capacity = max(1, capacity)
+        self._alpha = min(1.0, max(0.0, ema_alpha))
+        self._lock = Lock()
+
+        self._vectors = np.zeros((self._capacity, len(self._labels)), dtype=np.float32)
+        self._confidences = np.zeros(self._capacity, dtype=np.float32)
+        self._timestamps = np.zeros(self._capacity, dtype=np.float64)
+        self._head = 0  # total frames pushed; slot = head % capacity
+        self._tails = [0] * len(self._windows)
+        self._sums = np.zeros((len(self._windows), len(self._labels)), dtype=np.float64)
+        self._confidence_sums = np.zeros(len(self._windows), dtype=np.float64)
+        self._ema: Optional[np.ndarray] = None
+
+    def push(self, counts: Dict[str, int], confidence: Optional[float], now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        vector = np.zeros(len(self._labels), dtype=np.float32)
+        for label, qty in counts.items():
+            position = self._index.get(label)
+            if position is not None:
+                vector[position] = qty
+        with self._lock:
+            if self._head - min(self._tails) >= self._capacity:
+                # The ring is full: the slot about to be reused leaves every window still holding it.
+                evicted = self._head - self._capacity
+                for position, tail in enumerate(self._tails):
+                    if tail == evicted:
+                        self._drop_oldest(position)
+            slot = self._head % self._capacity
+            self._vectors[slot] = vector
+            self._confidences[slot] = confidence or 0.0
+            self._timestamps[slot] = now
+            self._head += 1
+            self._sums += vector
+            self._confidence_sums += confidence or 0.0
+            self._expire(now)
+
+            total = float(vector.sum())
+            if total > 0:
+                distribution = vector / total
+                if self._ema is None:
+                    self._ema = distribution.astype(np.float64)
+                else:
+                    self._ema += self._alpha * (distribution - self._ema)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._expire(now)
+            windows = {}
+            for position, window in enumerate(self._windows):
+                frames = self._head - self._tails[position]
+                sums = self._sums[position]
+                counts = {
+                    label: int(round(sums[index])) for index, label in enumerate(self._labels) if sums[index] > 0.5
+                }
+                windows[f"{int(window)}s"] = {
+                    "frames": frames,
+                    "counts": counts,
+                    "dominant_emotion": self._labels[int(np.argmax(sums))] if counts else None,
+                    "mean_confidence": round(float(self._confidence_sums[position]) / frames, 4) if frames else None,
+                }
+            ema = None
+            if self._ema is not None:
+                ema = {label: round(float(self._ema[index]), 4) for index, label in enumerate(self._labels)}
+            return {"windows": windows, "ema": ema}
+
+    def _expire(self, now: float) -> None:
+        for position, window in enumerate(self._windows):
+            while self._tails[position] < self._head:
+                if now - self._timestamps[self._tails[position] % self._capacity] <= window:
+                    break
+                self._drop_oldest(position)
+            if self._tails[position] == self._head:
+                # Reset instead of carrying float residue from the subtractions.
+                self._sums[position] = 0.0
+                self._confidence_sums[position] = 0.0
+
+    def _drop_oldest(self, position: int) -> None:
+        slot = self._tails[position] % self._capacity
+        self._sums[position] -= self._vectors[slot]
+        self._confidence_sums[position] -= self._confidences[slot]
+        self._tails[position] += 1
+
+
+class SharedRollingStats:
+    """``RollingEmotionStats`` kept in a shared session store.
+
+    Used when several worker processes ingest frames of the same session, so
+    every worker reports the same windows. Frames are summed into one-second
+    buckets in the store; windows are therefore resolved to the second and
+    buckets older than the longest window are pruned on every push.
+    """
+
+    def __init__(
+        self,
+        store,
+        session_id: str,
+        labels: Sequence[str],
+        *,
+        windows: Sequence[float] = (10.0, 60.0),
+        ema_alpha: float = 0.2,
+    ) -> None:
+        self._store = store
+        self._session_id = session_id
+        self._labels = list(labels)
+        self._windows = sorted(float(window) for window in windows)
+        self._alpha = min(1.0, max(0.0, ema_alpha))
+
+    def push(self, counts: Dict[str, int], confidence: Optional[float], now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        known = {label: int(counts.get(label) or 0) for label in self._labels}
+        total = sum(known.values())
+        distribution = {label: qty / total for label, qty in known.items()} if total > 0 else None
+        self._store.record_rolling(
+            self._session_id,
+            int(now),
+            known,
+            confidence or 0.0,
+            distribution,
+            self._alpha,
+            int(now - max(self._windows, default=0.0)),
+        )
+
+    def snapshot(self, now: Optional[float] = None) -> Dict:
+        now = time.time() if now is None else now
+        windows = {}
+        for window in self._windows:
+            frames, confidence_sum, counts = self._store.rolling_window(self._session_id, int(now - window))
+            windows[f"{int(window)}s"] = {
+                "frames": frames,
+                "counts": {label: counts[label] for label in self._labels if counts.get(label)},
+                "dominant_emotion": max(self._labels, key=lambda label: counts.get(label, 0)) if counts else None,
+                "mean_confidence": round(confidence_sum / frames, 4) if frames else None,
+            }
+        ema = self._store.rolling_ema(self._session_id)
+        return {
+            "windows": windows,
+            "ema": {label: round(float(ema.get(label, 0.0)), 4) for label in self._labels} if ema else None,
+        }
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Optional
+import re
+
+import numpy as np
+
+# Longer texts are rarely repeated verbatim and would crowd out the boilerplate.
+MAX_CACHED_TEXT_LENGTH = 1024
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Cache key for ``text``: the same lowercasing as the TF-IDF tokenizer, with spacing collapsed."""
+    return _WHITESPACE.sub(" ", text.strip().lower())
+
+
+class SentimentCache:
+    """Bounded LRU of class probabilities keyed by normalized text, for one model version at a time.
+
+    Entries hold the probability row rather than the final payload because the
+    summary quotes the original text. When a lookup arrives with a new model
+    version every entry is dropped, so a retrained model never serves stale
+    scores.
+    """
+
+    def __init__(self, max_entries: int = 10000) -> None:
+        self._max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def cacheable(key: str) -> bool:
+        return len(key) <= MAX_CACHED_TEXT_LENGTH
+
+    def get(self, version: str, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            self._check_version(version)
+            row = self._entries.get(key)
+            if row is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return row
+
+    def put(self, version: str, key: str, row: np.ndarray) -> None:
+        row = np.array(row, dtype=np.float64)
+        row.setflags(write=False)
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = row
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _check_version(self, version: str) -> None:
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model_version": self._version,
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,205 @@
+"""Build, persist and hot-reload the text sentiment pipeline.
+
+``build_sentiment_model`` fits the pipeline once and writes it next to a
+``manifest.json`` holding its version and SHA-256. Workers load the file
+with ``mmap_mode="r"`` so the large NumPy arrays (IDF weights, coefficients)
+are shared page-cache mappings instead of per-process copies, and
+``SentimentModelStore`` swaps in a newer version when the manifest changes.
+
+Build a model from the backend directory with::
+
+    python -m services.sentiment_model --output ../instance/sentiment_model
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Lock
+from typing import Optional, Sequence
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+
+import joblib
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from .sentiment_scorer import CompiledSentimentScorer, compile_scorer
+
+MANIFEST_NAME = "manifest.json"
+# Older model files are kept so processes still mapping them are not surprised.
+KEEP_MODEL_FILES = 3
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LoadedSentimentModel:
+    version: str
+    sha256: str
+    pipeline: Pipeline
+    scorer: Optional[CompiledSentimentScorer] = None
+
+    @classmethod
+    def from_pipeline(cls, version: str, sha256: str, pipeline: Pipeline) -> "LoadedSentimentModel":
+        scorer = compile_scorer(pipeline)
+        if scorer is None:
+            logger.info(
+                "El modelo %s (%s) no admite el puntuador compilado; se usa el pipeline de sklearn",
+                version,
+                " + ".join(type(step).__name__ for _, step in pipeline.steps),
+            )
+        return cls(version, sha256, pipeline, scorer)
+
+
+class SentimentModelError(RuntimeError):
+    """Raised when a persisted sentiment model is missing or does not match its manifest."""
+
+
+def build_pipeline() -> Pipeline:
+    return Pipeline(
+        steps=[
+            ("tfidf", TfidfVectorizer(ngram_range=(1, 2), max_features=5000)),
+            ("clf", LogisticRegression(max_iter=400, multi_class="auto")),
+        ]
+    )
+
+
+def fit_pipeline(training_data: Sequence[tuple[str, str]]) -> Pipeline:
+    pipeline = build_pipeline()
+    pipeline.fit([sample for sample, _ in training_data], [label for _, label in training_data])
+    return pipeline
+
+
+def build_sentiment_model(output_dir: Path, training_data: Sequence[tuple[str, str]]) -> dict:
+    """Fit the pipeline, write it under ``output_dir`` and publish it in the manifest."""
+    return publish_pipeline(output_dir, fit_pipeline(training_data), samples=len(training_data))
+
+
+def publish_pipeline(output_dir: Path, pipeline: Pipeline, *, samples: int, extra: Optional[dict] = None) -> dict:
+    """Write a fitted pipeline under ``output_dir`` and point the manifest at it."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_dir / f".sentiment-{os.getpid()}.joblib.tmp"
+    # Uncompressed so the arrays can be memory-mapped on load.
+    joblib.dump(pipeline, tmp_path)
+    digest = _file_sha256(tmp_path)
+    created_at = datetime.now(timezone.utc)
+    version = f"{created_at:%Y%m%d%H%M%S}-{digest[:8]}"
+    model_path = output_dir / f"sentiment-{version}.joblib"
+    os.replace(tmp_path, model_path)
+
+    manifest = {
+        "version": version,
+        "file": model_path.name,
+        "sha256": digest,
+        "created_at": created_at.isoformat(),
+        "classes": [str(label) for label in pipeline.classes_],
+        "samples": samples,
+        **(extra or {}),
+    }
+    manifest_tmp = output_dir / f".{MANIFEST_NAME}.tmp"
+    manifest_tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(manifest_tmp, output_dir / MANIFEST_NAME)
+    _prune_model_files(output_dir, keep=model_path)
+    return manifest
+
+
+def read_published(model_dir: Path, *, mmap: bool = True) -> tuple[dict, Pipeline]:
+    """Manifest and pipeline currently published in ``model_dir``, checked against the manifest hash."""
+    model_dir = Path(model_dir)
+    manifest = json.loads((model_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    model_path = model_dir / manifest["file"]
+    if _file_sha256(model_path) != manifest["sha256"]:
+        raise SentimentModelError(f"El hash de {model_path.name} no coincide con el manifiesto.")
+    return manifest, joblib.load(model_path, mmap_mode="r" if mmap else None)
+
+
+class SentimentModelStore:
+    """Serves the model published in ``model_dir`` and reloads it when a new version appears.
+
+    The manifest is checked at most every ``reload_interval`` seconds. A new
+    version is loaded by the one caller that wins the reload lock while every
+    other request keeps using the previous model, so in-flight work is never
+    blocked by a reload.
+    """
+
+    def __init__(self, model_dir: Path, *, reload_interval: float = 30.0) -> None:
+        self._model_dir = Path(model_dir)
+        self._reload_interval = max(0.0, reload_interval)
+        self._model: Optional[LoadedSentimentModel] = None
+        self._manifest_stamp: Optional[int] = None
+        self._checked_at = 0.0
+        self._reload_lock = Lock()
+
+    @property
+    def manifest_path(self) -> Path:
+        return self._model_dir / MANIFEST_NAME
+
+    def current(self) -> Optional[LoadedSentimentModel]:
+        """The newest loaded model, or ``None`` when nothing has been built yet."""
+        now = time.monotonic()
+        if self._checked_at and now - self._checked_at < self._reload_interval:
+            return self._model
+        # Only one caller checks and reloads; the rest keep the model they have.
+        blocking = self._model is None
+        if not self._reload_lock.acquire(blocking=blocking):
+            return self._model
+        try:
+            self._checked_at = now
+            stamp = self._stamp()
+            if stamp is not None and stamp != self._manifest_stamp:
+                try:
+                    self._model = self._load()
+                    self._manifest_stamp = stamp
+                except (OSError, ValueError, SentimentModelError) as exc:
+                    logger.warning("No se pudo cargar el modelo de sentimiento: %s", exc)
+            return self._model
+        finally:
+            self._reload_lock.release()
+
+    def _stamp(self) -> Optional[int]:
+        try:
+            return self.manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self) -> LoadedSentimentModel:
+        manifest, pipeline = read_published(self._model_dir)
+        logger.info("Modelo de sentimiento %s cargado", manifest["version"])
+        return LoadedSentimentModel.from_pipeline(manifest["version"], manifest["sha256"], pipeline)
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _prune_model_files(model_dir: Path, keep: Path) -> None:
+    models = sorted(model_dir.glob("sentiment-*.joblib"), key=lambda path: path.stat().st_mtime, reverse=True)
+    for stale in models[KEEP_MODEL_FILES:]:
+        if stale != keep:
+            stale.unlink(missing_ok=True)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from config import BaseConfig
+    from services.ia_service import TRAINING_DATA
+
+    parser = argparse.ArgumentParser(description="Fit and publish the text sentiment model.")
+    parser.add_argument("--output", type=Path, default=Path(BaseConfig.SENTIMENT_MODEL_DIR))
+    args = parser.parse_args(argv)
+    manifest = build_sentiment_model(args.output, TRAINING_DATA)
+    print(f"Modelo {manifest['version']} publicado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Incremental training of the sentiment model on large labeled corpora.
+
+Texts go through a stateless ``HashingVectorizer`` (no vocabulary to fit or
+keep in memory) into an ``SGDClassifier`` trained with ``partial_fit``, one
+bounded batch at a time. Progress is checkpointed by publishing the pipeline
+with ``publish_pipeline``, so ``TextSentimentService`` picks up each
+checkpoint through its usual hot reload.
+
+Train from the backend directory with::
+
+    python -m services.sentiment_online --file mensajes.csv --file extra.jsonl --feedback
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+import argparse
+import logging
+import time
+
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+
+from .bulk_text import iter_records
+from .sentiment_model import SentimentModelError, publish_pipeline, read_published
+
+ONLINE_KIND = "online"
+DEFAULT_CLASSES = ("negative", "neutral", "positive")
+
+logger = logging.getLogger(__name__)
+
+Batch = Tuple[List[str], List[str]]
+
+
+def build_online_pipeline(n_features: int = 2**18) -> Pipeline:
+    return Pipeline(
+        steps=[
+            (
+                "hashing",
+                HashingVectorizer(ngram_range=(1, 2), n_features=n_features, alternate_sign=False, norm="l2"),
+            ),
+            ("clf", SGDClassifier(loss="log_loss", alpha=1e-6)),
+        ]
+    )
+
+
+class OnlineSentimentTrainer:
+    """Feeds labeled batches to ``partial_fit`` and checkpoints into ``model_dir``.
+
+    Memory is bounded by the batch size plus the fixed ``n_features`` x classes
+    coefficient matrix, independent of how many samples are streamed. The
+    coefficients are published sparse, since most hashed columns are never
+    seen, and made dense again when training resumes. Training
+    resumes from the published checkpoint when it is an online model, including
+    the cursor of the feedback rows it has already learned from.
+
+    A published model that is not an online one (the TF-IDF model from
+    ``python -m services.sentiment_model``) is never overwritten unless
+    ``replace`` is set, and a fresh model is not published before it has seen
+    ``min_samples`` samples, so a handful of corrections cannot replace the
+    served model.
+    """
+
+    def __init__(
+        self,
+        model_dir: Path,
+        *,
+        classes: Sequence[str] = DEFAULT_CLASSES,
+        n_features: int = 2**18,
+        checkpoint_every: int = 100_000,
+        checkpoint_seconds: float = 300.0,
+        min_samples: int = 1000,
+        replace: bool = False,
+    ) -> None:
+        self.model_dir = Path(model_dir)
+        self.classes = list(classes)
+        self._checkpoint_every = max(1, checkpoint_every)
+        self._checkpoint_seconds = max(0.0, checkpoint_seconds)
+        self._min_samples = max(1, min_samples)
+        self._replace = replace
+        self._published = False
+        self.pipeline = build_online_pipeline(n_features)
+        self.samples_seen = 0
+        self.skipped = 0
+        self.feedback_cursor: Optional[Tuple[str, int]] = None
+        self._since_checkpoint = 0
+        self._checkpointed_at = time.monotonic()
+        self._resume()
+
+    def _resume(self) -> None:
+        try:
+            manifest, pipeline = read_published(self.model_dir, mmap=False)
+        except (FileNotFoundError, SentimentModelError):
+            return
+        if manifest.get("kind") != ONLINE_KIND:
+            if not self._replace:
+                raise SentimentModelError(
+                    f"El modelo publicado {manifest['version']} no es incremental; "
+                    "usa --replace para sustituirlo por uno entrenado desde cero."
+                )
+            logger.warning("Se reemplazará el modelo publicado %s", manifest["version"])
+            return
+        pipeline.named_steps["clf"].densify()
+        self.pipeline = pipeline
+        self.classes = list(manifest["classes"])
+        self.samples_seen = int(manifest.get("samples", 0))
+        cursor = manifest.get("feedback_cursor")
+        self.feedback_cursor = (cursor[0], int(cursor[1])) if cursor else None
+        self._published = True
+        logger.info("Reanudando entrenamiento desde %s (%s muestras)", manifest["version"], self.samples_seen)
+
+    @property
+    def published(self) -> bool:
+        return self._published
+
+    def partial_fit(self, texts: Sequence[str], labels: Sequence[str]) -> int:
+        known = set(self.classes)
+        pairs = [(text, label) for text, label in zip(texts, labels) if text and label in known]
+        self.skipped += len(texts) - len(pairs)
+        if not pairs:
+            return 0
+        vectorizer = self.pipeline.named_steps["hashing"]
+        features = vectorizer.transform([text for text, _ in pairs])
+        self.pipeline.named_steps["clf"].partial_fit(features, [label for _, label in pairs], classes=self.classes)
+        self.samples_seen += len(pairs)
+        self._since_checkpoint += len(pairs)
+        return len(pairs)
+
+    def train(self, batches: Iterable[Batch]) -> int:
+        """Consume ``batches`` and checkpoint every ``checkpoint_every`` samples or ``checkpoint_seconds``."""
+        trained = 0
+        for texts, labels in batches:
+            trained += self.partial_fit(texts, labels)
+            if self._checkpoint_due():
+                self.checkpoint()
+        return trained
+
+    def _checkpoint_due(self) -> bool:
+        if self._since_checkpoint >= self._checkpoint_every:
+            return True
+        elapsed = time.monotonic() - self._checkpointed_at
+        return self._since_checkpoint > 0 and elapsed >= self._checkpoint_seconds
+
+    def checkpoint(self) -> Optional[dict]:
+        """Publish the model if it learned anything since the last checkpoint."""
+        if self._since_checkpoint == 0:
+            return None
+        if not self._published and self.samples_seen < self._min_samples:
+            logger.info("Aún sin publicar: %s de %s muestras mínimas", self.samples_seen, self._min_samples)
+            return None
+        classifier = self.pipeline.named_steps["clf"]
+        classifier.sparsify()
+        try:
+            manifest = publish_pipeline(
+                self.model_dir,
+                self.pipeline,
+                samples=self.samples_seen,
+                extra={
+                    "kind": ONLINE_KIND,
+                    "feedback_cursor": list(self.feedback_cursor) if self.feedback_cursor else None,
+                },
+            )
+        finally:
+            # ``partial_fit`` needs the dense matrix back.
+            classifier.densify()
+        self._since_checkpoint = 0
+        self._checkpointed_at = time.monotonic()
+        self._published = True
+        logger.info("Checkpoint %s publicado (%s muestras)", manifest["version"], self.samples_seen)
+        return manifest
+
+
+def batched(pairs: Iterable[Tuple[str, str]], batch_size: int) -> Iterator[Batch]:
+    iterator = iter(pairs)
+    while chunk := list(islice(iterator, batch_size)):
+        yield [text for text, _ in chunk], [label for _, label in chunk]
+
+
+def iter_labeled_file(
+    path: Path, *, text_field: str = "text", label_field: str = "label"
+) -> Iterator[Tuple[str, str]]:
+    """Stream ``(text, label)`` pairs from a CSV (with header) or JSON Lines file."""
+    for row in iter_records(path):
+        text, label = row.get(text_field), row.get(label_field)
+        if text and label:
+            yield str(text), str(label).strip().lower()
+
+
+def iter_feedback(trainer: OnlineSentimentTrainer, batch_size: int) -> Iterator[Batch]:
+    """Corrected ``AnalysisResult`` rows newer than the trainer's cursor, in keyset-paginated batches.
+
+    Needs an application context. The cursor moves with every batch, so the
+    next checkpoint records how far the feedback has been learned.
+    """
+    from models.analysis import AnalysisResult
+
+    query = AnalysisResult.query.with_entities(
+        AnalysisResult.id, AnalysisResult.source_text, AnalysisResult.corrected_label, AnalysisResult.corrected_at
+    ).filter(AnalysisResult.corrected_label.isnot(None))
+    while True:
+        page = query
+        if trainer.feedback_cursor is not None:
+            corrected_at, last_id = datetime.fromisoformat(trainer.feedback_cursor[0]), trainer.feedback_cursor[1]
+            page = page.filter(
+                (AnalysisResult.corrected_at > corrected_at)
+                | ((AnalysisResult.corrected_at == corrected_at) & (AnalysisResult.id > last_id))
+            )
+        rows = page.order_by(AnalysisResult.corrected_at, AnalysisResult.id).limit(batch_size).all()
+        if not rows:
+            return
+        # Advanced before yielding: a checkpoint taken after this batch is fitted must include it.
+        trainer.feedback_cursor = (rows[-1].corrected_at.isoformat(), rows[-1].id)
+        yield [row.source_text for row in rows], [row.corrected_label for row in rows]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from config import BaseConfig
+
+    parser = argparse.ArgumentParser(description="Train the sentiment model incrementally.")
+    parser.add_argument("--file", type=Path, action="append", default=[], help="CSV o JSONL con columnas text/label")
+    parser.add_argument("--feedback", action="store_true", help="Incluir correcciones de usuarios de la base de datos")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--label-field", default="label")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--checkpoint-every", type=int, default=100_000)
+    parser.add_argument("--min-samples", type=int, default=1000, help="Muestras antes de publicar un modelo nuevo")
+    parser.add_argument(
+        "--replace", action="store_true", help="Sustituir un modelo publicado que no es incremental"
+    )
+    parser.add_argument("--output", type=Path, default=Path(BaseConfig.SENTIMENT_MODEL_DIR))
+    args = parser.parse_args(argv)
+    if not args.file and not args.feedback:
+        parser.error("Indica al menos un --file o --feedback.")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    try:
+        trainer = OnlineSentimentTrainer(
+            args.output,
+            checkpoint_every=args.checkpoint_every,
+            min_samples=args.min_samples,
+            replace=args.replace,
+        )
+    except SentimentModelError as exc:
+        parser.error(str(exc))
+    trained = 0
+    for path in args.file:
+        pairs = iter_labeled_file(path, text_field=args.text_field, label_field=args.label_field)
+        trained += trainer.train(batched(pairs, args.batch_size))
+    if args.feedback:
+        from app import create_app
+
+        with create_app().app_context():
+            trained += trainer.train(iter_feedback(trainer, args.batch_size))
+    trainer.checkpoint()
+    if not trained:
+        print("No se encontraron muestras etiquetadas nuevas.")
+        return
+    if not trainer.published:
+        print(
+            f"{trained} muestras no alcanzan el mínimo de {args.min_samples}; "
+            "el modelo publicado no se modificó."
+        )
+        return
+    print(
+        f"{trained} muestras nuevas ({trainer.skipped} descartadas); "
+        f"el modelo publicado lleva {trainer.samples_seen}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from collections import Counter
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.utils import murmurhash3_32
+
+
+class CompiledSentimentScorer:
+    """``predict_proba`` of a fitted linear text pipeline without sklearn dispatch.
+
+    Holds the vectorizer's analyzer (same preprocessing, tokenization and
+    n-grams), a token-to-column lookup, the IDF weights (if any) and the
+    coefficients. A document only touches the columns of its own tokens, which
+    for short texts is far cheaper than building a sparse matrix and going
+    through input validation. Dense arrays are used as given, so a
+    memory-mapped model stays shared; sparse coefficients (the online model)
+    are kept column-major so the same column selection stays cheap.
+    """
+
+    def __init__(
+        self,
+        analyzer: Callable[[str], List[str]],
+        vocabulary,
+        idf: Optional[np.ndarray],
+        coef,
+        intercept: np.ndarray,
+        classes: Sequence[str],
+        *,
+        sublinear_tf: bool = False,
+        mode: str = "multinomial",
+    ) -> None:
+        self._analyzer = analyzer
+        self._vocabulary = vocabulary
+        self._idf = None if idf is None else np.asarray(idf, dtype=np.float64)
+        self._coef = coef.tocsc() if sparse.issparse(coef) else np.asarray(coef, dtype=np.float64)
+        self._intercept = np.asarray(intercept, dtype=np.float64)
+        self._sublinear_tf = sublinear_tf
+        self._mode = mode
+        self.classes_ = np.asarray(classes)
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        return np.vstack([self._score(text) for text in texts])
+
+    def _score(self, text: str) -> np.ndarray:
+        vocabulary = self._vocabulary
+        counts = Counter(column for column in map(vocabulary.get, self._analyzer(text)) if column is not None)
+        if counts:
+            columns = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+            values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+            if self._sublinear_tf:
+                values = np.log(values) + 1.0
+            if self._idf is not None:
+                values *= self._idf[columns]
+            norm = np.sqrt(np.dot(values, values))
+            if norm > 0:
+                values /= norm
+            decision = self._coef[:, columns] @ values + self._intercept
+        else:
+            decision = self._intercept.copy()
+
+        if self._mode == "binary":
+            positive = 1.0 / (1.0 + np.exp(-decision[0]))
+            return np.array([1.0 - positive, positive])
+        if self._mode == "ovr":
+            scores = 1.0 / (1.0 + np.exp(-decision))
+            return scores / scores.sum()
+        decision -= decision.max()
+        np.exp(decision, out=decision)
+        return decision / decision.sum()
+
+
+class _HashedColumns:
+    """Token-to-column lookup of a ``HashingVectorizer`` with ``alternate_sign=False``."""
+
+    def __init__(self, n_features: int) -> None:
+        self._n_features = n_features
+
+    def get(self, token: str) -> int:
+        # Same hash and folding as sklearn's ``_hashing_fast.transform``.
+        return abs(murmurhash3_32(token, seed=0)) % self._n_features
+
+
+def compile_scorer(pipeline: Pipeline) -> Optional[CompiledSentimentScorer]:
+    """Compiled scorer for ``pipeline``, or ``None`` when its shape is not one it reproduces."""
+    steps = [step for _, step in pipeline.steps]
+    if len(steps) != 2:
+        return None
+    vectorizer, classifier = steps
+    if type(vectorizer) is TfidfVectorizer and type(classifier) is LogisticRegression:
+        return _compile_tfidf(vectorizer, classifier)
+    if type(vectorizer) is HashingVectorizer and type(classifier) is SGDClassifier:
+        return _compile_hashing(vectorizer, classifier)
+    return None
+
+
+def _compile_tfidf(vectorizer: TfidfVectorizer, classifier: LogisticRegression) -> Optional[CompiledSentimentScorer]:
+    if not vectorizer.use_idf or vectorizer.norm != "l2" or vectorizer.binary:
+        return None
+
+    classes = list(classifier.classes_)
+    multi_class = getattr(classifier, "multi_class", "auto")
+    if len(classes) == 2:
+        mode = "binary"
+    elif multi_class == "ovr" or (multi_class in ("auto", "deprecated") and classifier.solver == "liblinear"):
+        mode = "ovr"
+    else:
+        mode = "multinomial"
+    return CompiledSentimentScorer(
+        vectorizer.build_analyzer(),
+        dict(vectorizer.vocabulary_),
+        vectorizer.idf_,
+        classifier.coef_,
+        classifier.intercept_,
+        classes,
+        sublinear_tf=vectorizer.sublinear_tf,
+        mode=mode,
+    )
+
+
+def _compile_hashing(vectorizer: HashingVectorizer, classifier: SGDClassifier) -> Optional[CompiledSentimentScorer]:
+    if vectorizer.alternate_sign or vectorizer.norm != "l2" or vectorizer.binary or classifier.loss != "log_loss":
+        return None
+    classes = list(classifier.classes_)
+    # SGD's log-loss probabilities are one-vs-rest sigmoids, normalized.
+    return CompiledSentimentScorer(
+        vectorizer.build_analyzer(),
+        _HashedColumns(vectorizer.n_features),
+        None,
+        classifier.coef_,
+        classifier.intercept_,
+        classes,
+        mode="binary" if len(classes) == 2 else "ovr",
+    )
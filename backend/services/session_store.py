@@ -0,0 +1,646 @@
+"""State backends for live sessions.
+
+``MemorySessionStore`` keeps everything inside the current process, which is
+enough for a single worker. ``SqliteSessionStore`` keeps the same state in a
+local SQLite file so every worker process of a node can ingest frames for any
+session; counters are updated with single atomic statements. It also holds the
+frame admission tickets, the rolling emotion windows and the snapshot hashes,
+which a single worker keeps in memory (``FrameGate``, ``RollingEmotionStats``,
+``SnapshotIndex``).
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock, local
+from typing import Dict, Iterator, List, Optional
+import json
+import sqlite3
+import time
+
+STATUS_ACTIVE = "active"
+STATUS_STOPPING = "stopping"
+SNAPSHOT_WRITTEN = "written"
+SNAPSHOT_REPLACED = "replaced"
+SNAPSHOT_SKIPPED = "skipped"
+_HASH_MASK = (1 << 64) - 1
+
+FINALIZATION_PENDING = "pending"
+FINALIZATION_RUNNING = "running"
+FINALIZATION_DONE = "done"
+FINALIZATION_FAILED = "failed"
+# Finished finalizations are kept this long so clients can still poll them.
+FINALIZATION_RETENTION_SECONDS = 3600
+
+
+@dataclass
+class SessionRecord:
+    session_id: str
+    user_id: int
+    channel: str
+    started_at: float
+    stream_name: str
+    status: str = STATUS_ACTIVE
+    last_seen: float = field(default_factory=time.time)
+
+
+@dataclass
+class SessionState:
+    frames: int = 0
+    counts: Dict[str, int] = field(default_factory=dict)
+    dominant_emotion: Optional[str] = None
+    confidence: Optional[float] = None
+    last_snapshot_path: Optional[str] = None
+    label_snapshots: Dict[str, str] = field(default_factory=dict)
+    best_confidences: Dict[str, float] = field(default_factory=dict)
+
+
+class MemorySessionStore:
+    """Process-local store; every method is atomic with respect to the others."""
+
+    shared = False
+
+    def __init__(self) -> None:
+        self._records: Dict[str, SessionRecord] = {}
+        self._states: Dict[str, SessionState] = {}
+        self._snapshot_ts: Dict[str, float] = {}
+        self._finalizations: Dict[str, Dict] = {}
+        self._lock = Lock()
+
+    def create(self, record: SessionRecord) -> None:
+        with self._lock:
+            self._records[record.session_id] = record
+            self._states[record.session_id] = SessionState()
+            self._snapshot_ts[record.session_id] = 0.0
+
+    def get(self, session_id: str) -> Optional[SessionRecord]:
+        with self._lock:
+            return self._records.get(session_id)
+
+    def active_sessions(self) -> List[SessionRecord]:
+        with self._lock:
+            return [record for record in self._records.values() if record.status == STATUS_ACTIVE]
+
+    def record_frame(
+        self,
+        session_id: str,
+        counts: Dict[str, int],
+        dominant_emotion: Optional[str],
+        confidence: Optional[float],
+        emotion_confidences: Dict[str, float],
+    ) -> Optional[SessionState]:
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is None or record.status != STATUS_ACTIVE:
+                return None
+            record.last_seen = time.time()
+            state = self._states[session_id]
+            state.frames += 1
+            for label, qty in counts.items():
+                state.counts[label] = state.counts.get(label, 0) + int(qty)
+            state.dominant_emotion = dominant_emotion or state.dominant_emotion
+            state.confidence = confidence or state.confidence
+            for label, conf in emotion_confidences.items():
+                state.best_confidences[label] = max(conf, state.best_confidences.get(label, 0.0))
+            return _copy_state(state)
+
+    def claim_snapshot(self, session_id: str, now: float, interval: float) -> bool:
+        with self._lock:
+            if now - self._snapshot_ts.get(session_id, 0.0) < interval:
+                return False
+            self._snapshot_ts[session_id] = now
+            return True
+
+    def set_snapshots(self, session_id: str, label_paths: Dict[str, str], latest_path: Optional[str]) -> None:
+        with self._lock:
+            state = self._states.get(session_id)
+            if state is None:
+                return
+            state.label_snapshots.update(label_paths)
+            if latest_path:
+                state.last_snapshot_path = latest_path
+
+    def state(self, session_id: str) -> Optional[SessionState]:
+        with self._lock:
+            state = self._states.get(session_id)
+            return _copy_state(state) if state is not None else None
+
+    def mark_stopping(self, session_id: str) -> bool:
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is None or record.status != STATUS_ACTIVE:
+                return False
+            record.status = STATUS_STOPPING
+            return True
+
+    def remove(self, session_id: str) -> None:
+        with self._lock:
+            self._records.pop(session_id, None)
+            self._states.pop(session_id, None)
+            self._snapshot_ts.pop(session_id, None)
+
+    def create_finalization(self, finalization_id: str, session_id: str, user_id: int) -> None:
+        now = time.time()
+        with self._lock:
+            cutoff = now - FINALIZATION_RETENTION_SECONDS
+            for key in [key for key, item in self._finalizations.items() if item["updated_at"] < cutoff]:
+                del self._finalizations[key]
+            self._finalizations[finalization_id] = {
+                "finalization_id": finalization_id,
+                "session_id": session_id,
+                "user_id": user_id,
+                "status": FINALIZATION_PENDING,
+                "result": None,
+                "error": None,
+                "updated_at": now,
+            }
+
+    def update_finalization(
+        self,
+        finalization_id: str,
+        status: str,
+        result: Optional[Dict] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        with self._lock:
+            item = self._finalizations.get(finalization_id)
+            if item is not None:
+                item.update(status=status, result=result, error=error, updated_at=time.time())
+
+    def get_finalization(self, finalization_id: str) -> Optional[Dict]:
+        with self._lock:
+            item = self._finalizations.get(finalization_id)
+            return dict(item) if item is not None else None
+
+
+class SqliteSessionStore:
+    """Store shared by the worker processes of one node through a SQLite file."""
+
+    shared = True
+
+    def __init__(self, path: Path, *, timeout: float = 10.0) -> None:
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._timeout = timeout
+        self._local = local()
+        self._connection().executescript(_SCHEMA)
+
+    def create(self, record: SessionRecord) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO live_sessions (session_id, user_id, channel, started_at, stream_name, status, last_seen)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    record.session_id,
+                    record.user_id,
+                    record.channel,
+                    record.started_at,
+                    record.stream_name,
+                    record.status,
+                    record.last_seen,
+                ),
+            )
+
+    def get(self, session_id: str) -> Optional[SessionRecord]:
+        row = self._connection().execute(
+            "SELECT session_id, user_id, channel, started_at, stream_name, status, last_seen"
+            " FROM live_sessions WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+        return SessionRecord(*row) if row else None
+
+    def active_sessions(self) -> List[SessionRecord]:
+        rows = self._connection().execute(
+            "SELECT session_id, user_id, channel, started_at, stream_name, status, last_seen"
+            " FROM live_sessions WHERE status = ?",
+            (STATUS_ACTIVE,),
+        ).fetchall()
+        return [SessionRecord(*row) for row in rows]
+
+    def record_frame(
+        self,
+        session_id: str,
+        counts: Dict[str, int],
+        dominant_emotion: Optional[str],
+        confidence: Optional[float],
+        emotion_confidences: Dict[str, float],
+    ) -> Optional[SessionState]:
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE live_sessions SET frames = frames + 1, last_seen = ?,"
+                " dominant_emotion = COALESCE(?, dominant_emotion),"
+                " confidence = COALESCE(?, confidence)"
+                " WHERE session_id = ? AND status = ?",
+                (time.time(), dominant_emotion or None, confidence or None, session_id, STATUS_ACTIVE),
+            ).rowcount
+            if not updated:
+                return None
+            conn.executemany(
+                "INSERT INTO live_session_counts (session_id, label, count) VALUES (?, ?, ?)"
+                " ON CONFLICT(session_id, label) DO UPDATE SET count = count + excluded.count",
+                [(session_id, label, int(qty)) for label, qty in counts.items()],
+            )
+            conn.executemany(
+                "INSERT INTO live_session_confidences (session_id, label, best) VALUES (?, ?, ?)"
+                " ON CONFLICT(session_id, label) DO UPDATE SET best = MAX(best, excluded.best)",
+                [(session_id, label, float(conf)) for label, conf in emotion_confidences.items()],
+            )
+            return self._read_state(conn, session_id)
+
+    def claim_snapshot(self, session_id: str, now: float, interval: float) -> bool:
+        with self._transaction() as conn:
+            return bool(
+                conn.execute(
+                    "UPDATE live_sessions SET last_snapshot_ts = ? WHERE session_id = ? AND ? - last_snapshot_ts >= ?",
+                    (now, session_id, now, interval),
+                ).rowcount
+            )
+
+    def set_snapshots(self, session_id: str, label_paths: Dict[str, str], latest_path: Optional[str]) -> None:
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO live_session_snapshots (session_id, label, path) VALUES (?, ?, ?)"
+                " ON CONFLICT(session_id, label) DO UPDATE SET path = excluded.path",
+                [(session_id, label, path) for label, path in label_paths.items()],
+            )
+            if latest_path:
+                conn.execute(
+                    "UPDATE live_sessions SET last_snapshot_path = ? WHERE session_id = ?",
+                    (latest_path, session_id),
+                )
+
+    def state(self, session_id: str) -> Optional[SessionState]:
+        return self._read_state(self._connection(), session_id)
+
+    def next_frame_ticket(self, session_id: str) -> int:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO live_session_gates (session_id, latest_ticket) VALUES (?, 1)"
+                " ON CONFLICT(session_id) DO UPDATE SET latest_ticket = latest_ticket + 1",
+                (session_id,),
+            )
+            return conn.execute(
+                "SELECT latest_ticket FROM live_session_gates WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+
+    def claim_inference(self, session_id: str, ticket: int, now: float, lease: float) -> Optional[bool]:
+        """``True`` when ``ticket`` takes the inference slot, ``False`` once a newer ticket
+        superseded it and ``None`` while another frame holds the slot."""
+        with self._transaction() as conn:
+            latest, busy_ticket, busy_until = conn.execute(
+                "SELECT latest_ticket, busy_ticket, busy_until FROM live_session_gates WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            if latest != ticket:
+                conn.execute(
+                    "UPDATE live_session_gates SET dropped = dropped + 1 WHERE session_id = ?", (session_id,)
+                )
+                return False
+            if busy_ticket and busy_until > now:
+                return None
+            conn.execute(
+                "UPDATE live_session_gates SET busy_ticket = ?, busy_until = ?, admitted = admitted + 1"
+                " WHERE session_id = ?",
+                (ticket, now + lease, session_id),
+            )
+            return True
+
+    def release_inference(self, session_id: str, ticket: int, payload: Optional[Dict]) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE live_session_gates SET last_payload = COALESCE(?, last_payload),"
+                " busy_ticket = CASE WHEN busy_ticket = ? THEN 0 ELSE busy_ticket END WHERE session_id = ?",
+                (json.dumps(payload) if payload is not None else None, ticket, session_id),
+            )
+
+    def discard_frames(self, session_id: str, count: int) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO live_session_gates (session_id, dropped) VALUES (?, ?)"
+                " ON CONFLICT(session_id) DO UPDATE SET dropped = dropped + excluded.dropped",
+                (session_id, count),
+            )
+
+    def frame_gate(self, session_id: str) -> tuple[int, int, Optional[Dict]]:
+        """Admitted and dropped frame counts plus the last published payload."""
+        row = self._connection().execute(
+            "SELECT admitted, dropped, last_payload FROM live_session_gates WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return 0, 0, None
+        admitted, dropped, last_payload = row
+        return admitted, dropped, json.loads(last_payload) if last_payload else None
+
+    def record_rolling(
+        self,
+        session_id: str,
+        second: int,
+        counts: Dict[str, int],
+        confidence: float,
+        distribution: Optional[Dict[str, float]],
+        ema_alpha: float,
+        keep_since: int,
+    ) -> None:
+        """Add one frame to its one-second bucket and drop buckets older than ``keep_since``."""
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO live_session_rolling (session_id, second, frames, confidence_sum) VALUES (?, ?, 1, ?)"
+                " ON CONFLICT(session_id, second) DO UPDATE SET frames = frames + 1,"
+                " confidence_sum = confidence_sum + excluded.confidence_sum",
+                (session_id, second, float(confidence)),
+            )
+            conn.executemany(
+                "INSERT INTO live_session_rolling_counts (session_id, second, label, count) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(session_id, second, label) DO UPDATE SET count = count + excluded.count",
+                [(session_id, second, label, int(qty)) for label, qty in counts.items() if qty],
+            )
+            for table in ("live_session_rolling", "live_session_rolling_counts"):
+                conn.execute(f"DELETE FROM {table} WHERE session_id = ? AND second < ?", (session_id, keep_since))
+            if distribution:
+                conn.executemany(
+                    "INSERT INTO live_session_rolling_ema (session_id, label, value) VALUES (?, ?, ?)"
+                    " ON CONFLICT(session_id, label) DO UPDATE SET value = value + ? * (excluded.value - value)",
+                    [(session_id, label, float(share), ema_alpha) for label, share in distribution.items()],
+                )
+
+    def rolling_window(self, session_id: str, since: int) -> tuple[int, float, Dict[str, int]]:
+        """Frames, confidence sum and label counts of the buckets from ``since`` on."""
+        conn = self._connection()
+        frames, confidence_sum = conn.execute(
+            "SELECT COALESCE(SUM(frames), 0), COALESCE(SUM(confidence_sum), 0) FROM live_session_rolling"
+            " WHERE session_id = ? AND second >= ?",
+            (session_id, since),
+        ).fetchone()
+        counts = conn.execute(
+            "SELECT label, SUM(count) FROM live_session_rolling_counts WHERE session_id = ? AND second >= ?"
+            " GROUP BY label",
+            (session_id, since),
+        ).fetchall()
+        return int(frames), float(confidence_sum), {label: int(count) for label, count in counts if count}
+
+    def rolling_ema(self, session_id: str) -> Dict[str, float]:
+        return dict(
+            self._connection()
+            .execute("SELECT label, value FROM live_session_rolling_ema WHERE session_id = ?", (session_id,))
+            .fetchall()
+        )
+
+    def place_snapshot(
+        self,
+        session_id: str,
+        label: str,
+        image_hash: int,
+        confidence: float,
+        new_path: str,
+        max_distance: int,
+    ) -> tuple[str, str]:
+        """Shared counterpart of ``SnapshotIndex.place``; returns the path and the outcome."""
+        stored_hash = image_hash - (1 << 64) if image_hash >= 1 << 63 else image_hash  # SQLite integers are signed
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT rowid, hash, path, confidence FROM live_session_snapshot_hashes"
+                " WHERE session_id = ? AND label = ?",
+                (session_id, label),
+            ).fetchall()
+            distances = [(bin((row[1] & _HASH_MASK) ^ image_hash).count("1"), row) for row in rows]
+            match = min((item for item in distances if item[0] <= max_distance), key=lambda item: item[0], default=None)
+            if match is None:
+                conn.execute(
+                    "INSERT INTO live_session_snapshot_hashes (session_id, label, hash, path, confidence)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (session_id, label, stored_hash, new_path, float(confidence)),
+                )
+                return new_path, SNAPSHOT_WRITTEN
+            rowid, _, path, best = match[1]
+            if confidence > best:
+                conn.execute(
+                    "UPDATE live_session_snapshot_hashes SET hash = ?, confidence = ? WHERE rowid = ?",
+                    (stored_hash, float(confidence), rowid),
+                )
+                return path, SNAPSHOT_REPLACED
+            return path, SNAPSHOT_SKIPPED
+
+    def snapshot_hash_count(self, session_id: str) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM live_session_snapshot_hashes WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+
+    def mark_stopping(self, session_id: str) -> bool:
+        with self._transaction() as conn:
+            return bool(
+                conn.execute(
+                    "UPDATE live_sessions SET status = ? WHERE session_id = ? AND status = ?",
+                    (STATUS_STOPPING, session_id, STATUS_ACTIVE),
+                ).rowcount
+            )
+
+    def remove(self, session_id: str) -> None:
+        with self._transaction() as conn:
+            for table in _SESSION_TABLES:
+                conn.execute(f"DELETE FROM {table} WHERE session_id = ?", (session_id,))
+
+    def create_finalization(self, finalization_id: str, session_id: str, user_id: int) -> None:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM live_session_finalizations WHERE updated_at < ?",
+                (now - FINALIZATION_RETENTION_SECONDS,),
+            )
+            conn.execute(
+                "INSERT INTO live_session_finalizations (finalization_id, session_id, user_id, status, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (finalization_id, session_id, user_id, FINALIZATION_PENDING, now),
+            )
+
+    def update_finalization(
+        self,
+        finalization_id: str,
+        status: str,
+        result: Optional[Dict] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE live_session_finalizations SET status = ?, result = ?, error = ?, updated_at = ?"
+                " WHERE finalization_id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), finalization_id),
+            )
+
+    def get_finalization(self, finalization_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT finalization_id, session_id, user_id, status, result, error, updated_at"
+            " FROM live_session_finalizations WHERE finalization_id = ?",
+            (finalization_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ("finalization_id", "session_id", "user_id", "status", "result", "error", "updated_at")
+        item = dict(zip(keys, row))
+        item["result"] = json.loads(item["result"]) if item["result"] else None
+        return item
+
+    # ------------------------------------------------------------------
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self._path), timeout=self._timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _read_state(self, conn: sqlite3.Connection, session_id: str) -> Optional[SessionState]:
+        row = conn.execute(
+            "SELECT frames, dominant_emotion, confidence, last_snapshot_path FROM live_sessions WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        frames, dominant, confidence, last_snapshot_path = row
+        return SessionState(
+            frames=frames,
+            counts=dict(
+                conn.execute(
+                    "SELECT label, count FROM live_session_counts WHERE session_id = ?", (session_id,)
+                ).fetchall()
+            ),
+            dominant_emotion=dominant,
+            confidence=confidence,
+            last_snapshot_path=last_snapshot_path,
+            label_snapshots=dict(
+                conn.execute(
+                    "SELECT label, path FROM live_session_snapshots WHERE session_id = ?", (session_id,)
+                ).fetchall()
+            ),
+            best_confidences=dict(
+                conn.execute(
+                    "SELECT label, best FROM live_session_confidences WHERE session_id = ?", (session_id,)
+                ).fetchall()
+            ),
+        )
+
+
+def build_session_store(backend: str, path: Optional[Path] = None):
+    if (backend or "memory").lower() == "sqlite":
+        if path is None:
+            raise ValueError("LIVE_SESSION_STORE_PATH es obligatorio para el almacén sqlite.")
+        return SqliteSessionStore(path)
+    return MemorySessionStore()
+
+
+def _copy_state(state: SessionState) -> SessionState:
+    return SessionState(
+        frames=state.frames,
+        counts=dict(state.counts),
+        dominant_emotion=state.dominant_emotion,
+        confidence=state.confidence,
+        last_snapshot_path=state.last_snapshot_path,
+        label_snapshots=dict(state.label_snapshots),
+        best_confidences=dict(state.best_confidences),
+    )
+
+
+_SESSION_TABLES = (
+    "live_session_counts",
+    "live_session_confidences",
+    "live_session_snapshots",
+    "live_session_snapshot_hashes",
+    "live_session_rolling",
+    "live_session_rolling_counts",
+    "live_session_rolling_ema",
+    "live_session_gates",
+    "live_sessions",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS live_sessions (
+    session_id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    stream_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    frames INTEGER NOT NULL DEFAULT 0,
+    dominant_emotion TEXT,
+    confidence REAL,
+    last_snapshot_ts REAL NOT NULL DEFAULT 0,
+    last_snapshot_path TEXT,
+    last_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS live_session_counts (
+    session_id TEXT NOT NULL,
+    label TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (session_id, label)
+);
+CREATE TABLE IF NOT EXISTS live_session_confidences (
+    session_id TEXT NOT NULL,
+    label TEXT NOT NULL,
+    best REAL NOT NULL,
+    PRIMARY KEY (session_id, label)
+);
+CREATE TABLE IF NOT EXISTS live_session_finalizations (
+    finalization_id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS live_session_snapshots (
+    session_id TEXT NOT NULL,
+    label TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (session_id, label)
+);
+CREATE TABLE IF NOT EXISTS live_session_snapshot_hashes (
+    session_id TEXT NOT NULL,
+    label TEXT NOT NULL,
+    hash INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    confidence REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_live_session_snapshot_hashes ON live_session_snapshot_hashes (session_id, label);
+CREATE TABLE IF NOT EXISTS live_session_rolling (
+    session_id TEXT NOT NULL,
+    second INTEGER NOT NULL,
+    frames INTEGER NOT NULL DEFAULT 0,
+    confidence_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (session_id, second)
+);
+CREATE TABLE IF NOT EXISTS live_session_rolling_counts (
+    session_id TEXT NOT NULL,
+    second INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (session_id, second, label)
+);
+CREATE TABLE IF NOT EXISTS live_session_rolling_ema (
+    session_id TEXT NOT NULL,
+    label TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (session_id, label)
+);
+CREATE TABLE IF NOT EXISTS live_session_gates (
+    session_id TEXT PRIMARY KEY,
+    latest_ticket INTEGER NOT NULL DEFAULT 0,
+    busy_ticket INTEGER NOT NULL DEFAULT 0,
+    busy_until REAL NOT NULL DEFAULT 0,
+    admitted INTEGER NOT NULL DEFAULT 0,
+    dropped INTEGER NOT NULL DEFAULT 0,
+    last_payload TEXT
+);
+"""
@@ -0,0 +1,128 @@
+"""Per-frame timeline of a live session stored as one NumPy file per column.
+
+While a session is recording, every worker appends fixed-size records to its
+own raw file under ``<stream>.timeline/``. Once every worker has closed its
+recording the raw files are merged, ordered by time, into
+``<stream>.timeline.columns/`` with one ``.npy`` per field. Each column is
+memory-mapped, so a time-range slice binary-searches the contiguous ``t``
+column and only touches the pages of the rows it returns.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Optional
+import os
+import shutil
+
+import numpy as np
+
+TIMELINE_DTYPE = np.dtype(
+    [
+        ("t", "<f8"),  # seconds since the session started
+        ("seq", "<u4"),
+        ("label", "i1"),  # index into the session labels, -1 when unknown
+        ("confidence", "<f4"),
+        ("faces", "<u2"),
+    ]
+)
+RAW_SUFFIX = ".timeline"
+TIMELINE_SUFFIX = ".timeline.columns"
+
+
+def timeline_dir_for(stream_path: Path) -> Path:
+    return stream_path.with_name(stream_path.stem + RAW_SUFFIX)
+
+
+def timeline_path_for(stream_path: Path) -> Path:
+    return stream_path.with_name(stream_path.stem + TIMELINE_SUFFIX)
+
+
+class TimelineWriter:
+    """Appends records to one worker's raw timeline file; each record is a single write."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._handle = None
+        self._closed = False
+
+    def append(self, t: float, seq: int, label: int, confidence: Optional[float], faces: int) -> None:
+        if self._closed:
+            # A request that raced the stop must not recreate a merged raw directory.
+            return
+        if self._handle is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._handle = open(self.path, "ab", buffering=0)
+        record = np.array([(t, seq, label, confidence or 0.0, faces)], dtype=TIMELINE_DTYPE)
+        self._handle.write(record.tobytes())
+
+    def close(self) -> None:
+        self._closed = True
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+def timeline_pending(path: Path) -> bool:
+    """Whether the raw files behind the timeline ``path`` are still waiting to be merged."""
+    if not path.name.endswith(TIMELINE_SUFFIX):
+        return False
+    return path.with_name(path.name[: -len(TIMELINE_SUFFIX)] + RAW_SUFFIX).is_dir()
+
+
+def merge_timeline(raw_dir: Path, target: Path) -> int:
+    """Merge the raw worker files of ``raw_dir`` into the column directory ``target``.
+
+    Returns the number of frames. Call it only once every worker has closed its
+    raw file; records appended afterwards are lost with ``raw_dir``.
+    """
+    parts = []
+    for raw_file in sorted(raw_dir.glob("*.bin")):
+        data = raw_file.read_bytes()
+        # A worker killed mid-write may leave a partial trailing record.
+        usable = len(data) - len(data) % TIMELINE_DTYPE.itemsize
+        if usable:
+            parts.append(np.frombuffer(data[:usable], dtype=TIMELINE_DTYPE))
+    if not parts:
+        shutil.rmtree(raw_dir, ignore_errors=True)
+        return 0
+    records = np.concatenate(parts)
+    records = records[np.argsort(records["t"], kind="stable")]
+    tmp_dir = target.with_name(target.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    for name in TIMELINE_DTYPE.names:
+        np.save(tmp_dir / f"{name}.npy", np.ascontiguousarray(records[name]))
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp_dir, target)
+    shutil.rmtree(raw_dir, ignore_errors=True)
+    return int(records.shape[0])
+
+
+def read_timeline_slice(path: Path, start: Optional[float], end: Optional[float], limit: int) -> Dict:
+    """Columnar slice of the frames with ``start <= t < end``, read through memory maps."""
+    columns = _open_columns(path)
+    times = columns["t"]
+    lower = int(np.searchsorted(times, start, side="left")) if start is not None else 0
+    upper = int(np.searchsorted(times, end, side="left")) if end is not None else int(times.shape[0])
+    upper = max(lower, upper)
+    stop = min(upper, lower + limit)
+    selected = {name: np.array(column[lower:stop]) for name, column in columns.items()}
+    return {
+        "total_frames": int(times.shape[0]),
+        "duration_seconds": float(times[-1]) if times.shape[0] else 0.0,
+        "offset": lower,
+        "truncated": upper - lower > limit,
+        "t": [round(float(value), 3) for value in selected["t"]],
+        "seq": selected["seq"].tolist(),
+        "label": selected["label"].tolist(),
+        "confidence": [round(float(value), 4) for value in selected["confidence"]],
+        "faces": selected["faces"].tolist(),
+    }
+
+
+def _open_columns(path: Path) -> Dict[str, np.ndarray]:
+    if path.is_dir():
+        return {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in TIMELINE_DTYPE.names}
+    # Timelines merged before the column layout are a single packed record array.
+    records = np.load(path, mmap_mode="r")
+    return {name: records[name] for name in TIMELINE_DTYPE.names}
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from .session_store import SNAPSHOT_REPLACED, SNAPSHOT_SKIPPED, SNAPSHOT_WRITTEN
+
+
+def dhash(image: np.ndarray) -> int:
+    """64-bit difference hash: sign of horizontal gradients on a 9x8 thumbnail."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    thumb = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (thumb[:, 1:] > thumb[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+@dataclass
+class SnapshotEntry:
+    hash: int
+    path: Path
+    confidence: float
+
+
+class SnapshotIndex:
+    """Per-session perceptual-hash index of the snapshots already written for each label.
+
+    ``place`` decides what to do with a new snapshot: write it to a new file,
+    overwrite a near-identical one with lower confidence, or skip it and keep
+    the existing file.
+    """
+
+    def __init__(self, *, max_distance: int = 6) -> None:
+        self._max_distance = max(0, max_distance)
+        self._entries: Dict[str, List[SnapshotEntry]] = {}
+        self._lock = Lock()
+        self.written = 0
+        self.replaced = 0
+        self.skipped = 0
+
+    def place(self, label: str, image: np.ndarray, confidence: float, new_path: Path) -> tuple[Path, bool]:
+        """Return the path that should hold this snapshot and whether it has to be written."""
+        image_hash = dhash(image)
+        with self._lock:
+            entries = self._entries.setdefault(label, [])
+            match = min(
+                (entry for entry in entries if bin(entry.hash ^ image_hash).count("1") <= self._max_distance),
+                key=lambda entry: bin(entry.hash ^ image_hash).count("1"),
+                default=None,
+            )
+            if match is None:
+                entries.append(SnapshotEntry(image_hash, new_path, confidence))
+                self.written += 1
+                return new_path, True
+            if confidence > match.confidence:
+                match.hash = image_hash
+                match.confidence = confidence
+                self.replaced += 1
+                return match.path, True
+            self.skipped += 1
+            return match.path, False
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "unique": sum(len(entries) for entries in self._entries.values()),
+                "written": self.written,
+                "replaced": self.replaced,
+                "skipped": self.skipped,
+            }
+
+
+class SharedSnapshotIndex(SnapshotIndex):
+    """``SnapshotIndex`` whose hashes live in a shared session store.
+
+    Lets every worker process of a session deduplicate against the snapshots
+    the others wrote. ``written``, ``replaced`` and ``skipped`` count this
+    worker's decisions; ``unique`` covers the whole session.
+    """
+
+    def __init__(self, store, session_id: str, *, max_distance: int = 6) -> None:
+        super().__init__(max_distance=max_distance)
+        self._store = store
+        self._session_id = session_id
+
+    def place(self, label: str, image: np.ndarray, confidence: float, new_path: Path) -> tuple[Path, bool]:
+        path, outcome = self._store.place_snapshot(
+            self._session_id, label, dhash(image), confidence, str(new_path), self._max_distance
+        )
+        with self._lock:
+            if outcome == SNAPSHOT_WRITTEN:
+                self.written += 1
+            elif outcome == SNAPSHOT_REPLACED:
+                self.replaced += 1
+            else:
+                self.skipped += 1
+        return Path(path), outcome != SNAPSHOT_SKIPPED
+
+    def stats(self) -> Dict[str, int]:
+        stats = super().stats()
+        stats["unique"] = self._store.snapshot_hash_count(self._session_id)
+        return stats
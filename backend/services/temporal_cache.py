@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+SIGNATURE_SIZE = (16, 16)
+
+Box = Tuple[int, int, int, int]
+
+
+def signature(gray: np.ndarray) -> np.ndarray:
+    """Tiny downsampled copy of a grayscale image used to compare consecutive frames."""
+    return cv2.resize(gray, SIGNATURE_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def _difference(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(np.abs(a - b)))
+
+
+def _iou(a: Box, b: Box) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    inter_w = min(ax + aw, bx + bw) - max(ax, bx)
+    inter_h = min(ay + ah, by + bh) - max(ay, by)
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    return inter / float(aw * ah + bw * bh - inter)
+
+
+class TemporalCache:
+    """Reuses detections and predictions between near-identical frames of one live session.
+
+    A frame whose signature differs from the previous analyzed frame by less than
+    ``threshold`` (mean absolute difference on the 0-255 scale) reuses its face
+    boxes and predictions entirely. Otherwise faces are detected again, but each
+    face ROI that matches a previous box and looks the same reuses its
+    prediction. Every ``refresh_frames`` frames a full analysis is forced so
+    results are never staler than that.
+    """
+
+    def __init__(self, *, threshold: float = 4.0, refresh_frames: int = 10, match_iou: float = 0.5) -> None:
+        self._threshold = max(0.0, threshold)
+        self._refresh_frames = max(1, refresh_frames)
+        self._match_iou = match_iou
+        self._lock = Lock()
+        self._shape: Optional[Tuple[int, int]] = None
+        self._frame_signature: Optional[np.ndarray] = None
+        self._faces: List[Tuple[Box, np.ndarray, np.ndarray]] = []
+        self._since_refresh = 0
+        self._refreshing = False
+        self._frames = 0
+        self._frame_skips = 0
+        self._rois = 0
+        self._roi_skips = 0
+
+    def lookup_frame(self, gray: np.ndarray) -> Optional[List[Tuple[Box, np.ndarray]]]:
+        """Return the previous ``(box, prediction)`` pairs when ``gray`` matches the previous frame."""
+        current = signature(gray)
+        with self._lock:
+            self._frames += 1
+            if self._shape != gray.shape[:2]:
+                # A new resolution invalidates every cached box.
+                self._shape = gray.shape[:2]
+                self._frame_signature = None
+                self._faces = []
+            self._refreshing = self._since_refresh + 1 >= self._refresh_frames
+            reusable = (
+                not self._refreshing
+                and self._frame_signature is not None
+                and _difference(current, self._frame_signature) < self._threshold
+            )
+            if reusable:
+                self._since_refresh += 1
+                self._frame_skips += 1
+                return [(box, prediction) for box, _, prediction in self._faces]
+            self._frame_signature = current
+            return None
+
+    def lookup_roi(self, box: Box, roi: np.ndarray) -> Optional[np.ndarray]:
+        current = signature(roi)
+        with self._lock:
+            self._rois += 1
+            if self._refreshing:
+                return None
+            best = None
+            best_iou = self._match_iou
+            for previous_box, previous_signature, prediction in self._faces:
+                overlap = _iou(box, previous_box)
+                if overlap >= best_iou and _difference(current, previous_signature) < self._threshold:
+                    best, best_iou = prediction, overlap
+            if best is not None:
+                self._roi_skips += 1
+            return best
+
+    def store(self, faces: Sequence[Tuple[Box, np.ndarray, np.ndarray]]) -> None:
+        """Remember ``(box, roi, prediction)`` for every face of the frame just analyzed."""
+        with self._lock:
+            self._faces = [(tuple(int(v) for v in box), signature(roi), prediction) for box, roi, prediction in faces]
+            self._since_refresh = 0 if self._refreshing else self._since_refresh + 1
+            self._refreshing = False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "frames": self._frames,
+                "frame_skips": self._frame_skips,
+                "frame_skip_ratio": round(self._frame_skips / self._frames, 3) if self._frames else 0.0,
+                "rois": self._rois,
+                "roi_skips": self._roi_skips,
+                "roi_skip_ratio": round(self._roi_skips / self._rois, 3) if self._rois else 0.0,
+            }
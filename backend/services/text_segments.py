@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional
+import re
+
+SENTENCE = "sentence"
+PARAGRAPH = "paragraph"
+GRANULARITIES = (SENTENCE, PARAGRAPH)
+
+_BOUNDARIES = {
+    SENTENCE: re.compile(r"(?<=[.!?…])[\"'”»)\]]*\s+|\s*\n\s*"),
+    PARAGRAPH: re.compile(r"\s*\n\s*\n\s*"),
+}
+_LETTER = re.compile(r"[^\W\d_]")
+# Sentence-final periods that usually are not: titles and initials ("Sr. Pérez", "J. García").
+_ABBREVIATION = re.compile(
+    r"(?:\b(?:sr|sra|srta|dr|dra|lic|ing|prof|etc|ej|pág|núm|vs|mr|mrs|ms|jr|st)|(?<!\w)[A-ZÁÉÍÓÚÑ])\.$",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class Segment:
+    start: int
+    end: int
+    text: str
+
+
+def split_segments(text: str, granularity: str = SENTENCE, *, max_segments: int = 2000) -> List[Segment]:
+    """Split ``text`` into sentences or paragraphs, keeping their character offsets.
+
+    Every real sentence stays on its own, however short. Only pieces without
+    letters (bullets, numbering) are attached to the next one, and a split
+    after an abbreviation or initial is undone; neither crosses a paragraph
+    break. Past ``max_segments`` neighbouring segments are grouped so a huge
+    document still yields a bounded batch.
+    """
+    if granularity not in _BOUNDARIES:
+        raise ValueError(f"Granularity must be one of: {', '.join(GRANULARITIES)}.")
+
+    segments: List[Segment] = []
+    pending: Optional[Segment] = None
+    joinable = False
+    start = 0
+    new_paragraph = True
+
+    def flush() -> None:
+        # A letterless piece left at the end of a paragraph joins the last
+        # segment of that paragraph, or stands alone if there is none.
+        if joinable:
+            segments[-1] = _span(text, segments[-1].start, pending.end)
+        else:
+            segments.append(pending)
+
+    for boundary in [*_BOUNDARIES[granularity].finditer(text), None]:
+        end = boundary.start() if boundary is not None else len(text)
+        piece = _span(text, start, end)
+        if piece.text:
+            if new_paragraph:
+                joinable = False
+            if pending is not None:
+                piece = _span(text, pending.start, piece.end)
+                pending = None
+            if not _LETTER.search(piece.text):
+                pending = piece
+            elif joinable and _ABBREVIATION.search(segments[-1].text):
+                segments[-1] = _span(text, segments[-1].start, piece.end)
+            else:
+                segments.append(piece)
+                joinable = True
+            new_paragraph = False
+        if boundary is None or boundary.group().count("\n") >= 2:
+            if pending is not None:
+                flush()
+                pending = None
+            new_paragraph = True
+        if boundary is not None:
+            start = boundary.end()
+
+    if len(segments) > max_segments > 0:
+        size = -(-len(segments) // max_segments)
+        segments = [
+            _span(text, group[0].start, group[-1].end)
+            for group in (segments[index:index + size] for index in range(0, len(segments), size))
+        ]
+    return segments
+
+
+def _span(text: str, start: int, end: int) -> Segment:
+    raw = text[start:end]
+    stripped = raw.strip()
+    if not stripped:
+        return Segment(start, start, "")
+    offset = start + (len(raw) - len(raw.lstrip()))
+    return Segment(offset, offset + len(stripped), stripped)
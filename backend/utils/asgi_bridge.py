@@ -0,0 +1,258 @@
+"""Serve a WSGI application from an ASGI server without a thread per connection.
+
+The request body is read on the event loop (spooled to disk past a threshold),
+and only then is the WSGI call dispatched to a bounded executor. Response
+chunks are pulled from the executor in batches and written asynchronously, so
+slow uploads and slow downloads wait on the loop instead of holding a thread.
+
+Paths listed in ``stream_paths`` are the exception: their view reads the body
+while it arrives (chunked uploads that start analysing early, previews staged
+straight into memory), so it is handed a streaming ``wsgi.input`` instead and
+holds its thread for as long as the client takes to send it.
+"""
+from __future__ import annotations
+
+from concurrent.futures import Executor
+from http import HTTPStatus
+from tempfile import SpooledTemporaryFile
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+import asyncio
+import io
+import json
+import logging
+import sys
+
+from werkzeug.exceptions import ClientDisconnected, RequestEntityTooLarge
+
+RESPONSE_BATCH_BYTES = 256 * 1024
+STREAM_BUFFER_BYTES = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class WSGIBridge:
+    def __init__(
+        self,
+        wsgi_app: Callable,
+        executor: Executor,
+        *,
+        max_body_bytes: Optional[int] = None,
+        spool_bytes: int = 1024 * 1024,
+        stream_paths: Sequence[str] = (),
+    ) -> None:
+        self._wsgi_app = wsgi_app
+        self._executor = executor
+        self._max_body_bytes = max_body_bytes
+        self._spool_bytes = spool_bytes
+        self._stream_paths = tuple(stream_paths)
+
+    async def __call__(self, scope, receive, send) -> None:
+        loop = asyncio.get_running_loop()
+        if self._streams(scope):
+            body = io.BufferedReader(_StreamingInput(loop, receive, self._max_body_bytes), STREAM_BUFFER_BYTES)
+        else:
+            body = await self._read_body(loop, receive)
+        if body is None:
+            return
+        if body is False:
+            await send_json(send, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"message": "La solicitud es demasiado grande."})
+            return
+
+        disconnected: Optional[asyncio.Future] = None
+        response = _WSGIResponse()
+        result: Optional[Iterable[bytes]] = None
+        try:
+            environ = build_environ(scope, body)
+            try:
+                result, iterator, chunk, done = await loop.run_in_executor(
+                    self._executor, self._start, environ, response
+                )
+            except Exception:
+                logger.exception("%s %s failed before its response started", scope["method"], scope["path"])
+                await send_json(send, HTTPStatus.INTERNAL_SERVER_ERROR, {"message": "Unexpected server error."})
+                return
+            # Watched only once the view has returned: a streamed body is read
+            # from ``receive`` by the view itself until then.
+            disconnected = asyncio.ensure_future(wait_disconnect(receive))
+            await send(
+                {"type": "http.response.start", "status": response.status, "headers": response.headers}
+            )
+            try:
+                while not done:
+                    if disconnected.done():
+                        return
+                    if chunk:
+                        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                    chunk, done = await loop.run_in_executor(self._executor, _pull, iterator)
+            except Exception:
+                # The status line is already out; all that is left is to end
+                # the (truncated) body instead of leaving the client hanging.
+                logger.exception("%s %s failed while streaming its response", scope["method"], scope["path"])
+                chunk = b""
+            await send({"type": "http.response.body", "body": chunk, "more_body": False})
+        finally:
+            if disconnected is not None:
+                disconnected.cancel()
+            if result is not None and hasattr(result, "close"):
+                # Closing runs Flask's teardown, which may touch the database.
+                await loop.run_in_executor(self._executor, result.close)
+            await loop.run_in_executor(self._executor, body.close)
+
+    def _streams(self, scope) -> bool:
+        return bool(self._stream_paths) and scope["path"].startswith(self._stream_paths)
+
+    def _start(self, environ: dict, response: "_WSGIResponse"):
+        result = self._wsgi_app(environ, response.start_response)
+        iterator = iter(result)
+        chunk, done = _pull(iterator)
+        return result, iterator, chunk, done
+
+    async def _read_body(self, loop, receive):
+        """Spooled request body, ``False`` when it exceeds the limit, ``None`` if the client left."""
+        body = SpooledTemporaryFile(max_size=self._spool_bytes)
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                body.close()
+                return None
+            chunk = message.get("body", b"")
+            if chunk:
+                size += len(chunk)
+                if self._max_body_bytes is not None and size > self._max_body_bytes:
+                    body.close()
+                    return False
+                if size <= self._spool_bytes:
+                    body.write(chunk)
+                else:
+                    await loop.run_in_executor(self._executor, body.write, chunk)
+            if not message.get("more_body", False):
+                break
+        body.seek(0)
+        return body
+
+
+class _StreamingInput(io.RawIOBase):
+    """``wsgi.input`` that pulls body messages from the event loop as the WSGI app reads it.
+
+    Read from an executor thread; each read that needs more data waits for the
+    next ``http.request`` message on the loop, so a slow client slows the
+    reader down instead of being buffered.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, receive, max_body_bytes: Optional[int]) -> None:
+        self._loop = loop
+        self._receive = receive
+        self._max_body_bytes = max_body_bytes
+        self._pending = memoryview(b"")
+        self._size = 0
+        self._finished = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        while not self._pending and not self._finished:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message["type"] == "http.disconnect":
+                self._finished = True
+                raise ClientDisconnected()
+            chunk = message.get("body", b"")
+            self._size += len(chunk)
+            if self._max_body_bytes is not None and self._size > self._max_body_bytes:
+                self._finished = True
+                raise RequestEntityTooLarge()
+            self._pending = memoryview(chunk)
+            self._finished = not message.get("more_body", False)
+        count = min(len(target), len(self._pending))
+        target[:count] = self._pending[:count]
+        self._pending = self._pending[count:]
+        return count
+
+
+class _WSGIResponse:
+    def __init__(self) -> None:
+        self.status = HTTPStatus.INTERNAL_SERVER_ERROR.value
+        self.headers: List[Tuple[bytes, bytes]] = []
+
+    def start_response(self, status: str, headers, exc_info=None):
+        if exc_info:
+            try:
+                if self.headers:
+                    raise exc_info[1].with_traceback(exc_info[2])
+            finally:
+                exc_info = None
+        self.status = int(status.split(" ", 1)[0])
+        self.headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+        return lambda data: None
+
+
+def _pull(iterator: Iterator[bytes]) -> Tuple[bytes, bool]:
+    """Next batch of response bytes and whether the iterable is exhausted."""
+    parts = []
+    size = 0
+    for chunk in iterator:
+        if chunk:
+            parts.append(chunk)
+            size += len(chunk)
+            if size >= RESPONSE_BATCH_BYTES:
+                return b"".join(parts), False
+    return b"".join(parts), True
+
+
+def build_environ(scope, body) -> dict:
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    root_path = scope.get("root_path", "")
+    path = scope["path"]
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path) :]
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": root_path.encode("utf-8").decode("latin-1"),
+        "PATH_INFO": path.encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.input_terminated": True,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name in {"CONTENT_TYPE", "CONTENT_LENGTH"}:
+            environ[name] = value
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def wait_disconnect(receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def send_json(send, status: HTTPStatus, payload: dict, headers: Optional[list] = None) -> None:
+    body = json.dumps(payload).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": int(status),
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *(headers or []),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -6,8 +6,10 @@ import {
   analyzeVideoUpload,
   analyzeWebcamUpload,
   analyzeWebcamFrame,
+  openLiveSessionSocket,
   startLiveSession,
   stopLiveSession,
+  waitForLiveSessionFinalization,
   fetchMediaHistory,
   fetchModelMetadata,
 } from '../services/mediaService.js';
@@ -53,6 +55,8 @@ function MediaLab() {
   const captureCanvasRef = useRef(null);
   const liveIntervalRef = useRef(null);
   const liveRequestRef = useRef(false);
+  const liveSocketRef = useRef(null);
+  const livePacingRef = useRef(null);
   const webcamChannelRef = useRef(webcamChannel);
   const liveSessionIdRef = useRef(liveSessionId);
 
@@ -103,13 +107,22 @@ function MediaLab() {
       return null;
     }
     try {
-      const response = await stopLiveSession(sessionId);
-      setLiveSessionSummary(response);
-      setLiveSessionStats(response);
-      if (response.analyses?.length) {
-        pushAnalyses(response.analyses);
-      }
-      return response;
+      const provisional = await stopLiveSession(sessionId);
+      setLiveSessionSummary(provisional);
+      setLiveSessionStats(provisional);
+      // The recording and analyses are saved in the background; fill them in when ready.
+      waitForLiveSessionFinalization(provisional.finalization_id)
+        .then((response) => {
+          setLiveSessionSummary(response);
+          setLiveSessionStats(response);
+          if (response.analyses?.length) {
+            pushAnalyses(response.analyses);
+          }
+        })
+        .catch((error) => {
+          setLiveError(error.response?.data?.message || error.message);
+        });
+      return provisional;
     } catch (error) {
       setLiveError(error.response?.data?.message || 'No se pudo cerrar la sesión en vivo.');
       return null;
@@ -133,6 +146,9 @@ function MediaLab() {
       liveIntervalRef.current = null;
     }
     liveRequestRef.current = false;
+    liveSocketRef.current?.close();
+    liveSocketRef.current = null;
+    livePacingRef.current = null;
     const hadSession = Boolean(liveSessionIdRef.current);
     setIsLiveActive(false);
     setLiveStatus('IA en espera');
@@ -348,6 +364,22 @@ function MediaLab() {
     liveSessionIdRef.current = sessionResponse.session_id;
     setLiveSessionStats(null);
     setLiveSessionSummary(null);
+    try {
+      liveSocketRef.current = await openLiveSessionSocket(sessionResponse.session_id);
+    } catch (error) {
+      liveSocketRef.current = null;
+    }
+
+    let captureIntervalMs = null;
+    const scheduleCapture = (intervalMs) => {
+      // Only reschedule a running loop; stopLiveLoop clears the interval first.
+      if (!intervalMs || intervalMs === captureIntervalMs || !liveIntervalRef.current) {
+        return;
+      }
+      clearInterval(liveIntervalRef.current);
+      captureIntervalMs = intervalMs;
+      liveIntervalRef.current = window.setInterval(captureAndAnalyze, intervalMs);
+    };
 
     const captureAndAnalyze = async () => {
       if (!videoRef.current?.videoWidth || !captureCanvasRef.current) {
@@ -359,30 +391,54 @@ function MediaLab() {
       liveRequestRef.current = true;
 
       const canvas = captureCanvasRef.current;
-      canvas.width = videoRef.current.videoWidth;
-      canvas.height = videoRef.current.videoHeight;
+      const { videoWidth, videoHeight } = videoRef.current;
+      const pacing = livePacingRef.current;
+      const captureScale = pacing?.max_width ? Math.min(1, pacing.max_width / videoWidth) : 1;
+      canvas.width = Math.round(videoWidth * captureScale);
+      canvas.height = Math.round(videoHeight * captureScale);
       const ctx = canvas.getContext('2d');
       ctx.drawImage(videoRef.current, 0, 0, canvas.width, canvas.height);
 
-      const blob = await new Promise((resolve) => canvas.toBlob(resolve, 'image/jpeg', 0.9));
+      const blob = await new Promise((resolve) =>
+        canvas.toBlob(resolve, 'image/jpeg', pacing?.jpeg_quality ?? 0.9)
+      );
       if (!blob) {
         liveRequestRef.current = false;
         return;
       }
 
       try {
-        const file = new File([blob], `webcam-frame-${Date.now()}.jpg`, { type: 'image/jpeg' });
-        const response = await analyzeWebcamFrame(
-          file,
-          webcamChannelRef.current,
-          liveSessionIdRef.current,
-        );
+        let response;
+        if (liveSocketRef.current) {
+          response = await liveSocketRef.current.sendFrame(blob);
+        } else {
+          const file = new File([blob], `webcam-frame-${Date.now()}.jpg`, { type: 'image/jpeg' });
+          response = await analyzeWebcamFrame(
+            file,
+            webcamChannelRef.current,
+            liveSessionIdRef.current,
+          );
+        }
+        if (response.stale) {
+          // A newer frame of this session won admission; keep the current overlay.
+          return;
+        }
+        if (captureScale !== 1) {
+          response.detections = (response.detections || []).map((detection) => ({
+            ...detection,
+            box: detection.box.map((value) => Math.round(value / captureScale)),
+          }));
+        }
         setLiveResult(response);
         setLiveStatus(`IA en vivo: ${response.dominant_emotion} ${(response.confidence * 100).toFixed(1)}%`);
         drawDetections(response);
         setLiveError('');
         if (response.session) {
           setLiveSessionStats(response.session);
+          if (response.session.pacing) {
+            livePacingRef.current = response.session.pacing;
+            scheduleCapture(response.session.pacing.interval_ms);
+          }
         }
       } catch (error) {
         const apiMessage = error.response?.data?.message || 'No se pudo analizar el fotograma de la cámara.';
@@ -403,7 +459,8 @@ function MediaLab() {
     setLiveStatus('IA en vivo: calibrando cámara...');
     setLiveError('');
     captureAndAnalyze();
-    liveIntervalRef.current = window.setInterval(captureAndAnalyze, 1800);
+    captureIntervalMs = liveSocketRef.current ? 150 : 1800;
+    liveIntervalRef.current = window.setInterval(captureAndAnalyze, captureIntervalMs);
   }, [drawDetections, stopLiveLoop]);
 
   useEffect(() => {
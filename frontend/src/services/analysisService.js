@@ -1,6 +1,39 @@
 import api from './api.js';
 
-export async function analyzeText(text, channel = 'manual') {
-  const { data } = await api.post('/analyze-text', { text, channel });
+export async function analyzeText(text, channel = 'manual', { mode = 'auto', segmentBy = 'sentence' } = {}) {
+  const { data } = await api.post('/analyze-text', { text, channel, mode, segment_by: segmentBy });
+  return data;
+}
+
+export async function analyzeTextBatch(texts, channel = 'manual') {
+  const { data } = await api.post('/analyze-text/batch', { texts, channel });
+  return data;
+}
+
+export async function fetchAnalysisHistory({ query, labels, from, to, limit = 20, cursor } = {}) {
+  const params = { q: query, label: labels?.join(','), from, to, limit, cursor };
+  const { data } = await api.get('/analyze-text/history', { params });
+  return data;
+}
+
+export async function sendAnalysisFeedback(analysisId, label) {
+  const { data } = await api.post(`/analyze-text/${analysisId}/feedback`, { label });
+  return data;
+}
+
+export async function startBulkAnalysis(file, { textField = 'text', channel = 'bulk', persist = true } = {}) {
+  const formData = new FormData();
+  formData.append('file', file);
+  formData.append('text_field', textField);
+  formData.append('channel', channel);
+  formData.append('persist', String(persist));
+  const { data } = await api.post('/analyze-text/bulk', formData, {
+    headers: { 'Content-Type': 'multipart/form-data' },
+  });
+  return data;
+}
+
+export async function fetchBulkAnalysisStatus(jobId) {
+  const { data } = await api.get(`/analyze-text/bulk/${jobId}`);
   return data;
 }
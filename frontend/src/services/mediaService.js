@@ -62,6 +62,104 @@ export async function analyzeWebcamFrame(file, channel = 'webcam-live', sessionI
   return data;
 }
 
+function expandSocketFrame(message, labels, sessionId) {
+  const label = (index) => (index === null || index === undefined ? null : labels[index]);
+  const counts = (values = []) =>
+    labels.reduce((acc, name, index) => {
+      if (values[index]) {
+        acc[name] = values[index];
+      }
+      return acc;
+    }, {});
+  const payload = {
+    dominant_emotion: label(message.d),
+    confidence: message.c,
+    counts: counts(message.n),
+    detections: (message.b || []).map(([x, y, w, h, labelIndex, confidence]) => ({
+      box: [x, y, w, h],
+      label: label(labelIndex),
+      confidence,
+    })),
+  };
+  if (message.o) {
+    payload.stale = true;
+  }
+  if (message.s) {
+    payload.session = {
+      session_id: sessionId,
+      frames: message.f,
+      dominant_emotion: label(message.s.d),
+      confidence: message.s.c,
+      counts: counts(message.s.n),
+      dropped_frames: message.s.x,
+    };
+    if (message.p) {
+      const [maxWidth, jpegQuality, intervalMs] = message.p;
+      payload.session.pacing = { max_width: maxWidth, jpeg_quality: jpegQuality, interval_ms: intervalMs };
+    }
+  }
+  return payload;
+}
+
+export function openLiveSessionSocket(sessionId) {
+  const token = localStorage.getItem('ia_dashboard_token');
+  const url = `${API_BASE_URL.replace(/^http/, 'ws')}/media/live-session/${sessionId}/ws`;
+  return new Promise((resolve, reject) => {
+    if (typeof WebSocket === 'undefined') {
+      reject(new Error('WebSocket no disponible'));
+      return;
+    }
+    const socket = new WebSocket(url);
+    socket.binaryType = 'arraybuffer';
+    const pending = [];
+    let labels = null;
+
+    const failPending = (status, message) => {
+      while (pending.length > 0) {
+        pending.shift().reject({ response: { status, data: { message } } });
+      }
+    };
+
+    socket.onopen = () => socket.send(JSON.stringify({ token }));
+    socket.onerror = () => {
+      if (!labels) {
+        reject(new Error('No se pudo abrir el canal en vivo.'));
+      }
+    };
+    socket.onclose = () => {
+      if (!labels) {
+        reject(new Error('No se pudo abrir el canal en vivo.'));
+      }
+      failPending(503, 'El canal en vivo se cerró.');
+    };
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      if (message.t === 'h') {
+        labels = message.labels;
+        resolve({
+          sendFrame(blob) {
+            return new Promise((resolveFrame, rejectFrame) => {
+              pending.push({ resolve: resolveFrame, reject: rejectFrame });
+              socket.send(blob);
+            });
+          },
+          close() {
+            socket.close();
+          },
+        });
+      } else if (message.t === 'r') {
+        pending.shift()?.resolve(expandSocketFrame(message, labels, sessionId));
+      } else if (message.t === 'e') {
+        if (!labels) {
+          reject({ response: { status: message.s, data: { message: message.m } } });
+          return;
+        }
+        pending.shift()?.reject({ response: { status: message.s, data: { message: message.m } } });
+      }
+    };
+  });
+}
+
 export async function startLiveSession(channel = 'webcam-live') {
   const { data } = await api.post('/media/live-session/start', { channel });
   return data;
@@ -69,9 +167,37 @@ export async function startLiveSession(channel = 'webcam-live') {
 
 export async function stopLiveSession(sessionId) {
   const { data } = await api.post('/media/live-session/stop', { session_id: sessionId });
+  return data;
+}
+
+export async function fetchLiveSessionFinalization(finalizationId) {
+  const { data } = await api.get(`/media/live-session/finalizations/${finalizationId}`);
   return normalizeAnalysesPayload(data);
 }
 
+export async function waitForLiveSessionFinalization(
+  finalizationId,
+  { intervalMs = 1000, timeoutMs = 120000 } = {},
+) {
+  const deadline = Date.now() + timeoutMs;
+  while (Date.now() < deadline) {
+    const result = await fetchLiveSessionFinalization(finalizationId);
+    if (result.status === 'done') {
+      return result;
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+  throw new Error('La sesión sigue guardándose; revisa el historial en unos minutos.');
+}
+
+export async function previewVideo(file) {
+  const { data } = await api.post('/media/preview-video', file, {
+    params: { filename: file.name },
+    headers: { 'Content-Type': file.type || 'application/octet-stream' },
+  });
+  return data;
+}
+
 export async function fetchModelMetadata() {
   const { data } = await api.get('/media/model-metadata');
   return data;